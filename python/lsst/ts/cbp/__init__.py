@@ -28,9 +28,19 @@ try:
 except ImportError:
     __version__ = "?"
 
+from .axes import *
+from .capture import *
 from .component import *
 from .config_schema import *
 from .csc import *
 from .enums import *
+from .instrumentation import *
+from .mask_registry import *
+from .mock_farm import *
 from .mock_server import *
+from .planner import *
+from .recorder import *
+from .replay import *
+from .reply_parser import *
+from .sequence import *
 from .wizardry import *
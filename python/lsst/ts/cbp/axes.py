@@ -0,0 +1,183 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = ["AXES", "Axis", "check_positions", "find_out_of_range"]
+
+import numpy as np
+
+
+class Axis:
+    """Limits and speed of one axis of the CBP.
+
+    Parameters
+    ----------
+    name : `str`
+        The name of the axis, as in the inPosition event.
+    min_position : `float`
+        The minimum accepted position.
+    max_position : `float`
+        The maximum accepted position.
+    speed : `float`
+        The default speed of the axis on the real CBP
+        (position units/second); the CSC configuration may override it.
+    circular : `bool`, optional
+        If true, the axis wraps around at 360 degrees and moves
+        the shortest way to its target.
+
+    Attributes
+    ----------
+    name : `str`
+    min_position : `float`
+    max_position : `float`
+    speed : `float`
+    circular : `bool`
+    """
+
+    def __init__(self, name, min_position, max_position, speed, circular=False):
+        self.name = name
+        self.min_position = min_position
+        self.max_position = max_position
+        self.speed = speed
+        self.circular = circular
+
+    def get_farthest_position(self, position):
+        """Return the position of the axis farthest from a position.
+
+        Use it as the starting position of a motion when the actual one
+        is unknown, to predict the longest time the motion can take.
+
+        Parameters
+        ----------
+        position : `float`
+            The position.
+
+        Returns
+        -------
+        farthest : `float`
+            The farthest position within the limits; for a circular axis,
+            the opposite position, 180 degrees away.
+        """
+        position = float(position)
+        if self.circular:
+            return (position + 180) % 360
+        if position - self.min_position >= self.max_position - position:
+            return float(self.min_position)
+        return float(self.max_position)
+
+    def __repr__(self):
+        return (
+            f"Axis(name={self.name!r}, min_position={self.min_position}, "
+            f"max_position={self.max_position}, speed={self.speed}, "
+            f"circular={self.circular})"
+        )
+
+
+# The axes of the CBP, keyed by name. Positions are in degrees,
+# except focus (microns) and mask (the number of the mask).
+#
+# The speeds are the defaults of the ``<axis>_speed`` configuration fields.
+# They are not measured: they are the slowest speeds consistent with the
+# fixed timeouts the CSC used with the real CBP before it predicted motion
+# times, i.e. 20 seconds (``in_position_timeout``) for the full range of
+# azimuth (90 degrees), elevation (114 degrees) and focus (13000 microns)
+# and for the longest mask rotation (180 degrees, the short way around),
+# and 20 seconds per mask for the mask selector (``mask_timeout``).
+# Replace them with the ``motion.<axis>`` timings of `CommandTimings`
+# measured on the CBP.
+AXES = {
+    axis.name: axis
+    for axis in (
+        Axis("azimuth", min_position=-45, max_position=45, speed=90 / 20),
+        Axis("elevation", min_position=-69, max_position=45, speed=114 / 20),
+        Axis("focus", min_position=0, max_position=13000, speed=13000 / 20),
+        Axis("mask", min_position=1, max_position=5, speed=1 / 20),
+        Axis(
+            "mask_rotation",
+            min_position=0,
+            max_position=360,
+            speed=180 / 20,
+            circular=True,
+        ),
+    )
+}
+
+
+def find_out_of_range(**positions):
+    """Find the positions that are outside the limits of their axis.
+
+    Parameters
+    ----------
+    **positions : `float` or array-like of `float`
+        Positions keyed by axis name, e.g. ``azimuth=[0, 50]``.
+        Positions that are nan are ignored.
+
+    Returns
+    -------
+    out_of_range : `dict` [`str`, `numpy.ndarray`]
+        The indices of the positions outside the limits, keyed by
+        axis name; axes with all positions in range are omitted.
+
+    Raises
+    ------
+    KeyError
+        Raised when an axis is not in `AXES`.
+    """
+    out_of_range = dict()
+    for name, values in positions.items():
+        axis = AXES[name]
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        indices = np.flatnonzero(
+            (values < axis.min_position) | (values > axis.max_position)
+        )
+        if indices.size > 0:
+            out_of_range[name] = indices
+    return out_of_range
+
+
+def check_positions(**positions):
+    """Check that positions are within the limits of their axis.
+
+    Parameters
+    ----------
+    **positions : `float` or array-like of `float`
+        Positions keyed by axis name, e.g. ``azimuth=[0, 50]``.
+        Positions that are nan are ignored.
+
+    Raises
+    ------
+    ValueError
+        Raised when any position is outside the limits of its axis.
+        The message lists every offending value and its index.
+    """
+    out_of_range = find_out_of_range(**positions)
+    if not out_of_range:
+        return
+    problems = []
+    for name, indices in out_of_range.items():
+        axis = AXES[name]
+        values = np.atleast_1d(np.asarray(positions[name], dtype=float))
+        offending = ", ".join(f"[{i}]={values[i]}" for i in indices)
+        problems.append(
+            f"{name} not in range [{axis.min_position}, {axis.max_position}]: "
+            f"{offending}"
+        )
+    raise ValueError("; ".join(problems))
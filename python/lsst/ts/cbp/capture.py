@@ -0,0 +1,469 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = [
+    "TraceDirection",
+    "TraceWriter",
+    "TracingClient",
+    "get_exchanges",
+    "get_trace_paths",
+    "read_trace",
+    "summarize_trace",
+]
+
+import collections
+import enum
+import pathlib
+import re
+import struct
+import time
+import types
+
+from .instrumentation import LatencyHistogram
+
+TRACE_MAGIC = b"CBPTRACE"
+TRACE_VERSION = 1
+# File header: magic, version, padding.
+_HEADER = struct.Struct("<8sI4x")
+# Record header: time.monotonic_ns timestamp, direction, data size;
+# followed by the data.
+_RECORD = struct.Struct("<qBI")
+# The resynchronization marker of `CBPComponent.resync`; other ``MG`` text,
+# such as the connection probe ``MG "PING"``, is an ordinary command.
+_MARKER_COMMAND = re.compile(r'MG "(?P<marker>SYNC\d+)"')
+
+
+class TraceDirection(enum.IntEnum):
+    """Direction of the data of a trace record."""
+
+    SENT = 0
+    """Written to the controller."""
+    RECEIVED = 1
+    """Read from the controller."""
+
+
+class TraceWriter:
+    """Write the traffic with the controller to a binary trace file.
+
+    Each record holds a `time.monotonic_ns` timestamp, a `TraceDirection`
+    and the data, exactly as written to or read from the controller:
+    a command line with its terminator, or one reply.
+
+    If ``max_size`` > 0 the file is rotated, as by
+    `logging.handlers.RotatingFileHandler`: once it would exceed
+    ``max_size``, it is renamed to ``<path>.1``, ``<path>.1`` to
+    ``<path>.2`` and so on up to ``<path>.<backup_count>``, and a new
+    file is started. Read the files in order with `get_trace_paths`.
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        The file. If it exists, it is kept as the first backup if
+        ``backup_count`` > 0, else it is overwritten.
+    max_size : `int`, optional
+        The maximum size of the file (bytes); 0 for no limit.
+    backup_count : `int`, optional
+        The number of rotated files to keep.
+
+    Raises
+    ------
+    ValueError
+        Raised when ``max_size`` or ``backup_count`` < 0.
+
+    Attributes
+    ----------
+    path : `pathlib.Path`
+    max_size : `int`
+    backup_count : `int`
+    size : `int`
+        The size of the file (bytes).
+    """
+
+    def __init__(self, path, max_size=0, backup_count=0):
+        if max_size < 0:
+            raise ValueError(f"max_size={max_size} must be >= 0")
+        if backup_count < 0:
+            raise ValueError(f"backup_count={backup_count} must be >= 0")
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self.backup_count = backup_count
+        if self.path.exists():
+            self.rename_backups()
+        self.open()
+
+    def open(self):
+        """Start a new file."""
+        self.file = open(self.path, "wb")
+        self.file.write(_HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+        self.size = _HEADER.size
+
+    def rename_backups(self):
+        """Rename the file and the backups, dropping the oldest backup."""
+        if self.backup_count == 0:
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            backup = get_backup_path(self.path, i)
+            if backup.exists():
+                backup.replace(get_backup_path(self.path, i + 1))
+        self.path.replace(get_backup_path(self.path, 1))
+
+    def rotate(self):
+        """Close the file, rename it to the first backup and start
+        a new file.
+        """
+        self.file.close()
+        self.rename_backups()
+        self.open()
+
+    def write(self, direction, data, timestamp_ns=None):
+        """Append a record.
+
+        Parameters
+        ----------
+        direction : `TraceDirection`
+            The direction of the data.
+        data : `bytes`
+            The data.
+        timestamp_ns : `int` or `None`, optional
+            The `time.monotonic_ns` time of the data;
+            None for the current time.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        size = _RECORD.size + len(data)
+        if 0 < self.max_size < self.size + size and self.size > _HEADER.size:
+            self.rotate()
+        self.file.write(_RECORD.pack(timestamp_ns, direction, len(data)) + data)
+        self.size += size
+
+    def flush(self):
+        """Write buffered records to the file."""
+        self.file.flush()
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+
+class TracingClient:
+    """Wrap a `lsst.ts.tcpip.Client` to record its traffic
+    with a `TraceWriter`.
+
+    Commands written with `write_str` and replies read with `readuntil`
+    are recorded; all other attributes are those of the client.
+
+    Parameters
+    ----------
+    client : `lsst.ts.tcpip.Client`
+        The client.
+    writer : `TraceWriter`
+        The trace writer.
+
+    Attributes
+    ----------
+    client : `lsst.ts.tcpip.Client`
+    writer : `TraceWriter`
+    """
+
+    def __init__(self, client, writer):
+        self.client = client
+        self.writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def write_str(self, line):
+        """Write a line and its terminator, and record it.
+
+        The record is written first, so that it precedes the reply.
+
+        Parameters
+        ----------
+        line : `str`
+            The line, without terminator.
+        """
+        data = line.encode(self.client.encoding) + self.client.terminator
+        self.writer.write(TraceDirection.SENT, data)
+        await self.client.write(data)
+
+    async def readuntil(self, separator):
+        """Read data up to and including a separator, and record it.
+
+        Parameters
+        ----------
+        separator : `bytes`
+            The separator.
+
+        Returns
+        -------
+        data : `bytes`
+            The data read, including the separator.
+        """
+        data = await self.client.readuntil(separator)
+        self.writer.write(TraceDirection.RECEIVED, data)
+        return data
+
+
+def get_backup_path(path, index):
+    """Return the path of a rotated trace file."""
+    return path.with_name(f"{path.name}.{index}")
+
+
+def get_trace_paths(path):
+    """Return the trace file and its existing rotated files,
+    oldest first.
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        The trace file, as given to `TraceWriter`.
+
+    Returns
+    -------
+    paths : `list` [`pathlib.Path`]
+        The existing files, oldest first.
+    """
+    path = pathlib.Path(path)
+    backups = []
+    index = 1
+    while get_backup_path(path, index).exists():
+        backups.append(get_backup_path(path, index))
+        index += 1
+    return [item for item in backups[::-1] + [path] if item.exists()]
+
+
+def read_trace(path):
+    """Read a trace file written by `TraceWriter`.
+
+    A truncated last record, e.g. from a process that died while writing
+    it, is ignored.
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        The file.
+
+    Returns
+    -------
+    records : `list` [`types.SimpleNamespace`]
+        The records, with attributes:
+
+        * ``timestamp_ns``: `int`
+        * ``direction``: `TraceDirection`
+        * ``data``: `bytes`
+
+    Raises
+    ------
+    ValueError
+        Raised when the file is not a trace file.
+    """
+    data = pathlib.Path(path).read_bytes()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} is not a trace file: too short")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f"{path} is not a trace file of this version")
+    records = []
+    offset = _HEADER.size
+    while offset + _RECORD.size <= len(data):
+        timestamp_ns, direction, size = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + size > len(data):
+            break
+        records.append(
+            types.SimpleNamespace(
+                timestamp_ns=timestamp_ns,
+                direction=TraceDirection(direction),
+                data=data[offset : offset + size],
+            )
+        )
+        offset += size
+    return records
+
+
+def get_exchanges(records, terminator=b"\r\n"):
+    """Pair the commands in trace records with their replies.
+
+    Each ``;``-separated command of a command line gets one reply,
+    in order. Blank replies are skipped. When a resynchronization
+    marker (``MG "SYNC<n>"``) is answered, commands sent before it that
+    are still waiting are given up on: their replies were lost.
+
+    Parameters
+    ----------
+    records : `list` [`types.SimpleNamespace`]
+        Trace records, as returned by `read_trace`.
+    terminator : `bytes`, optional
+        The terminator of command lines.
+
+    Returns
+    -------
+    exchanges : `list` [`types.SimpleNamespace`]
+        One item per command, in the order sent, with attributes:
+
+        * ``command``: `str`, without terminator.
+        * ``reply``: `bytes` or `None`, as read from the controller;
+          None if the reply was lost.
+        * ``timestamp_ns``: `int`, the time the command was sent.
+        * ``latency``: `float`, the time from sending the command to
+          reading its reply (seconds); nan if the reply was lost.
+    """
+    exchanges = []
+    pending = []
+    for record in records:
+        if record.direction == TraceDirection.SENT:
+            line = record.data.decode(errors="replace")
+            if line.endswith(terminator.decode()):
+                line = line[: -len(terminator)]
+            for command in line.split(";"):
+                exchange = types.SimpleNamespace(
+                    command=command,
+                    reply=None,
+                    timestamp_ns=record.timestamp_ns,
+                    latency=float("nan"),
+                )
+                exchanges.append(exchange)
+                pending.append(exchange)
+            continue
+        if not record.data.strip():
+            continue
+        # A marker reply answers its marker command, and all commands
+        # sent before the marker that are still waiting lost their reply.
+        for i, exchange in enumerate(pending):
+            match = _MARKER_COMMAND.fullmatch(exchange.command)
+            if match and match.group("marker").encode() in record.data:
+                del pending[:i]
+                break
+        if pending:
+            exchange = pending.pop(0)
+            exchange.reply = record.data
+            exchange.latency = (record.timestamp_ns - exchange.timestamp_ns) / 1e9
+    return exchanges
+
+
+def get_command_key(command):
+    """Return the key under which `summarize_trace` groups a command.
+
+    Commands that set a value are grouped regardless of the value,
+    e.g. ``new_az=12.5`` under ``new_az=``.
+    """
+    name, equals, value = command.partition("=")
+    if equals and value != "?":
+        return name + "="
+    return command
+
+
+def summarize_trace(records, gap_threshold=1):
+    """Summarize the traffic in trace records, to profile the link to
+    the controller.
+
+    Parameters
+    ----------
+    records : `list` [`types.SimpleNamespace`]
+        Trace records, as returned by `read_trace`.
+    gap_threshold : `float`, optional
+        The minimum time without traffic that counts as a gap (seconds).
+
+    Returns
+    -------
+    summary : `dict`
+        Summary of the traffic, with items:
+
+        * ``duration``: the time from the first to the last record
+          (seconds).
+        * ``sent``, ``received``: `dict` with the number of ``frames``
+          and ``bytes`` in each direction, and ``bytes_per_second``.
+        * ``commands``: the number of commands; a command line
+          holds one or more ``;``-separated commands.
+        * ``commands_per_second``: the number of commands per second.
+        * ``latency``: `LatencyHistogram.summary` of the time from
+          sending a command to reading its reply (seconds).
+        * ``command_latency``: `dict` of the same, keyed by command;
+          see `get_command_key`.
+        * ``lost``: the number of commands whose reply was lost.
+        * ``errors``: the number of commands rejected with ``?``.
+        * ``retries``: the number of commands sent again
+          after their reply was lost.
+        * ``resyncs``: the number of resynchronization markers.
+        * ``gaps``: `dict` with the ``count`` of intervals between
+          records longer than ``gap_threshold``, and the ``max`` interval
+          (seconds).
+    """
+    duration = 0
+    if records:
+        duration = (records[-1].timestamp_ns - records[0].timestamp_ns) / 1e9
+    traffic = dict()
+    for direction in TraceDirection:
+        sizes = [
+            len(record.data) for record in records if record.direction == direction
+        ]
+        traffic[direction.name.lower()] = dict(
+            frames=len(sizes),
+            bytes=sum(sizes),
+            bytes_per_second=sum(sizes) / duration if duration > 0 else 0,
+        )
+
+    gaps = [
+        (record.timestamp_ns - previous.timestamp_ns) / 1e9
+        for previous, record in zip(records, records[1:])
+    ]
+
+    latency = LatencyHistogram(min_value=1e-6)
+    command_latency = collections.defaultdict(lambda: LatencyHistogram(min_value=1e-6))
+    lost = errors = retries = resyncs = 0
+    # Commands whose last reply was lost.
+    unanswered = set()
+    exchanges = get_exchanges(records)
+    for exchange in exchanges:
+        if _MARKER_COMMAND.fullmatch(exchange.command):
+            resyncs += 1
+            continue
+        if exchange.command in unanswered:
+            retries += 1
+            unanswered.discard(exchange.command)
+        if exchange.reply is None:
+            lost += 1
+            unanswered.add(exchange.command)
+            continue
+        if exchange.reply.strip() == b"?":
+            errors += 1
+        latency.record(exchange.latency)
+        command_latency[get_command_key(exchange.command)].record(exchange.latency)
+
+    return dict(
+        duration=duration,
+        **traffic,
+        commands=len(exchanges),
+        commands_per_second=len(exchanges) / duration if duration > 0 else 0,
+        latency=latency.summary(),
+        command_latency={
+            key: histogram.summary() for key, histogram in command_latency.items()
+        },
+        lost=lost,
+        errors=errors,
+        retries=retries,
+        resyncs=resyncs,
+        gaps=dict(
+            count=sum(gap > gap_threshold for gap in gaps),
+            max=max(gaps, default=0),
+        ),
+    )
@@ -20,16 +20,52 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
-__all__ = ["CBPComponent"]
+__all__ = ["CBPComponent", "CommandTimeoutError"]
 
 import asyncio
 import logging
 import math
+import random
+import time
 import types
 
-from lsst.ts import tcpip
+from lsst.ts import tcpip, utils
 
-from .wizardry import NUMBER_OF_RETRIES
+from . import axes, capture, instrumentation, mask_registry, recorder, reply_parser
+from .enums import ErrorCode
+from .wizardry import (
+    MAX_COMMAND_LENGTH,
+    NUMBER_OF_RETRIES,
+    PARK_VARIABLES,
+    POSITION_VARIABLES,
+    STATUS_VARIABLES,
+)
+
+
+class CommandTimeoutError(asyncio.TimeoutError):
+    """A command to the controller got no reply in time.
+
+    Parameters
+    ----------
+    command : `str`
+        The command.
+    attempts : `int`
+        The number of times the command was sent.
+    duration : `float`
+        The time spent on the command (seconds).
+    reason : `str`
+        Why the last attempt failed.
+    """
+
+    def __init__(self, command, attempts, duration, reason):
+        super().__init__(
+            f"No reply to {command!r} after {attempts} attempts "
+            f"in {duration:0.2f} seconds: {reason}"
+        )
+        self.command = command
+        self.attempts = attempts
+        self.duration = duration
+        self.reason = reason
 
 
 class CBPComponent:
@@ -54,14 +90,77 @@ class CBPComponent:
     log : `logging.Logger`
     reader : `asyncio.StreamReader` or `None`
     writer : `asyncio.StreamWriter` or `None`
-    lock : `asyncio.Lock`
+    client_lock : `asyncio.Lock`
+        Serializes writes to the controller.
+    pending_replies : `asyncio.Queue`
+        Commands waiting for a reply, in the order they were sent.
+    reply_task : `asyncio.Task`
+        Task running `reply_loop`.
     timeout : `int`
+        The default total time budget of a command, including retries.
+    reply_timeout : `float`
+        The time to wait for a reply, once earlier replies have been read,
+        before giving up on it and calling `resync`; for a command line
+        holding several commands, the time to wait for each reply.
+    resync_count : `int`
+        The number of times the replies were resynchronized.
+    resync_requested : `bool`
+        If true, `reply_loop` resynchronizes before reading the next reply;
+        see `request_resync`.
+    probe_interval : `float`
+        If nothing is received from the controller for this long,
+        send it a probe (seconds).
+    reconnect_timeout : `float`
+        How long to try reconnecting before going to fault (seconds).
+    reconnect_count : `int`
+        The number of successful reconnections.
+    reconnect_duration : `float`
+        The total time spent reconnecting (seconds).
+    last_reply_time : `float`
+        The time of the last reply (`time.monotonic` seconds).
+    monitor_task : `asyncio.Task`
+        Task running `monitor_connection`.
+    reconnect_task : `asyncio.Task`
+        Task running `reconnect`.
+    min_backoff : `float`
+        The backoff before the first retry of a command.
+        It doubles with each retry, up to ``max_backoff``.
+    max_backoff : `float`
     long_timeout : `int`
     host : `str`
     port : `int`
     connected : `bool`
     error_tolerance : `float`
     focus_crosstalk : `float`
+    in_position_condition : `asyncio.Condition`
+        Notified each time `update_in_position` updates the inPosition
+        event.
+    deadbands : `dict` [`str`, `float`]
+        Minimum change of a telemetry field, keyed by field name,
+        for a topic to be written before the heartbeat is due.
+    heartbeat_interval : `float`
+        Maximum interval between writes of a telemetry topic (seconds).
+    published : `dict`
+        Time and values of the last write of each telemetry topic.
+    batch_query : `bool`
+        If True, `update_status` reads all controller variables with a few
+        ``MG`` commands instead of one command per variable.
+    command_statistics : `CommandStatistics` or `None`
+        Round-trip statistics of the commands sent by `send_command`
+        in the current window, or None if not recorded.
+    statistics_interval : `float`
+        The interval between logging and resetting ``command_statistics``
+        (seconds). If 0, the statistics are not recorded.
+    statistics_task : `asyncio.Task`
+        Task running `log_statistics_loop`.
+    recorder : `TelemetryRecorder` or `None`
+        Records every read of the controller variables,
+        or None if not recorded.
+    masks : `MaskRegistry`
+        The masks, from the configuration.
+    trace_writer : `TraceWriter` or `None`
+        Records the traffic with the controller, through a `TracingClient`
+        wrapped around the client, or None if not recorded.
 
     Notes
     -----
@@ -81,6 +180,18 @@ class CBPComponent:
             self.log = log.getChild(type(self).__name__)
         self.timeout = 5
         self.long_timeout = 30
+        self.reply_timeout = 1
+        self.resync_count = 0
+        self.resync_requested = False
+        self.probe_interval = 2
+        self.reconnect_timeout = 5
+        self.reconnect_count = 0
+        self.reconnect_duration = 0
+        self.last_reply_time = time.monotonic()
+        self.monitor_task = utils.make_done_future()
+        self.reconnect_task = utils.make_done_future()
+        self.min_backoff = 0.05
+        self.max_backoff = 1
         self.host = None
         self.port = None
         # According to the firmware, error limit is 9999 steps for watchdog
@@ -93,6 +204,20 @@ class CBPComponent:
         self.terminator = "\r\n"
         self.client = None
         self.client_lock = asyncio.Lock()
+        self.pending_replies = asyncio.Queue()
+        self.reply_task = utils.make_done_future()
+        self.batch_query = True
+        self.deadbands = dict(
+            azimuth=0.001, elevation=0.001, focus=1, mask_rotation=0.01
+        )
+        self.heartbeat_interval = 2
+        self.published = dict()
+        self.in_position_condition = asyncio.Condition()
+        self.command_statistics = None
+        self.statistics_interval = 0
+        self.statistics_task = utils.make_done_future()
+        self.recorder = None
+        self.trace_writer = None
         self.generate_mask_info()
         self.log.info("CBP component initialized")
 
@@ -155,16 +280,66 @@ class CBPComponent:
 
     def generate_mask_info(self):
         """Generate initial mask info."""
-        mask_dict = {
-            f"{i}": types.SimpleNamespace(name=f"Empty {i}", rotation=0, id=i)
-            for i in (1, 2, 3, 4, 5, 9)
-        }
-        mask_dict["9"].name = "Unknown"
-        self.masks = mask_dict
+        self.masks = mask_registry.MaskRegistry.make_default()
+
+    async def publish_telemetry(self, topic, **values):
+        """Set a telemetry topic and write it if it changed.
+
+        The topic is written if any field changed by more than its deadband
+        since the last write, or if `heartbeat_interval` has elapsed.
+        The topic data is always set, so the in position checks use the
+        latest values.
+
+        Parameters
+        ----------
+        topic : `lsst.ts.salobj.topics.WriteTopic`
+            The telemetry topic.
+        **values
+            The field values.
+
+        Returns
+        -------
+        written : `bool`
+            True if the topic was written.
+        """
+        topic.set(**values)
+        now = time.monotonic()
+        last = self.published.get(topic)
+        if (
+            last is not None
+            and now - last.time < self.heartbeat_interval
+            and not any(
+                self.exceeds_deadband(name, value, last.values.get(name))
+                for name, value in values.items()
+            )
+        ):
+            return False
+        await topic.write()
+        self.published[topic] = types.SimpleNamespace(time=now, values=values)
+        return True
+
+    def exceeds_deadband(self, name, value, published_value):
+        """Return True if a telemetry field changed enough to be written.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the field.
+        value : `float`, `bool` or `str`
+            The new value.
+        published_value : `float`, `bool`, `str` or `None`
+            The last written value, or None if never written.
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return value != published_value
+        if published_value is None:
+            return True
+        return abs(value - published_value) > self.deadbands.get(name, 0)
 
     async def update_in_position(self):
         """Update the in position status of each actuator,
-        based on the most recently read encoder data.
+        based on the most recently read encoder data,
+        and wake up tasks waiting on `in_position_condition`.
 
         Returns
         --------
@@ -184,13 +359,30 @@ class CBPComponent:
             < self.rotation_tolerance,
             focus=abs(self.focus - self.target.focus) < self.focus_crosstalk,
         )
+        async with self.in_position_condition:
+            self.in_position_condition.notify_all()
         return did_change
 
     async def send_command(
-        self, msg, log=True, await_reply=True, await_terminator=True
+        self,
+        msg,
+        log=True,
+        await_reply=True,
+        await_terminator=True,
+        raw=False,
+        timeout=None,
+        reconnect=True,
+        reply_count=1,
     ):
         """Send the encoded command and read the reply.
 
+        Commands are pipelined: the command is written as soon as the
+        socket is free and the reply is matched to it by `reply_loop`,
+        so several commands can be waiting for replies at the same time.
+
+        If the reply does not arrive, the command is sent again after an
+        exponential backoff with jitter, up to `NUMBER_OF_RETRIES` attempts
+        and within a total time of ``timeout``.
 
         Parameters
         ----------
@@ -204,72 +396,518 @@ class CBPComponent:
         await_terminator : `bool`
             If false, reply has no terminator else reply has expected
             terminator.
+        raw : `bool`
+            If true, return the reply as read from the socket, to be
+            parsed with the functions in `reply_parser`.
+        timeout : `float` or `None`
+            The total time budget for the command, including retries
+            (seconds). If None, use `timeout`.
+        reconnect : `bool`
+            If true and the connection is lost, reconnect and wait
+            for the reconnection (within the time budget) before
+            sending the command again.
+        reply_count : `int`
+            The number of replies to wait for: one per command, if ``msg``
+            holds several ``;``-separated commands.
 
         Returns
         -------
-        reply : `str`
-            The reply to the command sent.
+        reply : `str` or `bytes`
+            The reply to the command sent; the replies joined together
+            if ``reply_count`` > 1.
+
+        Raises
+        ------
+        ConnectionError
+            Raised when not connected and not reconnecting.
+        CommandTimeoutError
+            Raised when no reply arrived within the retries and time budget.
         """
+        if timeout is None:
+            timeout = self.timeout
+        statistics = self.command_statistics
+        start_time = time.monotonic()
+        deadline = start_time + timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                pending = await self.write_command(msg, await_terminator, reply_count)
+            except ConnectionError as e:
+                if not reconnect or not self.request_reconnect(repr(e)):
+                    raise
+                reason = repr(e)
+                try:
+                    await self.wait_reconnected(max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                if not await_reply:
+                    # The reply is still read, to keep the queue in step
+                    # with the controller, but nobody waits for it.
+                    pending.future.add_done_callback(
+                        lambda future: future.cancelled() or future.exception()
+                    )
+                    return None
+                if statistics is not None:
+                    sent_time = time.monotonic()
+                try:
+                    reply = await asyncio.wait_for(
+                        pending.future, max(deadline - time.monotonic(), 0)
+                    )
+                    break
+                except asyncio.TimeoutError:
+                    # Either reply_loop gave up on the reply or the time
+                    # budget ran out while waiting behind earlier replies;
+                    # in the latter case reply_loop discards the reply
+                    # when it comes.
+                    reason = "no reply"
+                except Exception as e:
+                    reason = repr(e)
+            remaining = deadline - time.monotonic()
+            if attempt >= NUMBER_OF_RETRIES or remaining <= 0:
+                if statistics is not None:
+                    statistics.record_failure(msg)
+                raise CommandTimeoutError(
+                    command=msg,
+                    attempts=attempt,
+                    duration=time.monotonic() - start_time,
+                    reason=reason,
+                )
+            # Exponential backoff with full jitter.
+            backoff = min(self.max_backoff, self.min_backoff * 2 ** (attempt - 1))
+            self.log.warning(f"Retrying {msg!r} after attempt {attempt}: {reason}")
+            await asyncio.sleep(min(random.uniform(0, backoff), remaining))
+        if statistics is not None:
+            statistics.record(
+                msg,
+                round_trip=time.monotonic() - sent_time,
+                retries=attempt - 1,
+                reply_size=len(reply),
+            )
+        if raw:
+            return reply
+        if await_terminator:
+            reply = reply[: -len(self.terminator)].decode()
+            remove = ":"
+        else:
+            remove = b":"
+        if reply != ":":
+            return reply.strip(remove)
+
+    async def write_command(self, msg, await_terminator, reply_count=1):
+        """Write a command and queue it for a reply.
+
+        Parameters
+        ----------
+        msg : `str`
+            The string command to be sent.
+        await_terminator : `bool`
+            If false, reply has no terminator else reply has expected
+            terminator.
+        reply_count : `int`, optional
+            The number of replies to read for the command.
+
+        Returns
+        -------
+        pending : `types.SimpleNamespace`
+            The queued command, with attributes:
+
+            * ``future``: `asyncio.Future` set to the reply.
+            * ``await_terminator``: `bool`.
+            * ``reply_count``: `int`.
+
+        Raises
+        ------
+        ConnectionError
+            Raised when not connected.
+        """
+        if not self.connected or self.reply_task.done():
+            raise ConnectionError(f"Cannot send {msg!r}: not connected.")
+        pending = types.SimpleNamespace(
+            future=asyncio.get_running_loop().create_future(),
+            await_terminator=await_terminator,
+            reply_count=reply_count,
+        )
         async with self.client_lock:
+            # Queue the reply before writing so that the order of the
+            # queue always matches the order of the commands on the wire.
+            self.pending_replies.put_nowait(pending)
             await self.client.write_str(msg)
-            if await_reply:
-                if await_terminator:
-                    for _ in range(NUMBER_OF_RETRIES):
-                        try:
-                            reply = await self.client.read_str()
-                        except Exception:
-                            self.log.exception("Reply not recieved")
-                            await asyncio.sleep(0.2)
-                        if reply:
-                            self.log.debug(reply)
-                            break
-                        else:
-                            continue
-                    remove = ":"
-                else:
-                    for _ in range(NUMBER_OF_RETRIES):
-                        try:
-
-                            reply = await self.client.read(1024)
-                        except Exception:
-                            self.log.exception("Reply not recieved.")
-                            await asyncio.sleep(0.2)
-                        if reply:
-                            self.log.debug(reply)
-                            break
-                        else:
-                            continue
-                    remove = b":"
+        return pending
+
+    async def read_reply(self, await_terminator, reply_count=1):
+        """Read the reply to a command from the controller.
+
+        Blank lines are skipped.
+
+        Parameters
+        ----------
+        await_terminator : `bool`
+            If false, reply has no terminator else reply has expected
+            terminator.
+        reply_count : `int`, optional
+            The number of replies to read, e.g. one per command
+            of a ``;``-separated command line.
+
+        Returns
+        -------
+        reply : `bytes`
+            The reply, including the terminator if there is one;
+            the replies joined together if ``reply_count`` > 1.
+        """
+        replies = []
+        while len(replies) < reply_count:
+            if await_terminator:
+                reply = await self.client.readuntil(self.terminator.encode())
             else:
-                reply = ":"
-            if reply != ":":
-                return reply.strip(remove)
+                # Replies without a terminator end with the prompt.
+                reply = await self.client.readuntil(b":")
+            if reply.strip():
+                self.log.debug(reply)
+                replies.append(reply)
+        return replies[0] if reply_count == 1 else b"".join(replies)
+
+    async def reply_loop(self):
+        """Read replies and hand them, in order, to the pending commands.
+
+        If a reply does not arrive within `reply_timeout`, the reply
+        stream is resynchronized with `resync`.
+        """
+        try:
+            while True:
+                pending = await self.pending_replies.get()
+                if self.resync_requested:
+                    self.resync_requested = False
+                    if not pending.future.done():
+                        pending.future.set_exception(
+                            asyncio.TimeoutError("Reply discarded by resync.")
+                        )
+                    try:
+                        await self.resync()
+                    except asyncio.TimeoutError:
+                        self.log.error("Could not resynchronize with the controller.")
+                        return
+                    continue
+                try:
+                    result = await asyncio.wait_for(
+                        self.read_reply(pending.await_terminator, pending.reply_count),
+                        self.reply_timeout * pending.reply_count,
+                    )
+                except asyncio.CancelledError:
+                    pending.future.cancel()
+                    raise
+                except (asyncio.IncompleteReadError, ConnectionError) as e:
+                    self.log.warning(f"Connection to the controller lost: {e!r}")
+                    if not pending.future.done():
+                        pending.future.set_exception(
+                            ConnectionError("Connection lost.")
+                        )
+                    return
+                except asyncio.TimeoutError:
+                    if not pending.future.done():
+                        pending.future.set_exception(
+                            asyncio.TimeoutError("No reply received.")
+                        )
+                    try:
+                        await self.resync()
+                    except asyncio.TimeoutError:
+                        self.log.error("Could not resynchronize with the controller.")
+                        return
+                except Exception as e:
+                    self.log.exception("Reply not received.")
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                else:
+                    self.last_reply_time = time.monotonic()
+                    if not pending.future.done():
+                        pending.future.set_result(result)
+        finally:
+            self.abort_pending_replies(
+                ConnectionError("Stopped reading replies from the controller.")
+            )
+
+    async def resync(self):
+        """Resynchronize replies with commands after a missing reply.
+
+        Replies carry no command identifier, so once a reply is missing
+        the following replies can no longer be matched to their commands.
+        Fail all queued commands, so their callers send them again, then
+        ask the controller to print a marker and discard everything up
+        to and including the marker.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            Raised if the marker is not received within `timeout`.
+        """
+        self.resync_count += 1
+        marker = f"SYNC{self.resync_count}"
+        self.log.warning(f"Missing reply; resynchronizing with marker {marker}.")
+        async with self.client_lock:
+            self.abort_pending_replies(
+                asyncio.TimeoutError("Reply discarded while resynchronizing.")
+            )
+            await self.client.write_str(f'MG "{marker}"')
+
+        async def discard_until_marker():
+            while True:
+                line = await self.client.readuntil(self.terminator.encode())
+                if marker.encode() in line:
+                    return
+
+        await asyncio.wait_for(discard_until_marker(), self.timeout)
+
+    def request_resync(self):
+        """Ask `reply_loop` to resynchronize before reading the next reply.
+
+        Call when a reply proves to belong to another command,
+        e.g. after a reply was lost while other commands were waiting.
+        """
+        if not self.resync_requested:
+            self.log.warning("Replies out of step with the commands.")
+        self.resync_requested = True
+
+    def abort_pending_replies(self, exception):
+        """Fail all commands still waiting for a reply.
+
+        Parameters
+        ----------
+        exception : `Exception`
+            The exception to set on the pending commands.
+        """
+        while not self.pending_replies.empty():
+            pending = self.pending_replies.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(exception)
+
+    async def query_variables(self, *variables):
+        """Read several controller variables with as few messages as
+        possible.
+
+        The variables are read with the Galil ``MG`` command, which replies
+        with the values separated by whitespace. The variables are split
+        over several messages if they do not fit in one command line.
+
+        Parameters
+        ----------
+        *variables : `str`
+            The names of the controller variables.
+
+        Returns
+        -------
+        values : `list` [`float`]
+            The values, in the same order as ``variables``.
+
+        Raises
+        ------
+        ReplyError
+            Raised when a reply does not contain one value per variable.
+        """
+        values = []
+        for chunk in split_query(variables):
+            msg = f"MG {','.join(chunk)}"
+            reply = await self.send_command(msg, log=False, raw=True)
+            try:
+                values += reply_parser.parse_values(reply, len(chunk))
+            except reply_parser.ReplyMismatchError:
+                self.request_resync()
+                reply = await self.send_command(msg, log=False, raw=True)
+                values += reply_parser.parse_values(reply, len(chunk))
+        return values
 
     async def connect(self):
         """Create a socket and connect to the CBP's static address and
         designated port.
 
+        Also start monitoring the connection; see `monitor_connection`.
+
+        Raises
+        ------
+        Exception
+            Raised when the connection fails.
         """
         try:
-            self.client = tcpip.Client(host=self.host, port=self.port, log=self.csc.log)
-            await self.client.start_task
+            await self.open_client()
         except Exception:
             self.log.exception("Connection failed.")
-            await self.fault(code=2, report="Connection failed.")
+            raise
+        self.monitor_task = asyncio.create_task(self.monitor_connection())
+        if self.command_statistics is not None:
+            self.statistics_task = asyncio.create_task(self.log_statistics_loop())
 
     async def disconnect(self):
         """Disconnect from the tcp socket.
 
         Safe to call even if already disconnected.
         """
+        self.monitor_task.cancel()
+        self.statistics_task.cancel()
+        self.reconnect_task.cancel()
+        await self.close_client()
+
+    async def log_statistics_loop(self):
+        """Log and reset the command statistics every
+        ``statistics_interval`` seconds."""
+        while True:
+            await asyncio.sleep(self.statistics_interval)
+            self.log_command_statistics()
+
+    def log_command_statistics(self, reset=True):
+        """Log the round-trip statistics of the commands.
+
+        Parameters
+        ----------
+        reset : `bool`, optional
+            If true, reset the statistics after logging them.
+        """
+        statistics = self.command_statistics
+        if statistics is None:
+            return
+        duration = time.monotonic() - statistics.start_time
+        text = statistics.format_summary()
+        if text:
+            self.log.info(
+                f"Command round trips in the last {duration:0.1f} seconds:\n{text}"
+            )
+        if reset:
+            statistics.reset()
+
+    async def open_client(self):
+        """Connect the client and start reading replies."""
+        client = tcpip.Client(host=self.host, port=self.port, log=self.csc.log)
+        try:
+            await client.start_task
+        except BaseException:
+            await client.close()
+            raise
+        if self.trace_writer is not None:
+            client = capture.TracingClient(client, self.trace_writer)
+        self.client = client
+        self.published = dict()
+        self.pending_replies = asyncio.Queue()
+        self.last_reply_time = time.monotonic()
+        self.reply_task = asyncio.create_task(self.reply_loop())
+
+    async def close_client(self):
+        """Stop reading replies and close the client, if any."""
+        self.reply_task.cancel()
         if self.client is not None:
             await self.client.close()
             self.client = None
+        if self.trace_writer is not None:
+            self.trace_writer.flush()
+
+    @property
+    def reconnecting(self):
+        """Is a reconnection in progress?"""
+        return not self.reconnect_task.done()
+
+    def request_reconnect(self, reason):
+        """Start reconnecting, unless already reconnecting or disconnected
+        on purpose.
+
+        Parameters
+        ----------
+        reason : `str`
+            Why the connection is considered lost, for the log.
+
+        Returns
+        -------
+        reconnecting : `bool`
+            True if a reconnection is in progress.
+        """
+        if not self.reconnecting and not self.monitor_task.done():
+            self.reconnect_task = asyncio.create_task(self.reconnect(reason))
+        return self.reconnecting
+
+    async def wait_reconnected(self, timeout):
+        """Wait for a reconnection in progress, if any.
+
+        Parameters
+        ----------
+        timeout : `float`
+            The maximum time to wait (seconds).
+        """
+        if self.reconnecting:
+            await asyncio.wait_for(asyncio.shield(self.reconnect_task), timeout)
+
+    async def reconnect(self, reason):
+        """Reconnect to the controller, retrying with exponential backoff.
+
+        Go to fault if the controller cannot be reached within
+        `reconnect_timeout`.
+
+        Parameters
+        ----------
+        reason : `str`
+            Why the connection is considered lost, for the log.
+        """
+        self.log.warning(f"Reconnecting to the controller: {reason}")
+        start_time = time.monotonic()
+        backoff = self.min_backoff
+        while True:
+            await self.close_client()
+            try:
+                await self.open_client()
+                break
+            except Exception as e:
+                elapsed = time.monotonic() - start_time
+                if elapsed + backoff > self.reconnect_timeout:
+                    self.log.error(
+                        f"Could not reconnect within {self.reconnect_timeout} seconds."
+                    )
+                    await self.csc.fault(
+                        code=ErrorCode.CONNECTION_FAILED,
+                        report=f"Could not reconnect to the controller: {e!r}",
+                    )
+                    return
+                self.log.info(f"Reconnect failed: {e!r}; retrying in {backoff:0.2f} s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        duration = time.monotonic() - start_time
+        self.reconnect_count += 1
+        self.reconnect_duration += duration
+        self.log.info(
+            f"Reconnected in {duration:0.2f} seconds; "
+            f"{self.reconnect_count} reconnections "
+            f"taking {self.reconnect_duration:0.2f} seconds in total."
+        )
+
+    async def monitor_connection(self):
+        """Check the health of the connection and reconnect when it is
+        lost.
+
+        The connection is lost if the socket is closed, if `reply_loop`
+        stopped, or if the controller does not answer a probe.
+        The probe is only sent if nothing was received for
+        `probe_interval`, so regular telemetry doubles as the heartbeat.
+        A socket left half-open by a network failure is detected by the
+        probe timing out.
+        """
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            if self.reconnecting:
+                continue
+            if not self.connected or self.reply_task.done():
+                self.request_reconnect("connection lost")
+                continue
+            if time.monotonic() - self.last_reply_time < self.probe_interval:
+                continue
+            try:
+                await self.send_command(
+                    'MG "PING"', timeout=self.timeout, reconnect=False
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.request_reconnect(f"no reply to probe: {e!r}")
 
     async def get_azimuth(self):
         """Get the azimuth value."""
-        azimuth = float(await self.send_command("az=?"))
-        await self.csc.tel_azimuth.set_write(azimuth=azimuth)
+        azimuth = reply_parser.parse_float(await self.send_command("az=?", raw=True))
+        self.record_telemetry(dict(az=azimuth))
+        await self.publish_telemetry(self.csc.tel_azimuth, azimuth=azimuth)
 
     async def move_azimuth(self, position: float):
         """Move the azimuth encoder.
@@ -285,18 +923,69 @@ class CBPComponent:
             Raised when the new value falls outside the accepted range.
 
         """
-        self.assert_in_range("azimuth", position, -45, 45)
+        self.assert_axis_in_range("azimuth", position)
         await self.csc.evt_target.set_write(azimuth=position)
         await self.send_command(f"new_az={position}", await_terminator=False)
 
+    async def move(self, azimuth=None, elevation=None, focus=None, mask_rotation=None):
+        """Move several axes at once.
+
+        The setpoints are sent as one ``;``-separated controller command
+        line, so the axes start together and only one round trip is
+        needed. Axes that are None are not moved.
+
+        Parameters
+        ----------
+        azimuth : `float` or `None`, optional
+            The desired azimuth (degrees).
+        elevation : `float` or `None`, optional
+            The desired elevation (degrees).
+        focus : `int` or `None`, optional
+            The desired focus (microns).
+        mask_rotation : `float` or `None`, optional
+            The desired mask rotation (degrees).
+
+        Raises
+        ------
+        ValueError
+            Raised when no axis is given or a value falls outside
+            the accepted range; no axis is moved.
+        """
+        target = dict()
+        commands = []
+        if azimuth is not None:
+            target["azimuth"] = azimuth
+            commands.append(f"new_az={azimuth}")
+        if elevation is not None:
+            target["elevation"] = elevation
+            commands.append(f"new_alt={elevation}")
+        if focus is not None:
+            target["focus"] = int(focus)
+            commands.append(f"new_foc={int(focus)}")
+        if mask_rotation is not None:
+            target["mask_rotation"] = mask_rotation
+            commands.append(f"new_rot={mask_rotation}")
+        if not commands:
+            raise ValueError("No axis to move.")
+        axes.check_positions(**target)
+
+        await self.csc.evt_inPosition.set_write(**{name: False for name in target})
+        await self.csc.evt_target.set_write(**target)
+        for line in join_commands(commands):
+            await self.send_command(
+                ";".join(line), await_terminator=False, reply_count=len(line)
+            )
+        self.log.debug(f"move command sent: {target}")
+
     async def get_elevation(self):
         """Read and record the mount elevation encoder, in degrees.
 
         Note that the low-level controller calls this axis "altitude".
 
         """
-        elevation = float(await self.send_command("alt=?"))
-        await self.csc.tel_elevation.set_write(elevation=elevation)
+        elevation = reply_parser.parse_float(await self.send_command("alt=?", raw=True))
+        self.record_telemetry(dict(alt=elevation))
+        await self.publish_telemetry(self.csc.tel_elevation, elevation=elevation)
 
     async def move_elevation(self, position: float):
         """Move the elevation encoder.
@@ -312,15 +1001,16 @@ class CBPComponent:
             Raised when the new value falls outside the accepted range.
 
         """
-        self.assert_in_range("elevation", position, -69, 45)
+        self.assert_axis_in_range("elevation", position)
         await self.csc.evt_target.set_write(elevation=position)
         await self.send_command(f"new_alt={position}", await_terminator=False)
         self.log.debug("move_elevation command sent")
 
     async def get_focus(self):
         """Get the focus value."""
-        focus = float(await self.send_command("foc=?"))
-        await self.csc.tel_focus.set_write(focus=focus)
+        focus = reply_parser.parse_float(await self.send_command("foc=?", raw=True))
+        self.record_telemetry(dict(foc=focus))
+        await self.publish_telemetry(self.csc.tel_focus, focus=focus)
 
     async def change_focus(self, position: int):
         """Change focus.
@@ -335,7 +1025,7 @@ class CBPComponent:
         ValueError
             Raised when the new value falls outside the accepted range.
         """
-        self.assert_in_range("focus", position, 0, 13000)
+        self.assert_axis_in_range("focus", position)
         await self.csc.evt_inPosition.set_write(focus=False)
         await self.csc.evt_target.set_write(focus=int(position))
         self.log.debug("Sending new focus position")
@@ -346,11 +1036,17 @@ class CBPComponent:
         """Get mask and mask rotation value."""
         # If mask encoder is off then it will return "9.0" which is unknown
         # mask
-        mask = str(int(float(await self.send_command("msk=?"))))
-        mask = self.masks.get(mask).name
-        mask_rotation = float(await self.send_command("rot=?", log=False))
+        reply = await self.send_command("msk=?", raw=True)
+        mask_value = reply_parser.parse_float(reply)
+        mask = self.masks.get_by_id(mask_value).name
+        mask_rotation = reply_parser.parse_float(
+            await self.send_command("rot=?", log=False, raw=True)
+        )
+        self.record_telemetry(dict(msk=mask_value, rot=mask_rotation))
         self.log.debug(f"get_mask: {mask, mask_rotation}")
-        await self.csc.tel_mask.set_write(mask=mask, mask_rotation=mask_rotation)
+        await self.publish_telemetry(
+            self.csc.tel_mask, mask=mask, mask_rotation=mask_rotation
+        )
         self.log.debug(f"tel_mask in get_mask: {self.csc.tel_mask.data}")
 
     async def set_mask(self, mask: str):
@@ -359,24 +1055,22 @@ class CBPComponent:
         Parameters
         ----------
         mask : `str`
-            This is the name of the mask which is converted to an int using a
-            dictionary.
+            The key of the mask in `masks`, e.g. "1".
 
         Raises
         ------
-        KeyError
-            Raised when new mask is not a key in the dictionary.
+        ValueError
+            Raised when there is no such mask.
 
         """
-        if mask not in list(self.masks.keys()):
+        if mask not in self.masks:
             raise ValueError(f"{mask} not in the allowed list of masks")
+        info = self.masks[mask]
         await self.csc.evt_inPosition.set_write(mask=False)
-        await self.csc.evt_target.set_write(mask=self.masks.get(mask).name)
-        await self.send_command(
-            f"new_msk={self.masks.get(mask).id}", await_terminator=False
-        )
+        await self.csc.evt_target.set_write(mask=info.name)
+        await self.send_command(f"new_msk={info.id}", await_terminator=False)
 
-        init_mask_rotation = self.masks.get(mask).rotation
+        init_mask_rotation = info.rotation
         self.log.debug(init_mask_rotation)
         await self.set_mask_rotation(mask_rotation=float(init_mask_rotation))
         self.log.debug(
@@ -397,7 +1091,7 @@ class CBPComponent:
             Raised when the new value falls outside the accepted range.
 
         """
-        self.assert_in_range("mask_rotation", mask_rotation, 0, 360)
+        self.assert_axis_in_range("mask_rotation", mask_rotation)
         await self.csc.evt_inPosition.set_write(mask_rotation=False)
         await self.csc.evt_target.set_write(mask_rotation=mask_rotation)
 
@@ -407,9 +1101,19 @@ class CBPComponent:
 
     async def check_park(self):
         """Get the park variable from CBP."""
-        parked = bool(int(float(await self.send_command("park=?", log=False))))
-        autoparked = bool(int(float(await self.send_command("autopark=?", log=False))))
-        await self.csc.tel_parked.set_write(parked=parked, autoparked=autoparked)
+        if self.batch_query:
+            await self.read_telemetry(PARK_VARIABLES)
+            return
+        parked = reply_parser.parse_bool(
+            await self.send_command("park=?", log=False, raw=True)
+        )
+        autoparked = reply_parser.parse_bool(
+            await self.send_command("autopark=?", log=False, raw=True)
+        )
+        self.record_telemetry(dict(park=parked, autopark=autoparked))
+        await self.publish_telemetry(
+            self.csc.tel_parked, parked=parked, autoparked=autoparked
+        )
 
     async def set_park(self):
         """Park the CBP."""
@@ -423,13 +1127,39 @@ class CBPComponent:
 
     async def check_cbp_status(self):
         """Read and record the status of the encoders."""
-        panic = bool(int(float(await self.send_command("wdpanic=?", log=False))))
-        azimuth = bool(int(float(await self.send_command("AAstat=?", log=False))))
-        elevation = bool(int(float(await self.send_command("ABstat=?", log=False))))
-        mask = bool(int(float(await self.send_command("ACstat=?", log=False))))
-        mask_rotation = bool(int(float(await self.send_command("ADstat=?", log=False))))
-        focus = bool(int(float(await self.send_command("AEstat=?", log=False))))
-        await self.csc.tel_status.set_write(
+        if self.batch_query:
+            await self.read_telemetry(STATUS_VARIABLES)
+            return
+        panic = reply_parser.parse_bool(
+            await self.send_command("wdpanic=?", log=False, raw=True)
+        )
+        azimuth = reply_parser.parse_bool(
+            await self.send_command("AAstat=?", log=False, raw=True)
+        )
+        elevation = reply_parser.parse_bool(
+            await self.send_command("ABstat=?", log=False, raw=True)
+        )
+        mask = reply_parser.parse_bool(
+            await self.send_command("ACstat=?", log=False, raw=True)
+        )
+        mask_rotation = reply_parser.parse_bool(
+            await self.send_command("ADstat=?", log=False, raw=True)
+        )
+        focus = reply_parser.parse_bool(
+            await self.send_command("AEstat=?", log=False, raw=True)
+        )
+        self.record_telemetry(
+            dict(
+                wdpanic=panic,
+                AAstat=azimuth,
+                ABstat=elevation,
+                ACstat=mask,
+                ADstat=mask_rotation,
+                AEstat=focus,
+            )
+        )
+        await self.publish_telemetry(
+            self.csc.tel_status,
             panic=panic,
             azimuth=azimuth,
             elevation=elevation,
@@ -440,6 +1170,9 @@ class CBPComponent:
 
     async def get_cbp_telemetry(self):
         """Get the position data of the CBP."""
+        if self.batch_query:
+            await self.read_telemetry(POSITION_VARIABLES)
+            return
         await self.get_elevation()
         await self.get_azimuth()
         await self.get_focus()
@@ -454,24 +1187,150 @@ class CBPComponent:
         """
         self.host = config.address
         self.port = config.port
-        self.masks["1"].name = config.mask1["name"]
-        self.masks["1"].rotation = config.mask1["rotation"]
-        self.masks["2"].name = config.mask2["name"]
-        self.masks["2"].rotation = config.mask2["rotation"]
-        self.masks["3"].name = config.mask3["name"]
-        self.masks["3"].rotation = config.mask3["rotation"]
-        self.masks["4"].name = config.mask4["name"]
-        self.masks["4"].rotation = config.mask4["rotation"]
-        self.masks["5"].name = config.mask5["name"]
-        self.masks["5"].rotation = config.mask5["rotation"]
+        self.batch_query = config.batch_query
+        self.deadbands = dict(
+            azimuth=config.position_deadband,
+            elevation=config.position_deadband,
+            focus=config.focus_deadband,
+            mask_rotation=config.mask_rotation_deadband,
+        )
+        self.heartbeat_interval = config.telemetry_heartbeat_interval
+        self.probe_interval = config.connection_probe_interval
+        self.reconnect_timeout = config.reconnect_timeout
+        self.statistics_interval = config.command_statistics_interval
+        if self.statistics_interval > 0:
+            if self.command_statistics is None:
+                self.command_statistics = instrumentation.CommandStatistics()
+        else:
+            self.command_statistics = None
+        self.close_recorder()
+        if config.telemetry_record_path:
+            self.recorder = recorder.TelemetryRecorder(
+                path=config.telemetry_record_path,
+                capacity=config.telemetry_record_capacity,
+            )
+        self.close_trace()
+        if config.trace_path:
+            self.trace_writer = capture.TraceWriter(
+                path=config.trace_path,
+                max_size=config.trace_max_size,
+                backup_count=config.trace_backup_count,
+            )
+        self.masks = mask_registry.MaskRegistry.from_config(config)
+
+    async def write_telemetry(self, values):
+        """Publish telemetry from controller variable values.
+
+        Parameters
+        ----------
+        values : `dict` [`str`, `float`]
+            Controller variable values, keyed by variable name.
+            Only topics for which all variables are present are written.
+        """
+        if all(name in values for name in STATUS_VARIABLES):
+            await self.publish_telemetry(
+                self.csc.tel_status,
+                panic=bool(int(values["wdpanic"])),
+                azimuth=bool(int(values["AAstat"])),
+                elevation=bool(int(values["ABstat"])),
+                mask=bool(int(values["ACstat"])),
+                mask_rotation=bool(int(values["ADstat"])),
+                focus=bool(int(values["AEstat"])),
+            )
+        if all(name in values for name in PARK_VARIABLES):
+            await self.publish_telemetry(
+                self.csc.tel_parked,
+                parked=bool(int(values["park"])),
+                autoparked=bool(int(values["autopark"])),
+            )
+        if "alt" in values:
+            await self.publish_telemetry(
+                self.csc.tel_elevation, elevation=values["alt"]
+            )
+        if "az" in values:
+            await self.publish_telemetry(self.csc.tel_azimuth, azimuth=values["az"])
+        if "foc" in values:
+            await self.publish_telemetry(self.csc.tel_focus, focus=values["foc"])
+        if "msk" in values and "rot" in values:
+            # If mask encoder is off then it will return 9 which is unknown
+            # mask
+            await self.publish_telemetry(
+                self.csc.tel_mask,
+                mask=self.masks.get_by_id(values["msk"]).name,
+                mask_rotation=values["rot"],
+            )
+
+    def record_telemetry(self, values):
+        """Record controller variable values with `recorder`, if any.
+
+        Parameters
+        ----------
+        values : `dict` [`str`, `float`]
+            Controller variable values, keyed by variable name.
+        """
+        if self.recorder is not None:
+            self.recorder.record(values)
+
+    def close_recorder(self):
+        """Close `recorder`, if any."""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def close_trace(self):
+        """Close `trace_writer`, if any."""
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            self.trace_writer = None
+
+    async def read_telemetry(self, variables):
+        """Read controller variables with `query_variables` and publish
+        the telemetry topics they fill.
+
+        Parameters
+        ----------
+        variables : `tuple` [`str`]
+            The names of the controller variables.
+        """
+        values = dict(zip(variables, await self.query_variables(*variables)))
+        self.record_telemetry(values)
+        await self.write_telemetry(values)
+
+    async def update_positions(self):
+        """Read the encoder positions and update the inPosition event."""
+        await self.get_cbp_telemetry()
+        await self.update_in_position()
 
     async def update_status(self):
         """Update the status."""
-        await self.check_cbp_status()
-        await self.check_park()
-        await self.get_cbp_telemetry()
+        if self.batch_query:
+            await self.read_telemetry(
+                STATUS_VARIABLES + PARK_VARIABLES + POSITION_VARIABLES
+            )
+        else:
+            await self.check_cbp_status()
+            await self.check_park()
+            await self.get_cbp_telemetry()
         await self.update_in_position()
 
+    def assert_axis_in_range(self, name, value):
+        """Raise ValueError if a position is outside the limits of its axis.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the axis, as in `AXES`.
+        value : `float`
+            The position.
+
+        Raises
+        ------
+        ValueError
+            Raised when the position is outside the limits of the axis.
+        """
+        axis = axes.AXES[name]
+        self.assert_in_range(name, value, axis.min_position, axis.max_position)
+
     def assert_in_range(self, name, value, min_value, max_value):
         """Raise ValueError if a value is out of range.
 
@@ -495,3 +1354,61 @@ class CBPComponent:
             raise ValueError(
                 f"{name} = {value} not in range [{min_value}, {max_value}]"
             )
+
+
+def join_commands(commands):
+    """Group commands into as few ``;``-separated command lines
+    as possible.
+
+    Parameters
+    ----------
+    commands : `list` [`str`]
+        The commands.
+
+    Returns
+    -------
+    lines : `list` [`list` [`str`]]
+        The commands, split into groups that each fit in one command line.
+    """
+    lines = []
+    line = []
+    length = -1
+    for command in commands:
+        if line and length + len(command) + 1 > MAX_COMMAND_LENGTH:
+            lines.append(line)
+            line = []
+            length = -1
+        line.append(command)
+        length += len(command) + 1
+    if line:
+        lines.append(line)
+    return lines
+
+
+def split_query(variables):
+    """Split controller variables into groups that each fit in one ``MG``
+    command line.
+
+    Parameters
+    ----------
+    variables : `list` [`str`]
+        The names of the controller variables.
+
+    Returns
+    -------
+    chunks : `list` [`list` [`str`]]
+        The variables, split into groups.
+    """
+    chunks = []
+    chunk = []
+    length = len("MG ")
+    for name in variables:
+        if chunk and length + len(name) + 1 > MAX_COMMAND_LENGTH:
+            chunks.append(chunk)
+            chunk = []
+            length = len("MG ")
+        chunk.append(name)
+        length += len(name) + 1
+    if chunk:
+        chunks.append(chunk)
+    return chunks
@@ -40,6 +40,210 @@ properties:
     description: Network port of CBP
     type: integer
     default: 9999
+  batch_query:
+    description: >-
+      Read the telemetry variables with a few MG commands
+      instead of one command per variable.
+    type: boolean
+    default: true
+  moving_telemetry_interval:
+    description: >-
+      Interval between telemetry updates (seconds)
+      while any axis is not in position.
+    type: number
+    exclusiveMinimum: 0
+    default: 0.05
+  idle_telemetry_interval:
+    description: >-
+      Interval between telemetry updates (seconds)
+      while all axes are in position, parked or not.
+    type: number
+    exclusiveMinimum: 0
+    default: 0.5
+  status_telemetry_interval:
+    description: >-
+      Interval between reads (seconds) of the encoder status
+      and panic flag.
+    type: number
+    exclusiveMinimum: 0
+    default: 0.5
+  park_telemetry_interval:
+    description: Interval between reads (seconds) of the park state.
+    type: number
+    exclusiveMinimum: 0
+    default: 2
+  telemetry_heartbeat_interval:
+    description: >-
+      Maximum interval (seconds) between writes of a telemetry topic.
+      Between heartbeats a topic is only written if a value changed
+      by more than its deadband.
+    type: number
+    exclusiveMinimum: 0
+    default: 2
+  position_deadband:
+    description: Deadband (degrees) of the azimuth and elevation telemetry.
+    type: number
+    minimum: 0
+    default: 0.001
+  focus_deadband:
+    description: Deadband (microns) of the focus telemetry.
+    type: number
+    minimum: 0
+    default: 1
+  mask_rotation_deadband:
+    description: Deadband (degrees) of the mask rotation telemetry.
+    type: number
+    minimum: 0
+    default: 0.01
+  connection_probe_interval:
+    description: >-
+      If nothing is received from the controller for this long (seconds),
+      send a probe to check that the connection is alive.
+    type: number
+    exclusiveMinimum: 0
+    default: 2
+  reconnect_timeout:
+    description: >-
+      How long (seconds) to try reconnecting to the controller
+      after the connection is lost, before going to fault.
+    type: number
+    minimum: 0
+    default: 5
+  command_statistics_interval:
+    description: >-
+      Interval (seconds) between logging the round-trip time statistics
+      of the commands sent to the controller. The statistics are reset
+      after each log message. If 0, the statistics are not recorded.
+    type: number
+    minimum: 0
+    default: 0
+  azimuth_speed:
+    description: >-
+      Speed (degrees/second) of the azimuth axis of the CBP, used to predict
+      motion times and so motion timeouts. Err on the slow side: a value
+      faster than the hardware makes motions time out. The defaults of the
+      axis speeds are not measured; each is the slowest speed consistent
+      with the fixed 20 second timeouts the CSC used before it predicted
+      motion times. Here, the full 90 degree range in 20 seconds.
+    type: number
+    exclusiveMinimum: 0
+    default: 4.5
+  elevation_speed:
+    description: >-
+      Speed (degrees/second) of the elevation axis of the CBP;
+      the default is the full 114 degree range in 20 seconds.
+    type: number
+    exclusiveMinimum: 0
+    default: 5.7
+  focus_speed:
+    description: >-
+      Speed (microns/second) of the focus axis of the CBP;
+      the default is the full 13000 micron range in 20 seconds.
+    type: number
+    exclusiveMinimum: 0
+    default: 650
+  mask_speed:
+    description: >-
+      Speed (masks/second) of the mask selector of the CBP;
+      the default is 20 seconds per mask, as allowed by the former
+      fixed mask change timeout.
+    type: number
+    exclusiveMinimum: 0
+    default: 0.05
+  mask_rotation_speed:
+    description: >-
+      Speed (degrees/second) of the mask rotation axis of the CBP;
+      the default is the longest rotation, 180 degrees the short way
+      around, in 20 seconds.
+    type: number
+    exclusiveMinimum: 0
+    default: 9
+  motion_timeout_scale:
+    description: >-
+      The time to wait for a motion to finish is the motion time predicted
+      from the axis speeds times this factor, plus motion_timeout_margin.
+    type: number
+    exclusiveMinimum: 0
+    default: 2
+  motion_timeout_margin:
+    description: >-
+      Time (seconds) added to the scaled predicted motion time to get
+      the time to wait for a motion to finish.
+    type: number
+    minimum: 0
+    default: 5
+  telemetry_record_path:
+    description: >-
+      File in which to record every read of the controller variables,
+      as a ring of fixed-size binary records; see TelemetryRecorder.
+      A relative path is relative to the working directory of the CSC.
+      If blank, nothing is recorded.
+    type: string
+    default: ""
+  telemetry_record_capacity:
+    description: >-
+      Number of records kept in telemetry_record_path;
+      once full, the oldest records are overwritten.
+    type: integer
+    minimum: 1
+    default: 100000
+  trace_path:
+    description: >-
+      File in which to record the traffic with the controller: every
+      command line and reply, with nanosecond timestamps; see TraceWriter.
+      Summarize it with summarize_trace, or replay it in simulation mode 2.
+      A relative path is relative to the working directory of the CSC.
+      If blank, nothing is recorded.
+    type: string
+    default: ""
+  trace_max_size:
+    description: >-
+      Size at which trace_path is rotated to trace_path.1, trace_path.1
+      to trace_path.2 and so on (bytes). If 0, it is not rotated.
+    type: integer
+    minimum: 0
+    default: 100000000
+  trace_backup_count:
+    description: >-
+      Number of rotated trace files to keep.
+    type: integer
+    minimum: 0
+    default: 5
+  replay_path:
+    description: >-
+      File of recorded controller traffic to serve in simulation mode 2:
+      a trace file (see TraceWriter) or a telemetry_record_path file.
+      A relative path is relative to the working directory of the CSC.
+    type: string
+    default: ""
+  replay_speed:
+    description: >-
+      How fast to replay replay_path compared to the recording,
+      e.g. 10 for 10 times faster.
+    type: number
+    exclusiveMinimum: 0
+    default: 1
+  grid:
+    description: >-
+      Default pointing grid for CBPCSC.run_sequence.
+      Axes that are omitted are left unchanged.
+    type: array
+    default: []
+    items:
+      type: object
+      properties:
+        azimuth:
+          type: number
+        elevation:
+          type: number
+        focus:
+          type: number
+        mask:
+          type: string
+        mask_rotation:
+          type: number
+      required: [azimuth, elevation]
+      additionalProperties: false
   mask1:
     description: Mask 1 of CBP
     type: object
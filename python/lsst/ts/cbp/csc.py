@@ -21,10 +21,22 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 import asyncio
+import inspect
+import time
+import types
 
 from lsst.ts import salobj, utils
 
-from . import __version__, component, mock_server
+from . import (
+    __version__,
+    component,
+    instrumentation,
+    mock_server,
+    planner,
+    replay,
+    sequence,
+)
+from .axes import AXES
 from .config_schema import CONFIG_SCHEMA
 from .enums import ErrorCode
 
@@ -45,6 +57,8 @@ class CBPCSC(salobj.ConfigurableCsc):
 
         * 0: normal operation
         * 1: mock controller
+        * 2: replay of recorded controller traffic, from the file
+          ``replay_path`` of the configuration; see `ReplayServer`
     initial_state : `lsst.ts.salobj.State`, optional
         Initial state is meant for unit tests, defaults to
         `lsst.ts.salobj.State.STANDBY`
@@ -53,20 +67,62 @@ class CBPCSC(salobj.ConfigurableCsc):
         Tells the CSC where to look for the configuration files.
         Normal operation will always be in a configuration repository returned
         `get_config_dir`.
+    simulator_settings : `dict` or `None`, optional
+        Keyword arguments for the `MockServer` made in simulation mode 1,
+        e.g. ``dict(fast=True, seed=1)``, or for the `ReplayServer` made
+        in simulation mode 2, which override the configuration.
+        Meant for unit tests.
 
     Attributes
     ----------
 
     component : `CBPComponent`
-    simulator : `None` or `MockServer`
+    simulator : `None` or `MockServer` or `ReplayServer`
+    simulator_settings : `dict`
+        Keyword arguments for `MockServer` or `ReplayServer`.
     telemetry_task : `asyncio.Future`
+        Task running `telemetry`, which runs one poller per group of
+        telemetry.
     telemetry_interval : `float`
-        The interval that telemetry is published.
+        The current interval between telemetry updates:
+        ``moving_telemetry_interval`` while any axis is moving,
+        else ``idle_telemetry_interval``.
+    moving_telemetry_interval : `float`
+        The interval between telemetry updates while any axis is moving.
+    idle_telemetry_interval : `float`
+        The interval between telemetry updates while all axes are
+        in position, whether or not the CBP is parked.
+    status_telemetry_interval : `float`
+        The interval between reads of the encoder status and panic flag.
+    park_telemetry_interval : `float`
+        The interval between reads of the park state.
+    telemetry_wakeup : `asyncio.Event`
+        Set to end the current telemetry sleep early, e.g. when a
+        motion command is sent.
     in_position_timeout : `int`
-        The time to wait for all encoders of the CBP to be in position.
+        The time to wait for all encoders of the CBP to be in position,
+        for commands whose motion time is not predicted (park and unpark).
+    motion_timeout_scale : `float`
+        The time to wait for the axes to be in position is the predicted
+        motion time times ``motion_timeout_scale``, plus
+        ``motion_timeout_margin``.
+    motion_timeout_margin : `float`
+        See ``motion_timeout_scale`` (seconds).
+    axis_speeds : `dict` [`str`, `float`]
+        The speed of each axis of the CBP (position units/second),
+        keyed by axis name, from which motion times are predicted.
+    command_timings : `CommandTimings`
+        Histograms of the time taken by each phase of the motion commands,
+        e.g. ``command_timings.summary("move.")``.
+    grid : `list` [`dict`]
+        The default pointing grid of `run_sequence`, from the configuration.
+    replay_path : `str`
+        The file replayed in simulation mode 2, from the configuration.
+    replay_speed : `float`
+        How fast to replay the file compared to the recording.
     """
 
-    valid_simulation_modes = (0, 1)
+    valid_simulation_modes = (0, 1, 2)
     """The valid simulation modes for the CBP."""
     version = __version__
 
@@ -75,6 +131,7 @@ class CBPCSC(salobj.ConfigurableCsc):
         simulation_mode=0,
         initial_state: salobj.State = salobj.State.STANDBY,
         config_dir=None,
+        simulator_settings=None,
     ):
         super().__init__(
             name="CBP",
@@ -86,10 +143,23 @@ class CBPCSC(salobj.ConfigurableCsc):
         )
         self.component = component.CBPComponent(self, log=self.log)
         self.simulator = None
+        self.simulator_settings = (
+            dict() if simulator_settings is None else simulator_settings
+        )
         self.telemetry_task = utils.make_done_future()
-        self.telemetry_interval = 0.5
+        self.moving_telemetry_interval = 0.05
+        self.idle_telemetry_interval = 0.5
+        self.status_telemetry_interval = 0.5
+        self.park_telemetry_interval = 2
+        self.telemetry_wakeup = asyncio.Event()
         self.in_position_timeout = 20
-        self.mask_timeout = 90  # 20 sec per mask.
+        self.motion_timeout_scale = 2
+        self.motion_timeout_margin = 5
+        self.axis_speeds = {name: axis.speed for name, axis in AXES.items()}
+        self.command_timings = instrumentation.CommandTimings()
+        self.grid = []
+        self.replay_path = ""
+        self.replay_speed = 1
         self.log.info("CBP CSC initialized")
 
     async def do_move(self, data):
@@ -102,39 +172,111 @@ class CBPCSC(salobj.ConfigurableCsc):
         """
         self.log.debug("Begin move")
         self.assert_enabled("move")
-        await self.evt_inPosition.set_write(azimuth=False, elevation=False)
-        await asyncio.gather(
-            self.component.move_elevation(data.elevation),
-            self.component.move_azimuth(data.azimuth),
+        timing = self.command_timings.start("move")
+        predicted = self.predict_motion_time(
+            azimuth=data.azimuth, elevation=data.elevation
         )
+        await self.component.move(azimuth=data.azimuth, elevation=data.elevation)
+        timing.mark_sent()
 
         self.log.debug("Waiting for in-position")
-        await asyncio.wait_for(self.in_position(), self.in_position_timeout)
+        await self.wait_in_position(
+            self.get_motion_timeout(predicted),
+            timing=timing,
+            axes=("azimuth", "elevation"),
+            predicted=predicted,
+        )
 
     async def telemetry(self):
-        """Publish the updated telemetry."""
+        """Publish the updated telemetry.
+
+        Each group of controller variables is polled by its own task:
+        the positions at `telemetry_interval`, the encoder status
+        (including the panic flag) at ``status_telemetry_interval``
+        and the park state at ``park_telemetry_interval``.
+        """
+        pollers = [
+            asyncio.create_task(
+                self.poll_telemetry(
+                    name="positions",
+                    update=self.component.update_positions,
+                    get_interval=lambda: self.telemetry_interval,
+                    wakeup=self.telemetry_wakeup,
+                )
+            ),
+            asyncio.create_task(
+                self.poll_telemetry(
+                    name="status",
+                    update=self.check_panic,
+                    get_interval=lambda: self.status_telemetry_interval,
+                )
+            ),
+            asyncio.create_task(
+                self.poll_telemetry(
+                    name="park",
+                    update=self.component.check_park,
+                    get_interval=lambda: self.park_telemetry_interval,
+                )
+            ),
+        ]
+        try:
+            await asyncio.gather(*pollers)
+        finally:
+            for poller in pollers:
+                poller.cancel()
+
+    async def poll_telemetry(self, name, update, get_interval, wakeup=None):
+        """Periodically update one group of telemetry.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the group, for log messages.
+        update : `coroutine`
+            Function that reads and publishes the telemetry.
+        get_interval : `callable`
+            Function that returns the interval between updates (seconds).
+        wakeup : `asyncio.Event` or `None`, optional
+            If not None, setting this event ends the current sleep early.
+        """
         while True:
             try:
-                self.log.debug("Begin sending telemetry")
-                await self.component.update_status()
-                if self.component.status.panic:
-                    await self.fault(
-                        ErrorCode.PANICKED,
-                        "CBP Panicked. Check hardware and reset device.",
-                    )
-                    return
+                self.log.debug(f"Begin sending {name} telemetry")
+                await update()
             except asyncio.CancelledError:
                 raise
             except Exception:
-                self.log.exception("Telemetry loop failed")
+                if self.component.reconnecting:
+                    # The component goes to fault if reconnecting fails.
+                    self.log.warning(f"{name} telemetry skipped while reconnecting")
+                    await asyncio.sleep(get_interval())
+                    continue
+                self.log.exception(f"Telemetry loop for {name} failed")
                 await self.fault(
                     code=ErrorCode.TELEMETRY_LOOP_FAILED,
                     report="Telemetry loop failed.",
                 )
                 return
 
-            self.log.debug("Telemetry loop cycle completed")
-            await asyncio.sleep(self.telemetry_interval)
+            self.log.debug(f"Telemetry loop cycle for {name} completed")
+            if wakeup is None:
+                await asyncio.sleep(get_interval())
+                continue
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), get_interval())
+            except asyncio.TimeoutError:
+                pass
+
+    async def check_panic(self):
+        """Read the encoder status and go to fault if the CBP panicked."""
+        await self.component.check_cbp_status()
+        if self.component.status.panic:
+            # Going to fault cancels the telemetry task.
+            await self.fault(
+                ErrorCode.PANICKED,
+                "CBP Panicked. Check hardware and reset device.",
+            )
 
     async def do_setFocus(self, data):
         """Sets the focus.
@@ -145,8 +287,16 @@ class CBPCSC(salobj.ConfigurableCsc):
 
         """
         self.assert_enabled("setFocus")
+        timing = self.command_timings.start("setFocus")
+        predicted = self.predict_motion_time(focus=data.focus)
         await self.component.change_focus(data.focus)
-        await asyncio.wait_for(self.in_position(), self.in_position_timeout)
+        timing.mark_sent()
+        await self.wait_in_position(
+            self.get_motion_timeout(predicted),
+            timing=timing,
+            axes=("focus",),
+            predicted=predicted,
+        )
 
     async def do_park(self, data):
         """Park the CBP.
@@ -157,8 +307,10 @@ class CBPCSC(salobj.ConfigurableCsc):
 
         """
         self.assert_enabled("park")
+        timing = self.command_timings.start("park")
         await self.component.set_park()
-        await asyncio.wait_for(self.in_position(), self.in_position_timeout)
+        timing.mark_sent()
+        await self.wait_in_position(self.in_position_timeout, timing=timing)
 
     async def do_unpark(self, data):
         """Unpark the CBP.
@@ -168,8 +320,10 @@ class CBPCSC(salobj.ConfigurableCsc):
         data : `cmd_unpark.DataType`
         """
         self.assert_enabled("unpark")
+        timing = self.command_timings.start("unpark")
         await self.component.set_unpark()
-        await asyncio.wait_for(self.in_position(), self.in_position_timeout)
+        timing.mark_sent()
+        await self.wait_in_position(self.in_position_timeout, timing=timing)
 
     async def do_changeMask(self, data):
         """Changes the mask.
@@ -180,8 +334,22 @@ class CBPCSC(salobj.ConfigurableCsc):
 
         """
         self.assert_enabled("changeMask")
-        await self.component.set_mask(str(data.mask))
-        await asyncio.wait_for(self.in_position(), self.mask_timeout)
+        timing = self.command_timings.start("changeMask")
+        start = self.get_current_point()
+        mask = str(data.mask)
+        await self.component.set_mask(mask)
+        timing.mark_sent()
+        predicted = self.predict_motion_time(
+            start=start,
+            mask=mask,
+            mask_rotation=self.component.masks[mask].rotation,
+        )
+        await self.wait_in_position(
+            self.get_motion_timeout(predicted),
+            timing=timing,
+            axes=("mask", "mask_rotation"),
+            predicted=predicted,
+        )
 
     async def do_changeMaskRotation(self, data):
         """Changes the mask rotation variable and moves the
@@ -193,18 +361,196 @@ class CBPCSC(salobj.ConfigurableCsc):
 
         """
         self.assert_enabled("changeMaskRotation")
+        timing = self.command_timings.start("changeMaskRotation")
+        predicted = self.predict_motion_time(mask_rotation=data.mask_rotation)
         await self.component.set_mask_rotation(data.mask_rotation)
-        await asyncio.wait_for(self.in_position(), self.mask_timeout)
+        timing.mark_sent()
+        await self.wait_in_position(
+            self.get_motion_timeout(predicted),
+            timing=timing,
+            axes=("mask_rotation",),
+            predicted=predicted,
+        )
+
+    async def run_sequence(self, points=None, path=None, reorder=True, callback=None):
+        """Move through a pointing grid.
+
+        Each point is sent with one combined move and the next point
+        is sent as soon as the inPosition event reports that all axes
+        are in position.
+
+        Parameters
+        ----------
+        points : `list` [`types.SimpleNamespace`] or `None`, optional
+            The points, as returned by `make_point`. If None, read them
+            from ``path``, or use the configured `grid` if that is
+            also None.
+        path : `str` or `pathlib.Path` or `None`, optional
+            A YAML file holding the points; see `load_grid`.
+        reorder : `bool`, optional
+            If true, visit the points in the order chosen by
+            `plan_order` rather than the order given. Axes that a point
+            leaves unchanged are first set by `resolve_points`.
+        callback : `callable` or `None`, optional
+            Function called after each point with a
+            `types.SimpleNamespace` holding ``index``, ``count``,
+            ``point`` and ``duration`` (seconds). It may be a coroutine.
+
+        Returns
+        -------
+        points : `list` [`types.SimpleNamespace`]
+            The points, in the order they were visited.
+
+        Raises
+        ------
+        salobj.ExpectedError
+            Raised when the CSC is not enabled.
+        ValueError
+            Raised when any point is out of range or has no such mask;
+            nothing is moved.
+        asyncio.TimeoutError
+            Raised when the axes do not get in position in time.
+        """
+        self.assert_enabled("run_sequence")
+        if points is None:
+            if path is not None:
+                points = sequence.load_grid(path)
+            else:
+                points = [sequence.make_point(**item) for item in self.grid]
+        sequence.check_points(points, masks=self.component.masks)
+        start = self.get_current_point()
+        if reorder:
+            # Fix the axes that points leave unchanged before reordering,
+            # so each point is visited at the position it would have
+            # in the given order.
+            points = planner.resolve_points(points, start=start)
+            order, duration = planner.plan_order(
+                points, start=start, speeds=self.axis_speeds
+            )
+            points = [points[i] for i in order]
+        else:
+            duration = planner.predict_duration(
+                points, start=start, speeds=self.axis_speeds
+            )
+        self.log.info(
+            f"Begin sequence of {len(points)} points; "
+            f"predicted slew time {duration:0.1f} seconds"
+        )
+        for index, point in enumerate(points):
+            timing = self.command_timings.start("sequence")
+            predicted = self.predict_motion_time(**vars(point))
+            axes = ["azimuth", "elevation"]
+            if (
+                point.mask is not None
+                and self.component.masks[point.mask].name != self.component.mask
+            ):
+                await self.component.set_mask(point.mask)
+                axes += ["mask", "mask_rotation"]
+            await self.component.move(
+                azimuth=point.azimuth,
+                elevation=point.elevation,
+                focus=point.focus,
+                mask_rotation=point.mask_rotation,
+            )
+            timing.mark_sent()
+            await self.wait_in_position(
+                self.get_motion_timeout(predicted),
+                timing=timing,
+                axes=axes,
+                predicted=predicted,
+            )
+            duration = timing.end_time - timing.start_time
+            self.log.info(
+                f"Sequence point {index + 1} of {len(points)} done "
+                f"in {duration:0.2f} seconds: {point}"
+            )
+            if callback is not None:
+                result = callback(
+                    types.SimpleNamespace(
+                        index=index, count=len(points), point=point, duration=duration
+                    )
+                )
+                if inspect.isawaitable(result):
+                    await result
+        self.log.info("Sequence finished")
+        return points
+
+    def predict_motion_time(self, start=None, **target):
+        """Predict how long the axes take to move to a target.
+
+        Parameters
+        ----------
+        start : `types.SimpleNamespace` or `None`, optional
+            The starting position, as returned by `get_current_point`.
+            If None, use the current position. A target axis whose
+            starting position is unknown (None) is assumed to start
+            as far as possible from its target.
+        **target
+            The target positions, keyed by axis name as in `make_point`;
+            axes that are omitted or None do not move.
+
+        Returns
+        -------
+        predicted : `float`
+            The predicted motion time (seconds).
+        """
+        if start is None:
+            start = self.get_current_point()
+        start = types.SimpleNamespace(**vars(start))
+        end = types.SimpleNamespace(**vars(start))
+        for name, value in target.items():
+            if value is None:
+                continue
+            if getattr(start, name) is None:
+                # E.g. the mask encoder is off, or not read yet.
+                setattr(start, name, AXES[name].get_farthest_position(value))
+            setattr(end, name, value)
+        return planner.predict_duration([end], start=start, speeds=self.axis_speeds)
+
+    def get_motion_timeout(self, predicted):
+        """Return the time to wait for a motion to finish.
+
+        Parameters
+        ----------
+        predicted : `float`
+            The predicted motion time (seconds).
+
+        Returns
+        -------
+        timeout : `float`
+            The timeout (seconds).
+        """
+        return predicted * self.motion_timeout_scale + self.motion_timeout_margin
+
+    def get_current_point(self):
+        """Return the current position as a point of a pointing grid.
+
+        Returns
+        -------
+        point : `types.SimpleNamespace`
+            The current position, as returned by `make_point`; None for
+            axes whose position is unknown, e.g. the mask when its encoder
+            is off or before the first telemetry read.
+        """
+        masks = self.component.masks
+        info = masks.get_by_name(self.component.mask)
+        return sequence.make_point(
+            azimuth=self.component.azimuth,
+            elevation=self.component.elevation,
+            focus=self.component.focus,
+            mask=None if info is None or info is masks.unknown else info.key,
+            mask_rotation=self.component.mask_rotation,
+        )
 
     async def handle_summary_state(self):
         """Handle the summary state."""
         if self.disabled_or_enabled:
             if self.simulation_mode and self.simulator is None:
-                self.simulator = mock_server.MockServer()
+                self.simulator = self.make_simulator()
                 await self.simulator.start_task
                 self.component.host = self.simulator.host
                 self.component.port = self.simulator.port
-            if not self.component.connected:
+            if not self.component.connected and not self.component.reconnecting:
                 try:
                     await self.component.connect()
                 except Exception:
@@ -228,6 +574,7 @@ class CBPCSC(salobj.ConfigurableCsc):
                 await self.component.set_unpark()
         else:
             self.telemetry_task.cancel()
+            self.log_command_timings()
             await self.component.disconnect()
             if self.simulator is not None:
                 await self.simulator.close()
@@ -241,8 +588,43 @@ class CBPCSC(salobj.ConfigurableCsc):
         config : `types.SimpleNamespace`
         """
         self.log.debug("We do configure indeed")
+        self.moving_telemetry_interval = config.moving_telemetry_interval
+        self.idle_telemetry_interval = config.idle_telemetry_interval
+        self.status_telemetry_interval = config.status_telemetry_interval
+        self.park_telemetry_interval = config.park_telemetry_interval
+        self.motion_timeout_scale = config.motion_timeout_scale
+        self.motion_timeout_margin = config.motion_timeout_margin
+        self.axis_speeds = {name: getattr(config, f"{name}_speed") for name in AXES}
+        self.grid = config.grid
+        self.replay_path = config.replay_path
+        self.replay_speed = config.replay_speed
         self.component.configure(config)
 
+    def make_simulator(self):
+        """Make the simulated controller for the simulation mode.
+
+        Returns
+        -------
+        simulator : `MockServer` or `ReplayServer`
+            The simulator, starting.
+
+        Raises
+        ------
+        lsst.ts.salobj.ExpectedError
+            Raised in simulation mode 2 when there is no file to replay.
+        """
+        if self.simulation_mode == 1:
+            return mock_server.MockServer(**self.simulator_settings)
+        settings = dict(
+            dict(path=self.replay_path, speed=self.replay_speed, log=self.log),
+            **self.simulator_settings,
+        )
+        if not settings["path"]:
+            raise salobj.ExpectedError(
+                "Simulation mode 2 requires replay_path in the configuration."
+            )
+        return replay.ReplayServer(**settings)
+
     @staticmethod
     def get_config_pkg():
         """Return the name of the configuration repository."""
@@ -251,21 +633,102 @@ class CBPCSC(salobj.ConfigurableCsc):
     async def close_tasks(self):
         await super().close_tasks()
         self.telemetry_task.cancel()
+        self.log_command_timings()
         await self.component.disconnect()
+        self.component.close_recorder()
+        self.component.close_trace()
         if self.simulator is not None:
             await self.simulator.close()
             self.simulator = None
 
-    async def in_position(self):
+    async def wait_in_position(self, timeout, timing=None, axes=(), predicted=None):
+        """Speed up telemetry and wait for all axes to be in position.
+
+        Parameters
+        ----------
+        timeout : `float`
+            The maximum time to wait (seconds).
+        timing : `CommandTiming` or `None`, optional
+            If not None, the timing of the command, which is finished
+            and recorded in `command_timings` once all axes are in position.
+        axes : `tuple` [`str`], optional
+            The axes moved by the command, whose time to get in position
+            is recorded in ``timing``.
+        predicted : `float` or `None`, optional
+            If not None, the predicted motion time (seconds), which is
+            logged along with the actual time.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            Raised when the axes are not in position in time.
+        """
+        self.telemetry_wakeup.set()
+        start_time = time.monotonic()
+        await asyncio.wait_for(self.in_position(timing=timing, axes=axes), timeout)
+        if predicted is not None:
+            actual = time.monotonic() - start_time
+            name = "Motion" if timing is None else timing.command
+            ratio = f"{actual / predicted:0.2f}" if predicted > 0 else "n/a"
+            self.log.info(
+                f"{name} took {actual:0.2f} seconds; predicted {predicted:0.2f} "
+                f"seconds; actual/predicted = {ratio}; timeout {timeout:0.1f} seconds"
+            )
+        if timing is not None:
+            durations = timing.finish()
+            self.log.debug(
+                f"{timing.command} timing: "
+                + ", ".join(f"{phase}={dt:0.3f}" for phase, dt in durations.items())
+            )
+
+    async def in_position(self, timing=None, axes=()):
         """Wait for all axes of the CBP to be in position.
 
         In this case, in position is defined as the encoder values being
         within tolerance to the target values.
+        The position is checked each time the telemetry loop updates
+        the inPosition event.
+
+        Parameters
+        ----------
+        timing : `CommandTiming` or `None`, optional
+            If not None, mark the time each of ``axes`` is first seen
+            in position.
+        axes : `tuple` [`str`], optional
+            The axes to mark in ``timing``.
         """
-        while not self.position:
-            await asyncio.sleep(self.telemetry_interval)
+
+        def check_position():
+            if timing is not None:
+                for axis in axes:
+                    if getattr(self.component.in_position, axis):
+                        timing.mark_in_position(axis)
+            return self.position
+
+        async with self.component.in_position_condition:
+            await self.component.in_position_condition.wait_for(check_position)
         self.log.info("Motion finished")
 
+    def log_command_timings(self):
+        """Log the summary of `command_timings`, if any command was
+        timed."""
+        if self.command_timings.histograms:
+            self.log.info(
+                "Motion command timings:\n" + self.command_timings.format_summary()
+            )
+
+    @property
+    def telemetry_interval(self):
+        """The interval between telemetry updates, which is shorter
+        while any axis is moving.
+
+        The park state does not matter: a CBP that holds a position
+        between exposures changes no more than a parked one.
+        """
+        if self.position:
+            return self.idle_telemetry_interval
+        return self.moving_telemetry_interval
+
     @property
     def position(self):
         """Is all of the axes of the CBP in position."""
@@ -0,0 +1,432 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = [
+    "CommandStatistics",
+    "CommandTiming",
+    "CommandTimings",
+    "LatencyHistogram",
+]
+
+import bisect
+import math
+import time
+
+from .wizardry import VARIABLE_GROUPS
+
+
+class LatencyHistogram:
+    """Histogram of durations with logarithmically spaced bins.
+
+    Recording a value costs one binary search, and memory use does not
+    grow with the number of values.
+
+    Parameters
+    ----------
+    min_value : `float`, optional
+        The upper edge of the lowest bin (seconds).
+    max_value : `float`, optional
+        The lower edge of the highest bin (seconds).
+    bins_per_decade : `int`, optional
+        The number of bins per factor of 10.
+
+    Attributes
+    ----------
+    edges : `list` [`float`]
+        The bin edges.
+    counts : `list` [`int`]
+        The number of values in each bin; ``counts[i]`` counts values
+        between ``edges[i - 1]`` and ``edges[i]``.
+    count : `int`
+    total : `float`
+    min : `float`
+    max : `float`
+    """
+
+    def __init__(self, min_value=1e-4, max_value=1e3, bins_per_decade=20):
+        num_edges = round(math.log10(max_value / min_value) * bins_per_decade) + 1
+        self.edges = [min_value * 10 ** (i / bins_per_decade) for i in range(num_edges)]
+        self.counts = [0] * (num_edges + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value):
+        """Add a value.
+
+        Parameters
+        ----------
+        value : `float`
+            The duration (seconds).
+        """
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Return an estimate of a percentile.
+
+        The estimate is the upper edge of the bin holding the percentile,
+        limited to the range of the recorded values.
+
+        Parameters
+        ----------
+        percent : `float`
+            The percentile, from 0 to 100.
+
+        Returns
+        -------
+        value : `float`
+            The estimated percentile, or nan if no values were recorded.
+        """
+        if self.count == 0:
+            return math.nan
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if count > 0 and cumulative >= rank:
+                upper = self.edges[i] if i < len(self.edges) else self.max
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """Return summary statistics.
+
+        Returns
+        -------
+        summary : `dict` [`str`, `float`]
+            The count, mean, min, 50th, 90th and 99th percentiles and max.
+        """
+        if self.count == 0:
+            return dict(count=0)
+        return dict(
+            count=self.count,
+            mean=self.total / self.count,
+            min=self.min,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+            max=self.max,
+        )
+
+
+class CommandTiming:
+    """Timing of one execution of a motion command.
+
+    Create with `CommandTimings.start`. The phases are:
+
+    * ``send``: from the start of the command until all setpoints
+      have been sent to the controller.
+    * ``motion.<axis>``: from the end of ``send`` until the inPosition
+      flag of the axis was seen to be True. This includes the mechanical
+      motion and the delay of the telemetry loop detecting it.
+    * ``completion``: from the last axis being in position until the
+      command finished.
+    * ``total``: the whole command.
+
+    Parameters
+    ----------
+    timings : `CommandTimings`
+        The collection to record into.
+    command : `str`
+        The name of the command.
+    """
+
+    def __init__(self, timings, command):
+        self.timings = timings
+        self.command = command
+        self.start_time = time.monotonic()
+        self.sent_time = None
+        self.end_time = None
+        self.axis_times = dict()
+
+    def mark_sent(self):
+        """Mark that all setpoints have been sent."""
+        self.sent_time = time.monotonic()
+
+    def mark_in_position(self, axis):
+        """Mark that an axis was seen in position; later calls for the
+        same axis are ignored.
+
+        Parameters
+        ----------
+        axis : `str`
+            The name of the axis, as in the inPosition event.
+        """
+        if axis not in self.axis_times:
+            self.axis_times[axis] = time.monotonic()
+
+    def finish(self):
+        """Mark the end of the command and record its phases.
+
+        Returns
+        -------
+        durations : `dict` [`str`, `float`]
+            The duration of each phase (seconds).
+        """
+        end_time = self.end_time = time.monotonic()
+        sent_time = self.start_time if self.sent_time is None else self.sent_time
+        durations = dict(send=sent_time - self.start_time)
+        for axis, axis_time in self.axis_times.items():
+            durations[f"motion.{axis}"] = max(axis_time - sent_time, 0)
+        last_time = max(self.axis_times.values(), default=sent_time)
+        durations["completion"] = end_time - max(last_time, sent_time)
+        durations["total"] = end_time - self.start_time
+        for phase, duration in durations.items():
+            self.timings.record(f"{self.command}.{phase}", duration)
+        return durations
+
+
+class CommandTimings:
+    """Histograms of the phases of motion commands.
+
+    Attributes
+    ----------
+    histograms : `dict` [`str`, `LatencyHistogram`]
+        Histograms keyed by ``<command>.<phase>``,
+        e.g. ``move.motion.azimuth``.
+    """
+
+    def __init__(self):
+        self.histograms = dict()
+
+    def start(self, command):
+        """Start timing an execution of a command.
+
+        Parameters
+        ----------
+        command : `str`
+            The name of the command.
+
+        Returns
+        -------
+        timing : `CommandTiming`
+        """
+        return CommandTiming(timings=self, command=command)
+
+    def record(self, name, duration):
+        """Record a duration.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the histogram.
+        duration : `float`
+            The duration (seconds).
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(duration)
+
+    def summary(self, prefix=""):
+        """Return summary statistics of the histograms.
+
+        Parameters
+        ----------
+        prefix : `str`, optional
+            Only include histograms whose name starts with this,
+            e.g. ``"move."``.
+
+        Returns
+        -------
+        summary : `dict` [`str`, `dict`]
+            `LatencyHistogram.summary` of each histogram, keyed by name.
+        """
+        return {
+            name: histogram.summary()
+            for name, histogram in sorted(self.histograms.items())
+            if name.startswith(prefix)
+        }
+
+    def format_summary(self, prefix=""):
+        """Format `summary` as text, one line per histogram.
+
+        Parameters
+        ----------
+        prefix : `str`, optional
+            Only include histograms whose name starts with this.
+
+        Returns
+        -------
+        text : `str`
+        """
+        lines = []
+        for name, summary in self.summary(prefix).items():
+            lines.append(
+                f"{name}: n={summary['count']} mean={summary['mean']:0.3f} "
+                f"p50={summary['p50']:0.3f} p90={summary['p90']:0.3f} "
+                f"p99={summary['p99']:0.3f} max={summary['max']:0.3f} s"
+            )
+        return "\n".join(lines)
+
+
+class CommandStatistics:
+    """Round-trip statistics of the commands sent to the controller.
+
+    Statistics are keyed by the command up to any ``=``, so that e.g.
+    ``az=?`` is recorded as ``az`` and ``new_az=10`` as ``new_az``.
+    A batched query is keyed by the telemetry groups of its variables,
+    e.g. ``MG alt,az,foc,msk,rot`` as ``MG position``.
+    Call `reset` to start a new window.
+
+    Attributes
+    ----------
+    round_trips : `dict` [`str`, `LatencyHistogram`]
+        The time from writing the last attempt of a command to reading
+        its reply (seconds).
+    retries : `dict` [`str`, `int`]
+        The total number of retries.
+    max_retries : `dict` [`str`, `int`]
+        The largest number of retries of one command.
+    reply_bytes : `dict` [`str`, `int`]
+        The total size of the replies (bytes).
+    failures : `dict` [`str`, `int`]
+        The number of commands that got no reply.
+    start_time : `float`
+        The start of the current window (`time.monotonic` seconds).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clear the statistics, to start a new window."""
+        self.round_trips = dict()
+        self.retries = dict()
+        self.max_retries = dict()
+        self.reply_bytes = dict()
+        self.failures = dict()
+        self.start_time = time.monotonic()
+
+    @staticmethod
+    def get_key(command):
+        """Return the key of a command.
+
+        Parameters
+        ----------
+        command : `str`
+            The command sent to the controller.
+
+        Returns
+        -------
+        key : `str`
+            The command up to any ``=``; for ``MG <variables>``, ``MG``
+            followed by the telemetry groups of the variables in order,
+            joined by ``+``, e.g. ``MG status+park``. A variable that
+            is in no group stands for itself.
+        """
+        if command.startswith("MG "):
+            groups = dict.fromkeys(
+                VARIABLE_GROUPS.get(name, name) for name in command[3:].split(",")
+            )
+            return "MG " + "+".join(groups)
+        return command.partition("=")[0]
+
+    def record(self, command, round_trip, retries, reply_size):
+        """Record a command that got a reply.
+
+        Parameters
+        ----------
+        command : `str`
+            The command sent to the controller.
+        round_trip : `float`
+            The time from writing the last attempt to reading the reply
+            (seconds).
+        retries : `int`
+            The number of retries.
+        reply_size : `int`
+            The size of the reply (bytes).
+        """
+        key = self.get_key(command)
+        histogram = self.round_trips.get(key)
+        if histogram is None:
+            histogram = self.round_trips[key] = LatencyHistogram()
+            self.retries[key] = 0
+            self.max_retries[key] = 0
+            self.reply_bytes[key] = 0
+        histogram.record(round_trip)
+        self.reply_bytes[key] += reply_size
+        if retries:
+            self.retries[key] += retries
+            self.max_retries[key] = max(self.max_retries[key], retries)
+
+    def record_failure(self, command):
+        """Record a command that got no reply.
+
+        Parameters
+        ----------
+        command : `str`
+            The command sent to the controller.
+        """
+        key = self.get_key(command)
+        self.failures[key] = self.failures.get(key, 0) + 1
+
+    def summary(self):
+        """Return summary statistics of each command.
+
+        Returns
+        -------
+        summary : `dict` [`str`, `dict`]
+            `LatencyHistogram.summary` of the round trip times, plus
+            ``retries``, ``max_retries``, ``mean_reply_bytes`` and
+            ``failures``, keyed by command.
+        """
+        summary = dict()
+        for key in sorted(self.round_trips.keys() | self.failures.keys()):
+            histogram = self.round_trips.get(key, LatencyHistogram())
+            summary[key] = dict(
+                histogram.summary(),
+                retries=self.retries.get(key, 0),
+                max_retries=self.max_retries.get(key, 0),
+                mean_reply_bytes=self.reply_bytes.get(key, 0) / max(histogram.count, 1),
+                failures=self.failures.get(key, 0),
+            )
+        return summary
+
+    def format_summary(self):
+        """Format `summary` as text, one line per command.
+
+        Returns
+        -------
+        text : `str`
+        """
+        lines = []
+        for key, summary in self.summary().items():
+            line = f"{key}: n={summary['count']}"
+            if summary["count"] > 0:
+                line += (
+                    f" p50={summary['p50'] * 1000:0.1f} "
+                    f"p90={summary['p90'] * 1000:0.1f} "
+                    f"p99={summary['p99'] * 1000:0.1f} "
+                    f"max={summary['max'] * 1000:0.1f} ms "
+                    f"{summary['mean_reply_bytes']:0.0f} bytes"
+                )
+            line += f" retries={summary['retries']} failures={summary['failures']}"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,212 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = ["UNKNOWN_MASK_ID", "MaskInfo", "MaskRegistry"]
+
+import re
+
+from .axes import AXES
+
+# The mask reported by the controller when the mask encoder is off.
+UNKNOWN_MASK_ID = 9
+# Number of masks before the CSC is configured.
+DEFAULT_NUM_MASKS = 5
+# Configuration fields of the masks, e.g. "mask1".
+_CONFIG_FIELD = re.compile(r"mask(?P<id>[1-9][0-9]*)")
+
+
+class MaskInfo:
+    """A mask of the CBP.
+
+    Parameters
+    ----------
+    id : `int`
+        The number of the mask on the controller.
+    name : `str`
+        The name of the mask.
+    rotation : `float`
+        The rotation of the mask when it is selected (degrees).
+
+    Attributes
+    ----------
+    id : `int`
+    key : `str`
+        ``id`` as a string, as accepted by `CBPComponent.set_mask`.
+    name : `str`
+    rotation : `float`
+    """
+
+    __slots__ = ("id", "key", "name", "rotation")
+
+    def __init__(self, id, name, rotation):
+        self.id = id
+        self.key = str(id)
+        self.name = name
+        self.rotation = rotation
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(id={self.id}, name={self.name!r}, "
+            f"rotation={self.rotation})"
+        )
+
+
+class MaskRegistry:
+    """The masks of the CBP, indexed by key, controller value and name.
+
+    Includes the unknown mask, which the controller reports when the mask
+    encoder is off. All lookups are single dict lookups.
+
+    Parameters
+    ----------
+    masks : iterable [`MaskInfo`]
+        The masks, other than the unknown mask.
+
+    Raises
+    ------
+    ValueError
+        Raised when two masks have the same id, or a mask id is not
+        a position of the mask selector (``AXES["mask"]``).
+
+    Attributes
+    ----------
+    unknown : `MaskInfo`
+        The unknown mask.
+    """
+
+    def __init__(self, masks):
+        self.unknown = MaskInfo(id=UNKNOWN_MASK_ID, name="Unknown", rotation=0)
+        self._by_key = dict()
+        axis = AXES["mask"]
+        for info in masks:
+            if not axis.min_position <= info.id <= axis.max_position:
+                raise ValueError(
+                    f"Mask id {info.id} not in range "
+                    f"[{axis.min_position}, {axis.max_position}]"
+                )
+            if info.key in self._by_key:
+                raise ValueError(f"Mask id {info.id} is duplicated")
+            self._by_key[info.key] = info
+        self._by_key[self.unknown.key] = self.unknown
+        # A float from the controller, e.g. 1.0, finds the int key 1.
+        self._by_id = {info.id: info for info in self._by_key.values()}
+        # If two masks have the same name, the first one wins.
+        self._by_name = dict()
+        for info in self._by_key.values():
+            self._by_name.setdefault(info.name, info)
+
+    @classmethod
+    def from_config(cls, config):
+        """Make a registry from the ``mask<id>`` fields of a
+        configuration.
+
+        Parameters
+        ----------
+        config : `types.SimpleNamespace`
+            The configuration, with a field such as
+            ``mask1 = {"name": "Mask 1", "rotation": 30}`` per mask.
+
+        Returns
+        -------
+        registry : `MaskRegistry`
+            The masks, in order of id.
+        """
+        masks = []
+        for field, value in vars(config).items():
+            match = _CONFIG_FIELD.fullmatch(field)
+            if match is not None:
+                masks.append(
+                    MaskInfo(
+                        id=int(match.group("id")),
+                        name=value["name"],
+                        rotation=value["rotation"],
+                    )
+                )
+        return cls(sorted(masks, key=lambda info: info.id))
+
+    @classmethod
+    def make_default(cls, num_masks=DEFAULT_NUM_MASKS):
+        """Make a registry of empty masks, to use until configured.
+
+        Parameters
+        ----------
+        num_masks : `int`, optional
+            The number of masks.
+
+        Returns
+        -------
+        registry : `MaskRegistry`
+            Masks 1 to ``num_masks``, named "Empty <id>", with no rotation.
+        """
+        return cls(
+            MaskInfo(id=id, name=f"Empty {id}", rotation=0)
+            for id in range(1, num_masks + 1)
+        )
+
+    def __getitem__(self, key):
+        """Return the mask with a given key, e.g. "1".
+
+        Raises
+        ------
+        KeyError
+            Raised when there is no such mask.
+        """
+        return self._by_key[key]
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def __iter__(self):
+        return iter(self._by_key.values())
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def get_by_id(self, value):
+        """Return the mask with a given id, as reported by the controller.
+
+        Parameters
+        ----------
+        value : `int` or `float`
+            The id, e.g. 1 or 1.0.
+
+        Returns
+        -------
+        info : `MaskInfo`
+            The mask; `unknown` if there is no such mask.
+        """
+        return self._by_id.get(value, self.unknown)
+
+    def get_by_name(self, name):
+        """Return the mask with a given name.
+
+        Parameters
+        ----------
+        name : `str`
+            The name.
+
+        Returns
+        -------
+        info : `MaskInfo` or `None`
+            The mask; None if there is no such mask.
+        """
+        return self._by_name.get(name)
@@ -0,0 +1,162 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = ["MockFarm"]
+
+import asyncio
+import logging
+
+from lsst.ts import tcpip
+
+from .mock_server import MockServer
+
+
+class MockFarm:
+    """Several mock CBP controllers in one process, for scale tests.
+
+    Each controller is a `MockServer`. In addition to the single client
+    of the `MockServer` itself, each controller listens on a port of its
+    own (``ports[i]``) that serves any number of clients at the same time,
+    e.g. a CSC and an engineering monitor. All clients of a controller
+    share its state: a move commanded by one client is seen by the others.
+    Each client gets the replies to its own commands, in order.
+
+    Use as an async context manager, or call `start` and `close`.
+
+    Parameters
+    ----------
+    num_controllers : `int`
+        The number of controllers.
+    log : `logging.Logger`, optional
+    seed : `int` or `None`, optional
+        Seed for the random behavior of the controllers; controller ``i``
+        uses ``seed + i``. None for unpredictable seeds.
+    **settings
+        Other keyword arguments for `MockServer`, e.g. ``fast=True``.
+
+    Raises
+    ------
+    ValueError
+        Raised when ``num_controllers`` < 1.
+
+    Attributes
+    ----------
+    num_controllers : `int`
+    controllers : `list` [`MockServer`]
+        The controllers; empty until started.
+    ports : `list` [`int`]
+        The port of each controller that serves several clients.
+    client_counts : `list` [`int`]
+        The number of clients connected to each of those ports.
+    host : `str`
+    log : `logging.Logger`
+    """
+
+    def __init__(self, num_controllers, log=None, seed=None, **settings):
+        if num_controllers < 1:
+            raise ValueError(f"num_controllers={num_controllers} must be >= 1")
+        if log is None:
+            self.log = logging.getLogger(type(self).__name__)
+        else:
+            self.log = log.getChild(type(self).__name__)
+        self.num_controllers = num_controllers
+        self.seed = seed
+        self.settings = settings
+        self.host = tcpip.LOCAL_HOST
+        self.controllers = []
+        self.servers = []
+        self.ports = []
+        self.client_counts = []
+        self.client_tasks = set()
+
+    async def start(self):
+        """Start the controllers and their multi-client ports."""
+        for index in range(self.num_controllers):
+            seed = None if self.seed is None else self.seed + index
+            controller = MockServer(log=self.log, seed=seed, **self.settings)
+            await controller.start_task
+            self.controllers.append(controller)
+            self.client_counts.append(0)
+            server = await asyncio.start_server(
+                lambda reader, writer, index=index: self.serve_client(
+                    index, reader, writer
+                ),
+                host=self.host,
+                port=0,
+            )
+            self.servers.append(server)
+            self.ports.append(server.sockets[0].getsockname()[1])
+        self.log.info(f"Started {self.num_controllers} controllers on {self.ports}")
+
+    async def close(self):
+        """Disconnect all clients and stop the controllers."""
+        for server in self.servers:
+            server.close()
+        for task in list(self.client_tasks):
+            task.cancel()
+        for server in self.servers:
+            await server.wait_closed()
+        for controller in self.controllers:
+            await controller.close()
+        self.servers = []
+
+    async def serve_client(self, index, reader, writer):
+        """Read command lines from one client of a controller
+        and reply to each of its commands.
+
+        Parameters
+        ----------
+        index : `int`
+            The index of the controller.
+        reader : `asyncio.StreamReader`
+        writer : `asyncio.StreamWriter`
+        """
+        controller = self.controllers[index]
+        terminator = controller.terminator
+        encoding = controller.encoding
+
+        async def write_str(line):
+            writer.write(line.encode(encoding) + terminator)
+            await writer.drain()
+
+        task = asyncio.current_task()
+        self.client_tasks.add(task)
+        self.client_counts[index] += 1
+        try:
+            while True:
+                data = await reader.readuntil(terminator)
+                line = data[: -len(terminator)].decode(encoding)
+                for command in line.split(";"):
+                    await controller.dispatch(command, write_str=write_str)
+        except (asyncio.CancelledError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.client_counts[index] -= 1
+            self.client_tasks.discard(task)
+            writer.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
@@ -20,20 +20,89 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
-__all__ = ["Encoders", "MockServer"]
+__all__ = ["Encoders", "MockServer", "ScheduledFault", "StatusError", "VirtualClock"]
 
 import asyncio
 import enum
+import functools
 import logging
 import random
 import re
+import time
 
-from lsst.ts import simactuators, tcpip
+from lsst.ts import simactuators, tcpip, utils
+
+from .axes import AXES
+
+# Speeds of the mock axes (position units/second), keyed by axis name;
+# faster than the real CBP, whose speeds are in `AXES`, to keep tests short.
+MOCK_SPEEDS = dict(azimuth=10, elevation=10, focus=1000, mask=1, mask_rotation=10)
+
+
+class VirtualClock:
+    """A clock for the mock actuators that runs at a chosen rate
+    and can be advanced, so simulated motion need not take real time.
+
+    Call the clock to get the current time.
+
+    Parameters
+    ----------
+    rate : `float`, optional
+        How fast the clock runs compared to real time: 0 to only move
+        when advanced with `advance`, 1 for real time, 10 to move
+        10 times faster than the real CBP.
+    start_tai : `float` or `None`, optional
+        The initial time (TAI unix seconds); None for the current time.
+
+    Raises
+    ------
+    ValueError
+        Raised when ``rate`` is negative.
+    """
+
+    def __init__(self, rate=0, start_tai=None):
+        if rate < 0:
+            raise ValueError(f"rate={rate} must be >= 0")
+        self.rate = rate
+        self.start_tai = utils.current_tai() if start_tai is None else start_tai
+        self.start_time = time.monotonic()
+
+    def __call__(self):
+        """Return the current time (TAI unix seconds)."""
+        return self.start_tai + self.rate * (time.monotonic() - self.start_time)
+
+    def advance(self, duration):
+        """Advance the clock.
+
+        Parameters
+        ----------
+        duration : `float`
+            The time to advance by (seconds).
+
+        Raises
+        ------
+        ValueError
+            Raised when ``duration`` is negative.
+        """
+        if duration < 0:
+            raise ValueError(f"duration={duration} must be >= 0")
+        self.start_tai += duration
 
 
 class Encoders:
     """Mocks the CBP encoders.
 
+    Parameters
+    ----------
+    clock : callable or `None`, optional
+        Function returning the current time (TAI unix seconds),
+        e.g. a `VirtualClock`; None for `lsst.ts.utils.current_tai`.
+    speeds : `dict` [`str`, `float`] or `None`, optional
+        Speeds of the actuators (position units/second), keyed by axis
+        name, e.g. ``dict(mask=AXES["mask"].speed)`` to change masks at
+        the speed of the real CBP. Axes that are omitted move at the speed
+        in ``MOCK_SPEEDS``.
+
     Attributes
     ----------
     azimuth : `lsst.ts.simactuators.PointToPointActuator`
@@ -41,22 +110,67 @@ class Encoders:
     focus : `lsst.ts.simactuators.PointToPointActuator`
     mask_select : `lsst.ts.simactuators.PointToPointActuator`
     mask_rotate : `lsst.ts.simactuators.CircularPointToPointActuator`
+    actuators : `tuple`
+        All of the above.
+    clock : callable
+        The clock of the actuators; pass its time to all calls
+        of the actuators.
     """
 
-    def __init__(self):
-        self.azimuth = simactuators.PointToPointActuator(
-            min_position=-45, max_position=45, speed=10, start_position=0
+    def __init__(self, clock=None, speeds=None):
+        self.clock = utils.current_tai if clock is None else clock
+        speeds = dict(MOCK_SPEEDS, **({} if speeds is None else speeds))
+        self.azimuth = self.make_actuator(
+            AXES["azimuth"], speed=speeds["azimuth"], start_position=0
+        )
+        self.elevation = self.make_actuator(
+            AXES["elevation"], speed=speeds["elevation"], start_position=0
+        )
+        self.focus = self.make_actuator(
+            AXES["focus"], speed=speeds["focus"], start_position=0
+        )
+        self.mask_select = self.make_actuator(
+            AXES["mask"], speed=speeds["mask"], start_position=1
         )
-        self.elevation = simactuators.PointToPointActuator(
-            min_position=-69, max_position=45, speed=10, start_position=0
+        self.mask_rotate = simactuators.CircularPointToPointActuator(
+            speed=speeds["mask_rotation"]
         )
-        self.focus = simactuators.PointToPointActuator(
-            min_position=0, max_position=13000, speed=1000, start_position=0
+        self.actuators = (
+            self.azimuth,
+            self.elevation,
+            self.focus,
+            self.mask_select,
+            self.mask_rotate,
         )
-        self.mask_select = simactuators.PointToPointActuator(
-            min_position=1, max_position=5, speed=1, start_position=1
+
+    def remaining_time(self):
+        """Return the time until all actuators stop (seconds)."""
+        tai = self.clock()
+        return max(actuator.remaining_time(tai) for actuator in self.actuators)
+
+    @staticmethod
+    def make_actuator(axis, speed, start_position):
+        """Make an actuator with the limits of an axis.
+
+        Parameters
+        ----------
+        axis : `Axis`
+            The axis.
+        speed : `float`
+            The speed of the actuator (position units/second).
+        start_position : `float`
+            The initial position.
+
+        Returns
+        -------
+        actuator : `lsst.ts.simactuators.PointToPointActuator`
+        """
+        return simactuators.PointToPointActuator(
+            min_position=axis.min_position,
+            max_position=axis.max_position,
+            speed=speed,
+            start_position=start_position,
         )
-        self.mask_rotate = simactuators.CircularPointToPointActuator(speed=10)
 
 
 class StatusError(enum.Flag):
@@ -70,12 +184,81 @@ class StatusError(enum.Flag):
     TORQUE_LIMIT = enum.auto()
 
 
+class ScheduledFault:
+    """A fault the mock controller injects at a given command.
+
+    Parameters
+    ----------
+    index : `int`
+        The number of commands received before the fault is injected:
+        0 for the first command. Each command of a ``;``-separated
+        command line counts.
+    kind : `str`
+        The kind of fault:
+
+        * "drop": do not reply to the command.
+        * "panic": set the panic flag (``wdpanic``).
+        * "status": set the status of an encoder to ``status``.
+    variable : `str` or `None`, optional
+        For "status" faults: the encoder status variable,
+        e.g. "AAstat".
+    status : `StatusError`, optional
+        For "status" faults: the new encoder status.
+
+    Raises
+    ------
+    ValueError
+        Raised when ``kind`` is not known, or ``variable`` is missing
+        for a "status" fault.
+    """
+
+    kinds = ("drop", "panic", "status")
+
+    def __init__(self, index, kind, variable=None, status=StatusError.NO):
+        if kind not in self.kinds:
+            raise ValueError(f"kind={kind!r} not in {self.kinds}")
+        if kind == "status" and variable is None:
+            raise ValueError("variable is required for status faults")
+        self.index = index
+        self.kind = kind
+        self.variable = variable
+        self.status = status
+
+    def __repr__(self):
+        return (
+            f"ScheduledFault(index={self.index}, kind={self.kind!r}, "
+            f"variable={self.variable!r}, status={self.status!r})"
+        )
+
+
 class MockServer(tcpip.OneClientReadLoopServer):
     """Mocks the CBP server.
 
     Parameters
     ----------
     log : `logging.Logger`, optional
+    seed : `int` or `None`, optional
+        Seed for the random latencies and dropped replies;
+        None for an unpredictable seed.
+    fast : `bool`, optional
+        If true, reply without delay, ignoring ``latency`` and
+        ``latencies``.
+    latency : `tuple` [`float`, `float`], optional
+        The range (seconds) of the uniformly distributed delay
+        before each reply.
+    latencies : `dict` [`str`, `tuple` [`float`, `float`]] or `None`, optional
+        Delay ranges for specific commands, overriding ``latency``,
+        keyed by the command up to any ``=``, e.g. "az", "new_az" or
+        "MG".
+    drop_probability : `float`, optional
+        The probability that a reply is not sent.
+    faults : `list` [`ScheduledFault`], optional
+        Faults to inject.
+    clock : callable or `None`, optional
+        Clock of the simulated motion, e.g. a `VirtualClock`;
+        None for real time.
+    speeds : `dict` [`str`, `float`] or `None`, optional
+        Speeds of the simulated axes; see `Encoders`.
 
     Attributes
     ----------
@@ -92,12 +275,49 @@ class MockServer(tcpip.OneClientReadLoopServer):
     park : `bool`
     auto_park : `bool`
     masks_rotation : `dict` of `str`:`float`
-    commands : `tuple` of `re.Pattern`:`functools.partial`
+    commands : `dict` [`str`, `tuple`]
+        The pattern of the parameter and the method of each command,
+        keyed by command name; see `split_command`. A pattern of None
+        means the command only accepts ``?`` and the method
+        takes no arguments.
+    variables : `dict` of `str`:`functools.partial`
+        Methods returning the value of each controller variable,
+        used by the ``MG`` command.
+    encoder_status : `dict` [`str`, `StatusError`]
+        The status of each encoder, keyed by status variable name.
+    command_count : `int`
+        The number of commands received.
+    rng : `random.Random`
+        Random number generator for the latencies and dropped replies.
     log : `logging.Logger`
     """
 
-    def __init__(self, log=None):
+    def __init__(
+        self,
+        log=None,
+        seed=None,
+        fast=False,
+        latency=(0.2, 0.4),
+        latencies=None,
+        drop_probability=0,
+        faults=(),
+        clock=None,
+        speeds=None,
+    ):
         self.log = logging.getLogger(__name__)
+        self.rng = random.Random(seed)
+        self.fast = fast
+        self.latency = latency
+        self.latencies = dict() if latencies is None else dict(latencies)
+        self.drop_probability = drop_probability
+        self.faults = dict()
+        for fault in faults:
+            self.faults.setdefault(fault.index, []).append(fault)
+        self.command_count = 0
+        self.encoder_status = {
+            name: StatusError.NO
+            for name in ("AAstat", "ABstat", "ACstat", "ADstat", "AEstat")
+        }
         self.timeout = 5
         self.long_timeout = 30
         self.azimuth = 0
@@ -105,42 +325,49 @@ class MockServer(tcpip.OneClientReadLoopServer):
         self.focus = 0
         self.mask = 1
         self.panic_status = 0.0
-        self.encoders = Encoders()
+        self.encoders = Encoders(clock=clock, speeds=speeds)
         self.park = False
         self.auto_park = False
         self.movement_reply = ":"
-        self.commands = (
-            (re.compile(r"az=\?"), self.do_azimuth),
-            (re.compile(r"alt=\?"), self.do_altitude),
-            (
-                re.compile(r"new_alt=(?P<parameter>-?[0-6]\d?\.?\d?)"),
-                self.do_new_altitude,
-            ),
-            (re.compile(r"foc=\?"), self.do_focus),
-            (
-                re.compile(r"new_foc=(?P<parameter>[0-1]?[0-3]?\d?\d?\d)"),
-                self.do_new_focus,
-            ),
-            (re.compile(r"msk=\?"), self.do_mask),
-            (re.compile(r"new_msk=(?P<parameter>[1-5])"), self.do_new_mask),
-            (re.compile(r"rot=\?"), self.do_rotation),
-            (
-                re.compile(r"new_rot=(?P<parameter>[0-1]?[0-3]?\d?\.?\d)"),
-                self.do_new_rotation,
-            ),
-            (
-                re.compile(r"new_az=(?P<parameter>-?[0-3][0-5]?\.?\d?)"),
-                self.do_new_azimuth,
-            ),
-            (re.compile(r"wdpanic=\?"), self.do_panic),
-            (re.compile(r"autopark=\?"), self.do_autopark),
-            (re.compile(r"park=(?P<parameter>[\?01])"), self.do_park),
-            (re.compile(r"AAstat=\?"), self.do_aastat),
-            (re.compile(r"ABstat=\?"), self.do_abstat),
-            (re.compile(r"ACstat=\?"), self.do_acstat),
-            (re.compile(r"ADstat=\?"), self.do_adstat),
-            (re.compile(r"AEstat=\?"), self.do_aestat),
-        )
+        # Command name: (parameter pattern, method). A pattern of None
+        # means the command is a query (``name=?``) of a method with
+        # no arguments.
+        self.commands = {
+            "az": (None, self.do_azimuth),
+            "alt": (None, self.do_altitude),
+            "new_alt": (re.compile(r"-?\d+(\.\d*)?"), self.do_new_altitude),
+            "foc": (None, self.do_focus),
+            "new_foc": (re.compile(r"[0-1]?[0-3]?\d?\d?\d"), self.do_new_focus),
+            "msk": (None, self.do_mask),
+            "new_msk": (re.compile(r"[1-5]"), self.do_new_mask),
+            "rot": (None, self.do_rotation),
+            "new_rot": (re.compile(r"\d+(\.\d*)?"), self.do_new_rotation),
+            "new_az": (re.compile(r"-?\d+(\.\d*)?"), self.do_new_azimuth),
+            "wdpanic": (None, self.do_panic),
+            "autopark": (None, self.do_autopark),
+            "park": (re.compile(r"[\?01]"), self.do_park),
+            "AAstat": (None, self.do_aastat),
+            "ABstat": (None, self.do_abstat),
+            "ACstat": (None, self.do_acstat),
+            "ADstat": (None, self.do_adstat),
+            "AEstat": (None, self.do_aestat),
+            "MG": (re.compile(r'"[^"]*"|\w+(\s*,\s*\w+)*'), self.do_message),
+        }
+        self.variables = {
+            "az": self.do_azimuth,
+            "alt": self.do_altitude,
+            "foc": self.do_focus,
+            "msk": self.do_mask,
+            "rot": self.do_rotation,
+            "wdpanic": self.do_panic,
+            "autopark": self.do_autopark,
+            "park": functools.partial(self.do_park, "?"),
+            "AAstat": self.do_aastat,
+            "ABstat": self.do_abstat,
+            "ACstat": self.do_acstat,
+            "ADstat": self.do_adstat,
+            "AEstat": self.do_aestat,
+        }
         super().__init__(
             name="CBP Mock Server", host=tcpip.LOCAL_HOST, port=0, log=self.log
         )
@@ -163,68 +390,139 @@ class MockServer(tcpip.OneClientReadLoopServer):
                 return
             line = line.decode().strip(self.terminator)
             self.log.debug(f"Decoded {line}")
-            for regex, command_method in self.commands:
-                matched_command = regex.fullmatch(line)
-                if matched_command:
-                    self.log.debug(
-                        f"{line} match: {matched_command} method: {command_method}"
-                    )
-                    try:
-                        parameter = matched_command.group("parameter")
-                        self.log.debug(f"parameter={parameter}")
-                    except IndexError:
-                        parameter = None
-                    try:
-                        if parameter is None:
-                            msg = await command_method()
-                        else:
-                            msg = await command_method(parameter)
-                    except ValueError as e:
-                        self.log.info(f"command {line} failed: {e}")
-                        # TODO DM-27693: reply with an error signal so the
-                        # client knows there is a problem
-                    except Exception:
-                        # An unexpected error; log a traceback
-                        self.log.exception("Bug! Command {line} filed.")
-                        # TODO DM-27693: reply with an error signal so the
-                        # client knows there is a problem
-                    else:
-                        if msg is not None:
-                            self.writer.write(msg.encode("ascii") + b"\r\n")
-                            self.log.debug(f"Wrote {msg}")
-                            await self.writer.drain()
-                    break
+            for command in line.split(";"):
+                await self.dispatch(command)
 
     async def read_and_dispatch(self):
+        """Read a command line and reply to each of its commands.
+
+        Like the Galil controller, a line may hold several commands
+        separated by ``;``, and each command gets its own reply.
+        """
         line = await self.read_str()
-        for regex, command_method in self.commands:
-            matched_command = regex.fullmatch(line)
-            if matched_command:
-                try:
-                    parameter = matched_command.group("parameter")
-                except IndexError:
-                    parameter = None
-                try:
-                    if parameter is None:
-                        msg = await command_method()
-                    else:
-                        msg = await command_method(parameter)
-                except ValueError:
-                    self.log.exception(f"Command {line} failed")
-                except Exception:
-                    self.log.exception(f"Command {line} failed unexpectedly")
-                else:
-                    if msg is not None:
-                        bad_connection = True
-                        while bad_connection:
-                            bad_connection = random.choices([True, False], [0.3, 0.7])[
-                                0
-                            ]
-                            self.log.debug(f"{bad_connection=}")
-                            if not bad_connection:
-                                await self.write_str(msg)
-                            await asyncio.sleep(0.2)
-                break
+        for command in line.split(";"):
+            await self.dispatch(command)
+
+    async def dispatch(self, command, write_str=None):
+        """Run one command and write its reply.
+
+        Parameters
+        ----------
+        command : `str`
+            The command, without terminator.
+        write_str : callable or `None`, optional
+            Coroutine function that writes a reply to the client,
+            e.g. for a client of a `MockFarm`;
+            None to write to the client of this server.
+        """
+        drop = self.apply_faults()
+        name, parameter = self.split_command(command)
+        pattern, command_method = self.commands.get(name, (None, None))
+        if command_method is None:
+            self.log.info(f"Unknown command {command}")
+            return
+        try:
+            if pattern is None:
+                if parameter != "?":
+                    raise ValueError(f"Expected {name}=?")
+                msg = await command_method()
+            else:
+                if pattern.fullmatch(parameter) is None:
+                    raise ValueError(f"Invalid parameter {parameter!r}")
+                msg = await command_method(parameter)
+        except ValueError as e:
+            # Bad input from the client, not a bug of the mock.
+            self.log.warning(f"Command {command} rejected: {e}")
+        except Exception:
+            self.log.exception(f"Command {command} failed unexpectedly")
+        else:
+            if msg is not None:
+                await self.write_reply(command, msg, drop=drop, write_str=write_str)
+
+    @staticmethod
+    def split_command(command):
+        """Split a command into its name and parameter.
+
+        Parameters
+        ----------
+        command : `str`
+            The command, e.g. ``az=?``, ``new_az=10`` or ``MG az,alt``.
+
+        Returns
+        -------
+        name : `str`
+            The command name, e.g. "az", "new_az" or "MG".
+        parameter : `str`
+            The text after the ``=`` or, for ``MG``, the space;
+            "" if there is none.
+        """
+        if command.startswith("MG "):
+            return "MG", command[3:]
+        name, _, parameter = command.partition("=")
+        return name, parameter
+
+    def apply_faults(self):
+        """Apply the faults scheduled for the current command
+        and count it.
+
+        Returns
+        -------
+        drop : `bool`
+            True if the reply to the command is to be dropped.
+        """
+        drop = False
+        for fault in self.faults.pop(self.command_count, ()):
+            self.log.info(f"Injecting {fault}")
+            if fault.kind == "drop":
+                drop = True
+            elif fault.kind == "panic":
+                self.panic_status = 1
+            elif fault.kind == "status":
+                self.encoder_status[fault.variable] = fault.status
+        self.command_count += 1
+        return drop
+
+    async def write_reply(self, command, msg, drop=False, write_str=None):
+        """Write a reply after a random delay, unless it is dropped.
+
+        Parameters
+        ----------
+        command : `str`
+            The command, without terminator.
+        msg : `str`
+            The reply.
+        drop : `bool`, optional
+            If true, drop the reply.
+        write_str : callable or `None`, optional
+            Coroutine function that writes the reply;
+            None to write to the client of this server.
+        """
+        if drop or (
+            self.drop_probability > 0 and self.rng.random() < self.drop_probability
+        ):
+            self.log.debug(f"Dropping reply to {command}")
+            return
+        if not self.fast:
+            name = self.split_command(command)[0]
+            low, high = self.latencies.get(name, self.latency)
+            await asyncio.sleep(self.rng.uniform(low, high))
+        if write_str is None:
+            write_str = self.write_str
+        await write_str(msg)
+
+    def get_position(self, actuator):
+        """Return the current position of an actuator.
+
+        Parameters
+        ----------
+        actuator : `lsst.ts.simactuators.PointToPointActuator`
+            The actuator.
+
+        Returns
+        -------
+        position : `float`
+        """
+        return actuator.position(self.encoders.clock())
 
     def set_constrained_position(self, value, actuator):
         """Set actuator to position that is silently constrained to bounds.
@@ -240,7 +538,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
             max(value, actuator.min_position), actuator.max_position
         )
         self.log.info(f"constrained_value: {constrained_value}")
-        actuator.set_position(constrained_value)
+        actuator.set_position(constrained_value, start_tai=self.encoders.clock())
 
     def set_circular_constrained_position(self, value, actuator):
         """Set actuator to position that is silently constrained to bounds.
@@ -254,8 +552,10 @@ class MockServer(tcpip.OneClientReadLoopServer):
         """
         constrained_value = min(max(0, value), 360)
         self.log.info(f"constrained_value: {constrained_value}")
-        self.log.debug(f"from actuator {actuator.set_position(constrained_value)}")
-        actuator.set_position(constrained_value)
+        duration = actuator.set_position(
+            constrained_value, start_tai=self.encoders.clock()
+        )
+        self.log.debug(f"from actuator {duration}")
 
     async def do_azimuth(self):
         """Return azimuth position.
@@ -264,7 +564,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{self.encoders.azimuth.position()}"
+        return f"{self.get_position(self.encoders.azimuth)}"
 
     async def do_new_azimuth(self, azimuth):
         """Set the new azimuth position.
@@ -287,7 +587,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{self.encoders.elevation.position()}"
+        return f"{self.get_position(self.encoders.elevation)}"
 
     async def do_new_altitude(self, altitude):
         """Set the new altitude position.
@@ -310,7 +610,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{int(self.encoders.focus.position())}"
+        return f"{int(self.get_position(self.encoders.focus))}"
 
     async def do_new_focus(self, focus):
         """Set the new focus value.
@@ -333,8 +633,8 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        self.log.debug(f"mask_select: {self.encoders.mask_select.position()}")
-        return f"{self.encoders.mask_select.position()}"
+        self.log.debug(f"mask_select: {self.get_position(self.encoders.mask_select)}")
+        return f"{self.get_position(self.encoders.mask_select)}"
 
     async def do_new_mask(self, mask):
         """Set the new mask value.
@@ -359,8 +659,8 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        self.log.debug(f"do_rotation {self.encoders.mask_rotate.position()}")
-        return f"{self.encoders.mask_rotate.position()}"
+        self.log.debug(f"do_rotation {self.get_position(self.encoders.mask_rotate)}")
+        return f"{self.get_position(self.encoders.mask_rotate)}"
 
     async def do_new_rotation(self, rotation):
         """Set the new mask rotation value.
@@ -399,6 +699,34 @@ class MockServer(tcpip.OneClientReadLoopServer):
             self.log.info(f"Park: {self.park}")
             return self.movement_reply
 
+    async def do_message(self, names):
+        """Return the values of several variables separated by spaces,
+        or a quoted string.
+
+        Parameters
+        ----------
+        names : `str`
+            Comma-separated variable names, or a string in double quotes.
+
+        Returns
+        -------
+        str
+
+        Raises
+        ------
+        ValueError
+            Raised when a variable is unknown.
+        """
+        if names.startswith('"'):
+            return names[1:-1]
+        values = []
+        for name in names.split(","):
+            name = name.strip()
+            if name not in self.variables:
+                raise ValueError(f"Unknown variable {name}")
+            values.append(await self.variables[name]())
+        return " ".join(values)
+
     async def do_panic(self):
         """Return the panic status value.
 
@@ -415,7 +743,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{float(0)}"
+        return f"{float(self.encoder_status['AAstat'].value)}"
 
     async def do_abstat(self):
         """Return the altitude encoder status.
@@ -424,7 +752,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{float(0)}"
+        return f"{float(self.encoder_status['ABstat'].value)}"
 
     async def do_acstat(self):
         """Return the focus encoder status.
@@ -433,7 +761,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{float(0)}"
+        return f"{float(self.encoder_status['ACstat'].value)}"
 
     async def do_adstat(self):
         """Return the mask selection encoder status.
@@ -442,7 +770,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{float(0)}"
+        return f"{float(self.encoder_status['ADstat'].value)}"
 
     async def do_aestat(self):
         """Return the mask rotation encoder status.
@@ -451,7 +779,7 @@ class MockServer(tcpip.OneClientReadLoopServer):
         -------
         str
         """
-        return f"{float(0)}"
+        return f"{float(self.encoder_status['AEstat'].value)}"
 
     async def do_autopark(self):
         """Return the autopark value.
@@ -0,0 +1,276 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = [
+    "get_positions",
+    "get_speeds",
+    "plan_order",
+    "predict_duration",
+    "resolve_points",
+    "slew_times",
+]
+
+import types
+
+import numpy as np
+
+from .axes import AXES
+
+# Axes that move together; the slowest one sets the slew time.
+MOTION_AXES = ("azimuth", "elevation", "focus", "mask_rotation")
+# The columns of a position array: the motion axes, then the mask,
+# which is changed before the other axes can settle.
+COLUMNS = MOTION_AXES + ("mask",)
+_CIRCULAR = np.array([AXES[name].circular for name in COLUMNS])
+_MASK = COLUMNS.index("mask")
+
+
+def get_positions(points):
+    """Convert points of a pointing grid to a position array.
+
+    Parameters
+    ----------
+    points : `list` [`types.SimpleNamespace`]
+        The points, as returned by `make_point`.
+
+    Returns
+    -------
+    positions : `numpy.ndarray`
+        Array of shape (len(points), len(COLUMNS)), with nan for axes
+        that a point leaves unchanged.
+    """
+    positions = np.full((len(points), len(COLUMNS)), np.nan)
+    for i, point in enumerate(points):
+        for j, name in enumerate(COLUMNS):
+            value = getattr(point, name)
+            if value is not None:
+                positions[i, j] = float(value)
+    return positions
+
+
+def fill_positions(positions):
+    """Replace nan in a position array by the last value set above it.
+
+    Parameters
+    ----------
+    positions : `numpy.ndarray`
+        Array of shape (N, len(COLUMNS)), as returned by `get_positions`,
+        whose first row is the starting position.
+
+    Returns
+    -------
+    positions : `numpy.ndarray`
+        A copy of ``positions`` in which each axis that a point leaves
+        unchanged has the position it would have when the points are
+        visited in order; nan only if the axis is never set.
+    """
+    rows = np.arange(len(positions))[:, np.newaxis]
+    index = np.maximum.accumulate(np.where(np.isnan(positions), 0, rows), axis=0)
+    return np.take_along_axis(positions, index, axis=0)
+
+
+def resolve_points(points, start):
+    """Set the axes that points leave unchanged to the position they
+    would have when the points are visited in the given order.
+
+    Visiting the resolved points in any order puts each point at the
+    position that visiting the points in the given order would.
+
+    Parameters
+    ----------
+    points : `list` [`types.SimpleNamespace`]
+        The points, as returned by `make_point`.
+    start : `types.SimpleNamespace`
+        The current position.
+
+    Returns
+    -------
+    points : `list` [`types.SimpleNamespace`]
+        The resolved points; axes also unknown in ``start`` stay None.
+    """
+    resolved = []
+    current = start
+    for point in points:
+        current = types.SimpleNamespace(
+            **{
+                name: getattr(current, name) if value is None else value
+                for name, value in vars(point).items()
+            }
+        )
+        resolved.append(current)
+    return resolved
+
+
+def get_speeds(speeds=None):
+    """Return the speed of each column of a position array.
+
+    Parameters
+    ----------
+    speeds : `dict` [`str`, `float`] or `None`, optional
+        The speed of each axis (position units/second), keyed by axis name;
+        axes that are omitted, or all axes if None, move at the speed
+        in `AXES`.
+
+    Returns
+    -------
+    speeds : `numpy.ndarray`
+        The speeds, in the order of `COLUMNS`.
+    """
+    if speeds is None:
+        speeds = dict()
+    return np.array([speeds.get(name, AXES[name].speed) for name in COLUMNS])
+
+
+def _slew_times(start, end, speeds):
+    """Estimate slew times between positions that broadcast together,
+    given the speeds returned by `get_speeds`; see `slew_times`."""
+    distances = np.nan_to_num(np.abs(end - start), nan=0.0)
+    circular = distances[..., _CIRCULAR] % 360
+    distances[..., _CIRCULAR] = np.minimum(circular, 360 - circular)
+    times = distances / speeds
+    return times[..., :_MASK].max(axis=-1) + times[..., _MASK]
+
+
+def slew_times(start, end, speeds=None):
+    """Estimate the slew times between two sets of positions.
+
+    Azimuth, elevation, focus and mask rotation move at the same time,
+    so the slowest of them sets the time; mask rotation moves the shortest
+    way around. A mask change adds the time of the mask selector.
+    An axis that is nan in either position is assumed not to move.
+
+    Parameters
+    ----------
+    start : `numpy.ndarray`
+        Starting positions, of shape (N, len(COLUMNS)).
+    end : `numpy.ndarray`
+        Final positions, of shape (M, len(COLUMNS)).
+    speeds : `dict` [`str`, `float`] or `None`, optional
+        The speed of each axis (position units/second), keyed by axis name;
+        axes that are omitted, or all axes if None, move at the speed
+        in `AXES`.
+
+    Returns
+    -------
+    times : `numpy.ndarray`
+        The slew times (seconds), of shape (N, M).
+    """
+    return _slew_times(
+        start[:, np.newaxis, :], end[np.newaxis, :, :], get_speeds(speeds)
+    )
+
+
+def predict_duration(points, start, speeds=None):
+    """Predict the total slew time to visit points in the given order.
+
+    Each axis that a point leaves unchanged stays where the previous
+    point put it.
+
+    Parameters
+    ----------
+    points : `list` [`types.SimpleNamespace`]
+        The points, as returned by `make_point`.
+    start : `types.SimpleNamespace`
+        The current position.
+    speeds : `dict` [`str`, `float`] or `None`, optional
+        The speed of each axis (position units/second), keyed by axis name;
+        axes that are omitted, or all axes if None, move at the speed
+        in `AXES`.
+
+    Returns
+    -------
+    duration : `float`
+        The predicted total slew time (seconds).
+    """
+    positions = fill_positions(get_positions([start] + list(points)))
+    return float(np.sum(_slew_times(positions[:-1], positions[1:], get_speeds(speeds))))
+
+
+def plan_order(points, start, max_passes=100, speeds=None):
+    """Find a visiting order of points with a short total slew time.
+
+    The order is built by visiting the nearest point first,
+    then improved with 2-opt moves (reversing a section of the path)
+    until no move shortens it or ``max_passes`` is reached.
+
+    Each axis that a point leaves unchanged is planned at the position
+    it would have when the points are visited in the given order,
+    so visit the points returned by `resolve_points` in the planned order
+    for the predicted slew time to hold.
+
+    Parameters
+    ----------
+    points : `list` [`types.SimpleNamespace`]
+        The points, as returned by `make_point`.
+    start : `types.SimpleNamespace`
+        The current position.
+    max_passes : `int`, optional
+        The maximum number of 2-opt passes over the path.
+    speeds : `dict` [`str`, `float`] or `None`, optional
+        The speed of each axis (position units/second), keyed by axis name;
+        axes that are omitted, or all axes if None, move at the speed
+        in `AXES`.
+
+    Returns
+    -------
+    order : `list` [`int`]
+        The indices of ``points``, in the order to visit them.
+    duration : `float`
+        The predicted total slew time (seconds).
+    """
+    if not points:
+        return [], 0.0
+    positions = fill_positions(get_positions([start] + list(points)))
+    # Index 0 is the starting position.
+    costs = slew_times(positions, positions, speeds=speeds)
+    num_nodes = len(positions)
+
+    path = np.zeros(num_nodes, dtype=int)
+    visited = np.zeros(num_nodes, dtype=bool)
+    visited[0] = True
+    for i in range(1, num_nodes):
+        candidates = np.where(visited, np.inf, costs[path[i - 1]])
+        path[i] = np.argmin(candidates)
+        visited[path[i]] = True
+
+    # Reversing path[i : j + 1] replaces the edges
+    # (path[i - 1], path[i]) and (path[j], path[j + 1])
+    # by (path[i - 1], path[j]) and (path[i], path[j + 1]).
+    # The path is open, so the last node has no following edge.
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, num_nodes - 1):
+            before, first = path[i - 1], path[i]
+            last = path[i + 1 :]
+            after = path[i + 2 :]
+            gain = costs[before, last] - costs[before, first]
+            gain[:-1] += costs[first, after] - costs[last[:-1], after]
+            k = np.argmin(gain)
+            if gain[k] < -1e-9:
+                j = i + 1 + k
+                path[i : j + 1] = path[i : j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+
+    duration = float(np.sum(costs[path[:-1], path[1:]]))
+    return [int(index) - 1 for index in path[1:]], duration
@@ -0,0 +1,207 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = ["RECORD_DTYPE", "TelemetryRecorder", "read_telemetry_records"]
+
+import math
+import pathlib
+import time
+
+import numpy as np
+from lsst.ts import utils
+
+from .wizardry import PARK_VARIABLES, POSITION_VARIABLES, STATUS_VARIABLES
+
+# Controller variables stored in each record.
+RECORD_VARIABLES = STATUS_VARIABLES + PARK_VARIABLES + POSITION_VARIABLES
+
+# One record per read of controller variables: the time of the read
+# (``time.monotonic`` and TAI unix seconds) and the value of each
+# controller variable, or nan if the variable was not read.
+RECORD_DTYPE = np.dtype(
+    [("monotonic", "<f8"), ("tai", "<f8")]
+    + [(name, "<f8") for name in RECORD_VARIABLES]
+)
+
+_MAGIC = b"CBPTLM01"
+_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("record_size", "<u8"),
+        ("capacity", "<u8"),
+        ("count", "<u8"),
+    ]
+)
+_HEADER_SIZE = 64
+
+
+class TelemetryRecorder:
+    """Record controller variables to a memory-mapped ring file.
+
+    The file holds a header and ``capacity`` fixed-size records of type
+    `RECORD_DTYPE`; once full, the oldest records are overwritten.
+    A record is written to the mapped memory before the record count,
+    so the file is consistent even if the process dies, and it keeps the
+    history across restarts. Read it with `read_telemetry_records`.
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        The file. If it exists and has the same capacity and record type,
+        recording continues after its last record;
+        otherwise it is overwritten.
+    capacity : `int`
+        The number of records.
+    clock : callable or `None`, optional
+        Function returning the current TAI unix seconds;
+        None for `lsst.ts.utils.current_tai`.
+
+    Raises
+    ------
+    ValueError
+        Raised when ``capacity`` < 1.
+
+    Attributes
+    ----------
+    path : `pathlib.Path`
+    capacity : `int`
+    header : `numpy.memmap`
+        The header, of which ``count`` is the number of records written
+        since the file was created.
+    records : `numpy.memmap`
+        The records, in ring order.
+    """
+
+    def __init__(self, path, capacity, clock=None):
+        if capacity < 1:
+            raise ValueError(f"capacity={capacity} must be >= 1")
+        self.path = pathlib.Path(path)
+        self.capacity = capacity
+        self.clock = utils.current_tai if clock is None else clock
+        size = _HEADER_SIZE + capacity * RECORD_DTYPE.itemsize
+        mode = "r+" if self._is_compatible(size) else "w+"
+        self.header = np.memmap(self.path, dtype=_HEADER_DTYPE, mode=mode, shape=(1,))
+        self.records = np.memmap(
+            self.path,
+            dtype=RECORD_DTYPE,
+            mode="r+",
+            offset=_HEADER_SIZE,
+            shape=(capacity,),
+        )
+        if mode == "w+":
+            self.header[0] = (_MAGIC, RECORD_DTYPE.itemsize, capacity, 0)
+
+    def _is_compatible(self, size):
+        """Is the file an existing telemetry file of this capacity?"""
+        if not self.path.exists() or self.path.stat().st_size != size:
+            return False
+        header = np.fromfile(self.path, dtype=_HEADER_DTYPE, count=1)[0]
+        return (
+            header["magic"] == _MAGIC
+            and header["record_size"] == RECORD_DTYPE.itemsize
+            and header["capacity"] == self.capacity
+        )
+
+    @property
+    def count(self):
+        """The number of records written since the file was created."""
+        return int(self.header["count"][0])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def record(self, values):
+        """Append a record.
+
+        Parameters
+        ----------
+        values : `dict` [`str`, `float`]
+            Controller variable values, keyed by variable name.
+            Variables that are not in `RECORD_DTYPE` are ignored.
+        """
+        count = self.count
+        row = [time.monotonic(), self.clock()]
+        row += [values.get(name, math.nan) for name in RECORD_VARIABLES]
+        self.records[count % self.capacity] = tuple(row)
+        self.header["count"][0] = count + 1
+
+    def read(self):
+        """Return a copy of the records, oldest first.
+
+        Returns
+        -------
+        records : `numpy.ndarray`
+            Array of `RECORD_DTYPE`.
+        """
+        return _ring_to_array(self.records, self.count)
+
+    def flush(self):
+        """Write the mapped memory to disk."""
+        self.records.flush()
+        self.header.flush()
+
+    def close(self):
+        """Flush and unmap the file."""
+        self.flush()
+        del self.records
+        del self.header
+
+
+def _ring_to_array(records, count):
+    capacity = len(records)
+    if count <= capacity:
+        return np.array(records[:count])
+    start = count % capacity
+    return np.concatenate([records[start:], records[:start]])
+
+
+def read_telemetry_records(path):
+    """Read the records of a file written by `TelemetryRecorder`.
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        The file.
+
+    Returns
+    -------
+    records : `numpy.ndarray`
+        Array of `RECORD_DTYPE`, oldest first.
+
+    Raises
+    ------
+    ValueError
+        Raised when the file is not a telemetry file.
+    """
+    data = pathlib.Path(path).read_bytes()
+    if len(data) < _HEADER_SIZE:
+        raise ValueError(f"{path} is not a telemetry file: too short")
+    header = np.frombuffer(data, dtype=_HEADER_DTYPE, count=1)[0]
+    if header["magic"] != _MAGIC or header["record_size"] != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a telemetry file of this version")
+    capacity = int(header["capacity"])
+    if len(data) != _HEADER_SIZE + capacity * RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is truncated")
+    records = np.frombuffer(
+        data, dtype=RECORD_DTYPE, offset=_HEADER_SIZE, count=capacity
+    )
+    return _ring_to_array(records, int(header["count"]))
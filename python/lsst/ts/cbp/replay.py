@@ -0,0 +1,275 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = ["ExchangeReplies", "RecordReplies", "ReplayServer"]
+
+import asyncio
+import collections
+import logging
+import math
+import pathlib
+import time
+
+import numpy as np
+from lsst.ts import tcpip
+
+from . import capture, recorder
+
+# Replies of the Galil controller to a command it rejects or accepts.
+ERROR_REPLY = b"?\r\n"
+ACCEPTED_REPLY = b":\r\n"
+# Commands that set a controller variable, e.g. "new_az=10".
+SET_COMMANDS = frozenset(("new_az", "new_alt", "new_foc", "new_msk", "new_rot", "park"))
+
+
+class ReplayServer(tcpip.OneClientReadLoopServer):
+    """Serve recorded controller traffic back to a client, in place of
+    the controller.
+
+    The recording is one of:
+
+    * A trace file written by `TraceWriter`. Each command gets the reply
+      recorded for the same command, in the order recorded, after the
+      recorded latency; a command whose reply was lost gets no reply.
+      Once the recorded replies to a command are used up, the last one
+      is repeated.
+    * A telemetry file written by `TelemetryRecorder`. Queries of
+      controller variables, alone or with ``MG``, get the values
+      recorded at the current replay time, which starts with the first
+      command; all other commands are accepted. Replies are not delayed.
+
+    Commands that are not in the recording are rejected with ``?``,
+    except ``MG "<text>"``, which echoes the text as the controller does.
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        The trace or telemetry file.
+    speed : `float`, optional
+        How fast to replay compared to the recording: 1 for the original
+        timing, 10 for 10 times faster, `math.inf` for no delay.
+    log : `logging.Logger`, optional
+
+    Raises
+    ------
+    ValueError
+        Raised when ``speed`` <= 0, or the file is neither a trace file
+        nor a telemetry file.
+
+    Attributes
+    ----------
+    path : `pathlib.Path`
+    speed : `float`
+    replies : `ExchangeReplies` or `RecordReplies`
+        The source of the replies.
+    command_count : `int`
+        The number of commands received.
+    log : `logging.Logger`
+    """
+
+    def __init__(self, path, speed=1, log=None):
+        if speed <= 0:
+            raise ValueError(f"speed={speed} must be > 0")
+        if log is None:
+            self.log = logging.getLogger(type(self).__name__)
+        else:
+            self.log = log.getChild(type(self).__name__)
+        self.path = pathlib.Path(path)
+        self.speed = speed
+        self.command_count = 0
+        with open(self.path, "rb") as file:
+            magic = file.read(len(capture.TRACE_MAGIC))
+        if magic == capture.TRACE_MAGIC:
+            self.replies = ExchangeReplies(
+                capture.get_exchanges(capture.read_trace(self.path)), speed=speed
+            )
+        else:
+            self.replies = RecordReplies(
+                recorder.read_telemetry_records(self.path), speed=speed
+            )
+        super().__init__(
+            name="CBP Replay Server", host=tcpip.LOCAL_HOST, port=0, log=self.log
+        )
+
+    async def read_and_dispatch(self):
+        """Read a command line and reply to each of its commands."""
+        line = await self.read_str()
+        for command in line.split(";"):
+            self.command_count += 1
+            reply, delay = self.replies.get_reply(command)
+            if reply is None:
+                continue
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.write(reply)
+
+
+class ExchangeReplies:
+    """Replies from the command/reply exchanges of a trace.
+
+    Parameters
+    ----------
+    exchanges : `list` [`types.SimpleNamespace`]
+        Exchanges, as returned by `get_exchanges`.
+    speed : `float`
+        The replay speed; see `ReplayServer`.
+
+    Attributes
+    ----------
+    replies : `dict` [`str`, `collections.deque`]
+        The ``(reply, latency)`` of each exchange, keyed by command.
+    """
+
+    def __init__(self, exchanges, speed):
+        self.speed = speed
+        self.replies = collections.defaultdict(collections.deque)
+        for exchange in exchanges:
+            self.replies[exchange.command].append((exchange.reply, exchange.latency))
+
+    def get_reply(self, command):
+        """Return the reply to a command.
+
+        Parameters
+        ----------
+        command : `str`
+            The command, without terminator.
+
+        Returns
+        -------
+        reply : `bytes` or `None`
+            The reply, including any terminator; None for no reply.
+        delay : `float`
+            The time to wait before replying (seconds).
+        """
+        replies = self.replies.get(command)
+        if not replies:
+            return get_default_reply(command), 0
+        reply, latency = replies[0] if len(replies) == 1 else replies.popleft()
+        delay = 0 if math.isnan(latency) else latency / self.speed
+        return reply, delay
+
+
+class RecordReplies:
+    """Replies from the controller variables recorded by a
+    `TelemetryRecorder`.
+
+    Parameters
+    ----------
+    records : `numpy.ndarray`
+        Records of `RECORD_DTYPE`, oldest first.
+    speed : `float`
+        The replay speed; see `ReplayServer`.
+
+    Raises
+    ------
+    ValueError
+        Raised when there are no records.
+
+    Attributes
+    ----------
+    times : `numpy.ndarray`
+        The ``monotonic`` time of each record.
+    values : `dict` [`str`, `numpy.ndarray`]
+        The values of each controller variable, keyed by variable name.
+        Each value holds until the variable is read again. Variables that
+        were never read are omitted.
+    start_time : `float` or `None`
+        The `time.monotonic` time of the first command, if any.
+    """
+
+    def __init__(self, records, speed):
+        if len(records) == 0:
+            raise ValueError("No records to replay.")
+        self.speed = speed
+        # The recording may span restarts of the monotonic clock.
+        self.times = np.maximum.accumulate(records["monotonic"])
+        self.values = dict()
+        for name in recorder.RECORD_VARIABLES:
+            column = records[name]
+            was_read = ~np.isnan(column)
+            if not was_read.any():
+                continue
+            # Index of the last record that read the variable,
+            # or the first one for records before it.
+            first = np.argmax(was_read)
+            index = np.where(was_read, np.arange(len(column)), first)
+            self.values[name] = column[np.maximum.accumulate(index)]
+        self.start_time = None
+
+    def get_index(self):
+        """Return the index of the record at the current replay time."""
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now
+        elapsed = now - self.start_time
+        replay_time = self.times[0] + (elapsed * self.speed if elapsed > 0 else 0)
+        return max(int(np.searchsorted(self.times, replay_time, side="right")) - 1, 0)
+
+    def get_reply(self, command):
+        """Return the reply to a command.
+
+        Parameters
+        ----------
+        command : `str`
+            The command, without terminator.
+
+        Returns
+        -------
+        reply : `bytes` or `None`
+            The reply, including the terminator.
+        delay : `float`
+            The time to wait before replying (seconds); always 0.
+        """
+        index = self.get_index()
+        if command.startswith("MG ") and not command.startswith('MG "'):
+            names = [name.strip() for name in command[3:].split(",")]
+        elif command.endswith("=?"):
+            names = [command[:-2]]
+        elif command.partition("=")[0] in SET_COMMANDS:
+            return ACCEPTED_REPLY, 0
+        else:
+            return get_default_reply(command), 0
+        values = []
+        for name in names:
+            column = self.values.get(name)
+            if column is None:
+                return ERROR_REPLY, 0
+            values.append(f"{column[index]:0.4f}")
+        return (" ".join(values) + "\r\n").encode(), 0
+
+
+def get_default_reply(command):
+    """Return the reply to a command that is not in the recording.
+
+    Parameters
+    ----------
+    command : `str`
+        The command, without terminator.
+
+    Returns
+    -------
+    reply : `bytes`
+        The text of ``MG "<text>"``, else the ``?`` error reply.
+    """
+    if command.startswith('MG "') and command.endswith('"'):
+        return command[4:-1].encode() + b"\r\n"
+    return ERROR_REPLY
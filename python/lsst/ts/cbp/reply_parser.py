@@ -0,0 +1,148 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = [
+    "ReplyError",
+    "ReplyMismatchError",
+    "parse_bool",
+    "parse_float",
+    "parse_values",
+]
+
+# Characters around a value: whitespace, the terminator
+# and the ":" prompt of the Galil controller.
+_PADDING = b" \t\r\n:"
+_ERROR_MARKER = b"?"
+
+
+class ReplyError(RuntimeError):
+    """The controller rejected a command or sent an unreadable reply."""
+
+
+class ReplyMismatchError(ReplyError):
+    """The reply does not fit the command, e.g. it holds the wrong number
+    of values, so it is probably the reply to another command."""
+
+
+def _reply_error(reply):
+    """Make the exception for a reply that could not be parsed.
+
+    Parsing is attempted first and the reply is only inspected for the
+    ``?`` error marker when it fails, so valid replies are read in a
+    single pass.
+
+    Parameters
+    ----------
+    reply : `bytes`
+        The reply, as read from the socket.
+    """
+    if _ERROR_MARKER in reply:
+        return ReplyError(f"Controller rejected the command: {reply!r}")
+    return ReplyError(f"Cannot parse reply {reply!r}")
+
+
+def parse_float(reply):
+    """Parse a reply holding one numeric value.
+
+    Parameters
+    ----------
+    reply : `bytes`, `bytearray` or `memoryview`
+        The reply, as read from the socket, with or without the
+        terminator and ``:`` prompt.
+
+    Returns
+    -------
+    value : `float`
+
+    Raises
+    ------
+    ReplyError
+        Raised when the controller replied with the ``?`` error marker,
+        or the reply is not a number.
+    """
+    if type(reply) is not bytes:
+        reply = bytes(reply)
+    try:
+        return float(reply.strip(_PADDING))
+    except ValueError:
+        raise _reply_error(reply) from None
+
+
+def parse_bool(reply):
+    """Parse a reply holding one flag, such as ``1.0000``.
+
+    Parameters
+    ----------
+    reply : `bytes`, `bytearray` or `memoryview`
+        The reply, as read from the socket.
+
+    Returns
+    -------
+    value : `bool`
+        True if the integer part of the value is not zero.
+
+    Raises
+    ------
+    ReplyError
+        Raised when the controller replied with the ``?`` error marker,
+        or the reply is not a number.
+    """
+    if type(reply) is not bytes:
+        reply = bytes(reply)
+    try:
+        return int(float(reply.strip(_PADDING))) != 0
+    except ValueError:
+        raise _reply_error(reply) from None
+
+
+def parse_values(reply, count):
+    """Parse a reply holding several whitespace-separated numbers,
+    such as the reply to an ``MG`` command.
+
+    Parameters
+    ----------
+    reply : `bytes`, `bytearray` or `memoryview`
+        The reply, as read from the socket.
+    count : `int`
+        The expected number of values.
+
+    Returns
+    -------
+    values : `list` [`float`]
+
+    Raises
+    ------
+    ReplyError
+        Raised when the controller replied with the ``?`` error marker,
+        or the reply is not numbers.
+    ReplyMismatchError
+        Raised when the reply does not hold ``count`` numbers.
+    """
+    if type(reply) is not bytes:
+        reply = bytes(reply)
+    try:
+        values = list(map(float, reply.strip(_PADDING).split()))
+    except ValueError:
+        raise _reply_error(reply) from None
+    if len(values) != count:
+        raise ReplyMismatchError(f"Expected {count} values; got {reply!r}")
+    return values
@@ -0,0 +1,128 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+__all__ = ["check_points", "load_grid", "make_point"]
+
+import types
+
+import yaml
+
+from . import axes, planner
+
+
+def make_point(azimuth, elevation, focus=None, mask=None, mask_rotation=None):
+    """Make a point of a pointing grid.
+
+    Parameters
+    ----------
+    azimuth : `float`
+        The azimuth (degrees).
+    elevation : `float`
+        The elevation (degrees).
+    focus : `int` or `None`, optional
+        The focus (microns); None to leave it unchanged.
+    mask : `str` or `None`, optional
+        The mask, as accepted by `CBPComponent.set_mask`, e.g. "1";
+        None to leave it unchanged.
+    mask_rotation : `float` or `None`, optional
+        The mask rotation (degrees); None to leave it unchanged.
+
+    Returns
+    -------
+    point : `types.SimpleNamespace`
+        The point, with one attribute per parameter.
+    """
+    return types.SimpleNamespace(
+        azimuth=azimuth,
+        elevation=elevation,
+        focus=focus,
+        mask=None if mask is None else str(mask),
+        mask_rotation=mask_rotation,
+    )
+
+
+def load_grid(path):
+    """Read a pointing grid from a YAML file.
+
+    The file holds a list of points, each a mapping with ``azimuth``
+    and ``elevation`` and, optionally, ``focus``, ``mask`` and
+    ``mask_rotation``, e.g.::
+
+        - {azimuth: 0, elevation: 10, mask: "1"}
+        - {azimuth: 5, elevation: 10, mask_rotation: 45}
+
+    Parameters
+    ----------
+    path : `str` or `pathlib.Path`
+        The path of the file.
+
+    Returns
+    -------
+    points : `list` [`types.SimpleNamespace`]
+        The points, as returned by `make_point`.
+
+    Raises
+    ------
+    ValueError
+        Raised when the file is not a list of points.
+    """
+    with open(path, "r") as f:
+        data = yaml.safe_load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"{path} does not hold a list of points")
+    try:
+        return [make_point(**item) for item in data]
+    except TypeError as e:
+        raise ValueError(f"{path} holds an invalid point: {e}") from e
+
+
+def check_points(points, masks=None):
+    """Check that all points of a pointing grid are within the axis limits.
+
+    Parameters
+    ----------
+    points : `list` [`types.SimpleNamespace`]
+        The points, as returned by `make_point`.
+    masks : `MaskRegistry` or `None`, optional
+        If not None, also check that each mask is the key of a mask
+        in ``masks``, e.g. "2" but not "2.0"; the unknown mask is refused.
+
+    Raises
+    ------
+    ValueError
+        Raised when any point is out of range or has no such mask.
+        The message lists every offending value and the index of its point.
+    """
+    if masks is not None:
+        unknown = [
+            (i, point.mask)
+            for i, point in enumerate(points)
+            if point.mask is not None
+            and (point.mask not in masks or masks[point.mask] is masks.unknown)
+        ]
+        if unknown:
+            offending = ", ".join(f"[{i}]={mask!r}" for i, mask in unknown)
+            raise ValueError(f"mask not in the allowed list of masks: {offending}")
+    positions = planner.get_positions(points)
+    axes.check_positions(
+        **{name: positions[:, i] for i, name in enumerate(planner.COLUMNS)}
+    )
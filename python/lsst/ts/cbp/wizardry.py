@@ -1 +1,18 @@
 NUMBER_OF_RETRIES = 10
+# Galil command lines are limited to 80 characters.
+MAX_COMMAND_LENGTH = 80
+# Controller variables read by the telemetry loop, in the order
+# they are requested from the controller.
+STATUS_VARIABLES = ("wdpanic", "AAstat", "ABstat", "ACstat", "ADstat", "AEstat")
+PARK_VARIABLES = ("park", "autopark")
+POSITION_VARIABLES = ("alt", "az", "foc", "msk", "rot")
+# The telemetry group of each of the variables above.
+VARIABLE_GROUPS = {
+    name: group
+    for group, variables in (
+        ("status", STATUS_VARIABLES),
+        ("park", PARK_VARIABLES),
+        ("position", POSITION_VARIABLES),
+    )
+    for name in variables
+}
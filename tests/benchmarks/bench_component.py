@@ -0,0 +1,178 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Measure the hot paths of `CBPComponent` against `MockServer`.
+
+Runs the CSC in simulation mode, with the mock controller replying
+without delay, and measures:
+
+* ``send_command``: commands per second, sent one at a time
+  and pipelined, and the round trip time.
+* ``update_status``: the telemetry cycle time and CPU time per cycle.
+* ``update_in_position``: the time and CPU time per call.
+* ``move``: the time from the move command to all axes in position,
+  by phase; see `CommandTiming`.
+
+The telemetry loop of the CSC keeps running, as it does in operation.
+Times are in seconds.
+
+Run with ``python tests/benchmarks/bench_component.py --output results.json``;
+the results are written as JSON, to compare across releases.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import pathlib
+import platform
+import time
+import types
+
+from lsst.ts import cbp, salobj
+
+CONFIG_DIR = pathlib.Path(__file__).parents[1] / "data" / "config"
+SEED = 47
+
+
+async def time_calls(function, number):
+    """Await ``function()`` ``number`` times, one call at a time.
+
+    Parameters
+    ----------
+    function : callable
+        Coroutine function to time.
+    number : `int`
+        The number of calls.
+
+    Returns
+    -------
+    result : `dict`
+        `LatencyHistogram.summary` of the call durations, plus
+        ``per_second``: calls per second, and ``cpu_per_call``:
+        process CPU time per call.
+    """
+    histogram = cbp.LatencyHistogram(min_value=1e-6)
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for i in range(number):
+        call_start = time.perf_counter()
+        await function()
+        histogram.record(time.perf_counter() - call_start)
+    duration = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+    return dict(
+        histogram.summary(),
+        per_second=number / duration,
+        cpu_per_call=cpu_time / number,
+    )
+
+
+async def bench_send_command(component, number):
+    serial = await time_calls(lambda: component.send_command("az=?", log=False), number)
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[component.send_command("az=?", log=False) for i in range(number)]
+    )
+    duration = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+    pipelined = dict(per_second=number / duration, cpu_per_call=cpu_time / number)
+    return dict(serial=serial, pipelined=pipelined)
+
+
+async def bench_move(csc, number, amplitude):
+    csc.command_timings = cbp.CommandTimings()
+    for i in range(number):
+        azimuth = amplitude if i % 2 == 0 else -amplitude
+        await csc.do_move(types.SimpleNamespace(azimuth=azimuth, elevation=0))
+    return csc.command_timings.summary("move.")
+
+
+async def run_benchmarks(csc, num_commands, num_cycles, num_moves, amplitude):
+    """Run the benchmarks on an enabled CSC in simulation mode.
+
+    Returns
+    -------
+    results : `dict`
+        The results of each benchmark, keyed by name.
+    """
+    component = csc.component
+    return dict(
+        send_command=await bench_send_command(component, num_commands),
+        update_status=await time_calls(component.update_status, num_cycles),
+        update_in_position=await time_calls(component.update_in_position, num_cycles),
+        move=await bench_move(csc, num_moves, amplitude),
+    )
+
+
+async def amain(args):
+    salobj.set_test_topic_subname()
+    async with cbp.CBPCSC(
+        initial_state=salobj.State.ENABLED,
+        simulation_mode=1,
+        config_dir=CONFIG_DIR,
+        simulator_settings=dict(fast=True, seed=args.seed),
+    ) as csc:
+        results = await run_benchmarks(
+            csc,
+            num_commands=args.commands,
+            num_cycles=args.cycles,
+            num_moves=args.moves,
+            amplitude=args.amplitude,
+        )
+    report = dict(
+        version=cbp.__version__,
+        python=platform.python_version(),
+        date=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        settings=dict(
+            commands=args.commands,
+            cycles=args.cycles,
+            moves=args.moves,
+            amplitude=args.amplitude,
+            seed=args.seed,
+        ),
+        results=results,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output", type=pathlib.Path, help="JSON file for the results."
+    )
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--cycles", type=int, default=500)
+    parser.add_argument("--moves", type=int, default=10)
+    parser.add_argument(
+        "--amplitude", type=float, default=1, help="Azimuth of the moves (deg)."
+    )
+    parser.add_argument("--seed", type=int, default=SEED)
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Compare `lsst.ts.cbp.reply_parser` with the string based parsing
+that `CBPComponent` used before it.
+
+Run with ``python tests/benchmarks/bench_reply_parser.py``.
+"""
+import timeit
+
+from lsst.ts.cbp import reply_parser
+
+NUMBER = 100_000
+FLAG_REPLY = b": 1.0000\r\n"
+POSITION_REPLY = b": -12.3456\r\n"
+MG_REPLY = b": 0.0000 1.0000 0.0000 0.0000 1.0000 12.3456 -45.6789\r\n"
+
+
+def string_bool(reply):
+    return bool(int(float(reply.decode()[:-2].strip(":"))))
+
+
+def string_float(reply):
+    return float(reply.decode()[:-2].strip(":"))
+
+
+def string_values(reply):
+    return [float(value) for value in reply.decode()[:-2].strip(":").split()]
+
+
+def main():
+    cases = (
+        ("flag", FLAG_REPLY, string_bool, reply_parser.parse_bool),
+        ("position", POSITION_REPLY, string_float, reply_parser.parse_float),
+        (
+            "MG reply",
+            MG_REPLY,
+            string_values,
+            lambda reply: reply_parser.parse_values(reply, 7),
+        ),
+    )
+    for name, reply, string_parser, parser in cases:
+        assert string_parser(reply) == parser(reply)
+        string_time = timeit.timeit(lambda: string_parser(reply), number=NUMBER)
+        parser_time = timeit.timeit(lambda: parser(reply), number=NUMBER)
+        print(
+            f"{name:10s}: str path {string_time / NUMBER * 1e9:6.0f} ns, "
+            f"reply_parser {parser_time / NUMBER * 1e9:6.0f} ns, "
+            f"speedup {string_time / parser_time:0.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import unittest
+
+import numpy as np
+from lsst.ts import cbp
+
+
+class AxesTestCase(unittest.TestCase):
+    def test_find_out_of_range(self):
+        out_of_range = cbp.find_out_of_range(
+            azimuth=[0, 46, -46, 45],
+            elevation=np.array([-70, 0, np.nan, 45]),
+            focus=13000,
+            mask_rotation=[0, 360, 361],
+        )
+        self.assertEqual(set(out_of_range), {"azimuth", "elevation", "mask_rotation"})
+        np.testing.assert_array_equal(out_of_range["azimuth"], [1, 2])
+        np.testing.assert_array_equal(out_of_range["elevation"], [0])
+        np.testing.assert_array_equal(out_of_range["mask_rotation"], [2])
+
+        with self.assertRaises(KeyError):
+            cbp.find_out_of_range(altitude=[0])
+
+    def test_check_positions(self):
+        cbp.check_positions(azimuth=[-45, 45], focus=[0, 13000])
+        with self.assertRaises(ValueError) as context:
+            cbp.check_positions(azimuth=[-45, 46, 47])
+        self.assertIn("[1]=46.0, [2]=47.0", str(context.exception))
+
+    def test_get_farthest_position(self):
+        mask = cbp.AXES["mask"]
+        self.assertEqual(mask.get_farthest_position("2"), 5)
+        self.assertEqual(mask.get_farthest_position(4), 1)
+        self.assertEqual(cbp.AXES["azimuth"].get_farthest_position(-10), 45)
+        # The short way around is at most 180 degrees.
+        rotation = cbp.AXES["mask_rotation"]
+        self.assertEqual(rotation.get_farthest_position(270), 90)
+        self.assertEqual(rotation.get_farthest_position(60), 240)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import asyncio
+import logging
+import pathlib
+import tempfile
+import unittest
+
+from lsst.ts import cbp, tcpip
+
+STD_TIMEOUT = 15
+
+SENT = cbp.TraceDirection.SENT
+RECEIVED = cbp.TraceDirection.RECEIVED
+
+
+class CaptureTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.log = logging.getLogger(type(self).__name__)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tempdir.name) / "cbp.trace"
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_rotation(self):
+        # Each record is 13 bytes of header plus 7 bytes of data.
+        writer = cbp.TraceWriter(self.path, max_size=16 + 3 * 20, backup_count=2)
+        for i in range(10):
+            writer.write(SENT, f"foc={i}\r\n".encode(), timestamp_ns=i)
+        writer.close()
+        paths = cbp.get_trace_paths(self.path)
+        self.assertEqual(
+            [path.name for path in paths], ["cbp.trace.2", "cbp.trace.1", "cbp.trace"]
+        )
+        records = [record for path in paths for record in cbp.read_trace(path)]
+        # The oldest file was dropped.
+        self.assertEqual(
+            [record.timestamp_ns for record in records], list(range(3, 10))
+        )
+
+        with self.subTest("An existing file is kept as the first backup."):
+            writer = cbp.TraceWriter(self.path, max_size=1000, backup_count=2)
+            writer.close()
+            paths = cbp.get_trace_paths(self.path)
+            self.assertEqual(len(paths), 3)
+            self.assertEqual(cbp.read_trace(paths[-1]), [])
+            self.assertEqual(len(cbp.read_trace(paths[-2])), 1)
+
+        with self.assertRaises(ValueError):
+            cbp.TraceWriter(self.path, max_size=-1)
+
+    async def test_tracing_client(self):
+        writer = cbp.TraceWriter(self.path)
+        server = cbp.MockServer(log=self.log, fast=True, seed=1)
+        await asyncio.wait_for(server.start_task, timeout=STD_TIMEOUT)
+        try:
+            client = tcpip.Client(host=server.host, port=server.port, log=self.log)
+            await asyncio.wait_for(client.start_task, timeout=STD_TIMEOUT)
+            client = cbp.TracingClient(client, writer)
+            await client.write_str("msk=?;park=?")
+            replies = [
+                await asyncio.wait_for(client.readuntil(b"\r\n"), STD_TIMEOUT)
+                for i in range(2)
+            ]
+            self.assertTrue(client.connected)
+            await client.close()
+        finally:
+            await server.close()
+        writer.close()
+
+        records = cbp.read_trace(self.path)
+        self.assertEqual(
+            [record.direction for record in records], [SENT] + [RECEIVED] * 2
+        )
+        self.assertEqual([record.data for record in records[1:]], replies)
+        exchanges = cbp.get_exchanges(records)
+        self.assertEqual(
+            [exchange.command for exchange in exchanges], ["msk=?", "park=?"]
+        )
+        for exchange in exchanges:
+            self.assertGreater(exchange.latency, 0)
+
+    def test_summarize_trace(self):
+        items = [
+            (0, SENT, b"az=?\r\n"),
+            (1_000_000, RECEIVED, b"12.5\r\n"),
+            # A connection probe is not a resynchronization.
+            (1_200_000, SENT, b'MG "PING"\r\n'),
+            (1_500_000, RECEIVED, b"PING\r\n"),
+            # The reply to new_az=5 is lost, and the command retried.
+            (2_000_000, SENT, b"new_az=5\r\n"),
+            (3_000_000_000, SENT, b'MG "SYNC1"\r\n'),
+            (3_001_000_000, RECEIVED, b"SYNC1\r\n"),
+            (3_002_000_000, SENT, b"new_az=5;bad\r\n"),
+            (3_005_000_000, RECEIVED, b":\r\n"),
+            (3_006_000_000, RECEIVED, b"?\r\n"),
+        ]
+        writer = cbp.TraceWriter(self.path)
+        for timestamp_ns, direction, data in items:
+            writer.write(direction, data, timestamp_ns=timestamp_ns)
+        writer.close()
+
+        summary = cbp.summarize_trace(cbp.read_trace(self.path), gap_threshold=1)
+        self.assertAlmostEqual(summary["duration"], 3.006)
+        self.assertEqual(summary["sent"]["frames"], 5)
+        self.assertEqual(summary["received"]["frames"], 5)
+        self.assertEqual(summary["received"]["bytes"], 6 + 6 + 7 + 3 + 3)
+        self.assertEqual(summary["commands"], 6)
+        self.assertEqual(summary["lost"], 1)
+        self.assertEqual(summary["retries"], 1)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["resyncs"], 1)
+        self.assertEqual(summary["gaps"]["count"], 1)
+        self.assertAlmostEqual(summary["gaps"]["max"], 2.998)
+        self.assertEqual(summary["latency"]["count"], 4)
+        self.assertEqual(
+            set(summary["command_latency"]), {"az=?", 'MG "PING"', "new_az=", "bad"}
+        )
+        self.assertAlmostEqual(summary["command_latency"]["az=?"]["max"], 0.001)
+        self.assertAlmostEqual(summary["command_latency"]['MG "PING"']["max"], 0.0003)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,13 +20,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
+import asyncio
+import collections
+import math
 import os
 import pathlib
+import tempfile
+import time
 import unittest
 
+import numpy as np
 from lsst.ts import cbp, salobj
 
 STD_TIMEOUT = 15
+SIMULATOR_SEED = 47
+# Simulated motion runs this many times faster than the real CBP.
+SIMULATOR_CLOCK_RATE = 10
 TEST_CONFIG_DIR = pathlib.Path(__file__).parents[1].joinpath("tests", "data", "config")
 
 
@@ -36,14 +45,56 @@ class CBPCSCTestCase(salobj.BaseCscTestCase, unittest.IsolatedAsyncioTestCase):
         return super().setUp()
 
     def basic_make_csc(
-        self, initial_state, config_dir=None, simulation_mode=1, **kwargs
+        self,
+        initial_state,
+        config_dir=None,
+        simulation_mode=1,
+        simulator_settings=None,
+        **kwargs,
     ):
+        if simulator_settings is None:
+            simulator_settings = dict(
+                fast=True,
+                seed=SIMULATOR_SEED,
+                clock=cbp.VirtualClock(rate=SIMULATOR_CLOCK_RATE),
+            )
         return cbp.csc.CBPCSC(
             initial_state=initial_state,
             simulation_mode=simulation_mode,
             config_dir=TEST_CONFIG_DIR,
+            simulator_settings=simulator_settings,
         )
 
+    async def restart_telemetry(self):
+        """Restart the telemetry loop of the CSC, recording the time of each
+        poll of each group of telemetry.
+
+        Returns
+        -------
+        polls : `dict` [`str`, `list` [`float`]]
+            The `time.monotonic` time of each poll, keyed by the name of the
+            component method that reads the group.
+        """
+        self.csc.telemetry_task.cancel()
+        await asyncio.gather(self.csc.telemetry_task, return_exceptions=True)
+        polls = collections.defaultdict(list)
+        component = self.csc.component
+        for name in ("update_positions", "check_cbp_status", "check_park"):
+
+            async def record_poll(update=getattr(component, name), times=polls[name]):
+                times.append(time.monotonic())
+                await update()
+
+            setattr(component, name, record_poll)
+        self.csc.telemetry_task = asyncio.create_task(self.csc.telemetry())
+        return polls
+
+    async def count_polls(self, times, duration):
+        """Return the number of polls in the next ``duration`` seconds."""
+        start = time.monotonic()
+        await asyncio.sleep(duration)
+        return sum(t >= start for t in times)
+
     async def test_standard_state_transitions(self):
         async with self.make_csc(initial_state=salobj.State.STANDBY, simulation_mode=1):
             await self.check_standard_state_transitions(
@@ -146,6 +197,69 @@ class CBPCSCTestCase(salobj.BaseCscTestCase, unittest.IsolatedAsyncioTestCase):
                     focus=True,
                 )
 
+    async def test_combined_move(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            await self.csc.component.move(
+                azimuth=-10, elevation=10, focus=800, mask_rotation=30.0
+            )
+            await self.assert_next_sample(
+                topic=self.remote.evt_target,
+                flush=True,
+                azimuth=-10,
+                elevation=10,
+                focus=800,
+                mask_rotation=30,
+            )
+            await self.csc.wait_in_position(STD_TIMEOUT)
+            await self.assert_next_sample(
+                topic=self.remote.tel_focus, flush=True, focus=800
+            )
+
+            with self.subTest("No axis moves if one is out of range."):
+                with self.assertRaises(ValueError):
+                    await self.csc.component.move(azimuth=10, focus=14000)
+                self.assertEqual(self.csc.component.target.azimuth, -10)
+
+            with self.subTest("Long command lines are split."):
+                self.assertEqual(
+                    cbp.component.join_commands(["new_az=-10.123456789"] * 5),
+                    [["new_az=-10.123456789"] * 3, ["new_az=-10.123456789"] * 2],
+                )
+
+    async def test_run_sequence(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            progress = []
+            points = await self.csc.run_sequence(
+                points=[
+                    cbp.make_point(azimuth=20, elevation=0),
+                    cbp.make_point(azimuth=5, elevation=-5, focus=500),
+                ],
+                callback=progress.append,
+            )
+            self.assertEqual([point.azimuth for point in points], [5, 20])
+            self.assertEqual([item.index for item in progress], [0, 1])
+            summary = self.csc.command_timings.summary("sequence.")
+            self.assertEqual(summary["sequence.total"]["count"], 2)
+            await self.assert_next_sample(
+                topic=self.remote.tel_azimuth, flush=True, azimuth=20
+            )
+
+            with self.subTest("Invalid mask"):
+                # The bad point is last, so nothing may move before it.
+                with self.assertRaises(ValueError):
+                    await self.csc.run_sequence(
+                        points=[
+                            cbp.make_point(azimuth=-20, elevation=0),
+                            cbp.make_point(azimuth=-10, elevation=0, mask="2.0"),
+                        ],
+                        reorder=False,
+                    )
+                summary = self.csc.command_timings.summary("sequence.")
+                self.assertEqual(summary["sequence.total"]["count"], 2)
+                self.assertEqual(self.csc.component.azimuth, 20)
+
     async def test_telemetry(self):
         async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
             await self.assert_next_sample(
@@ -184,6 +298,178 @@ class CBPCSCTestCase(salobj.BaseCscTestCase, unittest.IsolatedAsyncioTestCase):
                 flush=False,
             )
 
+    async def test_telemetry_interval(self):
+        clock = cbp.VirtualClock()
+        async with self.make_csc(
+            initial_state=salobj.State.ENABLED,
+            simulation_mode=1,
+            simulator_settings=dict(fast=True, seed=SIMULATOR_SEED, clock=clock),
+        ):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            self.csc.moving_telemetry_interval = 0.05
+            self.csc.idle_telemetry_interval = 0.5
+            polls = await self.restart_telemetry()
+            self.assertTrue(self.csc.position)
+            self.assertEqual(self.csc.telemetry_interval, 0.5)
+            self.assertLessEqual(
+                await self.count_polls(polls["update_positions"], 1), 3
+            )
+
+            # Nothing moves until the clock is advanced.
+            await self.csc.component.move(azimuth=10, elevation=0)
+            t0 = time.monotonic()
+            while self.csc.position:
+                self.assertLess(time.monotonic() - t0, STD_TIMEOUT)
+                await asyncio.sleep(0.01)
+            self.assertEqual(self.csc.telemetry_interval, 0.05)
+            self.assertGreaterEqual(
+                await self.count_polls(polls["update_positions"], 1), 8
+            )
+
+            clock.advance(self.csc.simulator.encoders.remaining_time())
+            await self.csc.wait_in_position(STD_TIMEOUT)
+            self.assertEqual(self.csc.telemetry_interval, 0.5)
+            self.assertLessEqual(
+                await self.count_polls(polls["update_positions"], 1), 3
+            )
+
+    async def test_telemetry_groups(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            self.csc.idle_telemetry_interval = 0.2
+            self.csc.status_telemetry_interval = 0.1
+            self.csc.park_telemetry_interval = 0.4
+            polls = await self.restart_telemetry()
+            await asyncio.sleep(2)
+            for name, interval in (
+                ("update_positions", 0.2),
+                ("check_cbp_status", 0.1),
+                ("check_park", 0.4),
+            ):
+                with self.subTest(name=name):
+                    times = polls[name]
+                    self.assertGreaterEqual(len(times), 3)
+                    mean_interval = (times[-1] - times[0]) / (len(times) - 1)
+                    self.assertAlmostEqual(mean_interval, interval, delta=interval / 2)
+
+    async def test_telemetry_deadband(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            component = self.csc.component
+            self.assertEqual(component.deadbands["azimuth"], 0.001)
+            self.assertFalse(component.exceeds_deadband("azimuth", 1.0005, 1))
+            self.assertTrue(component.exceeds_deadband("azimuth", 1.002, 1))
+            self.assertTrue(component.exceeds_deadband("azimuth", 1, None))
+            self.assertTrue(component.exceeds_deadband("azimuth", True, False))
+            self.assertFalse(component.exceeds_deadband("mask", "mask 1", "mask 1"))
+
+            # Unchanged telemetry is still written at the heartbeat interval.
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            await self.assert_next_sample(
+                topic=self.remote.tel_azimuth,
+                azimuth=0,
+                timeout=component.heartbeat_interval + STD_TIMEOUT,
+            )
+
+    async def test_telemetry_recorder(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            with tempfile.TemporaryDirectory() as tempdir:
+                path = pathlib.Path(tempdir) / "telemetry.dat"
+                component = self.csc.component
+                component.recorder = cbp.TelemetryRecorder(path, capacity=100)
+                await self.csc.component.update_status()
+                records = component.recorder.read()
+                # The telemetry loop also records partial reads.
+                complete = records[
+                    ~np.isnan(records["wdpanic"]) & ~np.isnan(records["az"])
+                ]
+                self.assertGreaterEqual(len(complete), 1)
+                self.assertEqual(complete["az"][-1], 0)
+                self.assertEqual(complete["msk"][-1], 1)
+                self.assertEqual(complete["park"][-1], 0)
+                component.close_recorder()
+                self.assertEqual(len(cbp.read_telemetry_records(path)), len(records))
+
+    async def test_trace(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            async with self.make_csc(
+                initial_state=salobj.State.ENABLED, simulation_mode=1
+            ):
+                path = pathlib.Path(tempdir) / "cbp.trace"
+                component = self.csc.component
+                component.trace_writer = cbp.TraceWriter(path)
+                # The client is wrapped when it connects.
+                await component.reconnect("start tracing")
+                self.assertIsInstance(component.client, cbp.TracingClient)
+                values = await component.query_variables("msk", "park")
+                self.assertEqual(values, [1, 0])
+                component.trace_writer.flush()
+                exchanges = cbp.get_exchanges(cbp.read_trace(path))
+                self.assertIn("MG msk,park", [item.command for item in exchanges])
+
+    async def test_query_variables(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            values = await self.csc.component.query_variables(
+                "az", "alt", "foc", "msk", "park"
+            )
+            self.assertEqual(values, [0, 0, 0, 1, 0])
+
+            with self.subTest("Split over several messages."):
+                values = await self.csc.component.query_variables(*["msk"] * 30)
+                self.assertEqual(values, [1] * 30)
+
+    async def test_pipelined_commands(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            component = self.csc.component
+            # Interleave commands with different replies to check that
+            # each reply is matched to its own command.
+            # Throughput is measured by tests/benchmarks/bench_component.py.
+            commands = ("az=?", "msk=?") * 10
+
+            serial_replies = [
+                await component.send_command(msg, timeout=STD_TIMEOUT)
+                for msg in commands
+            ]
+            pipelined_replies = await asyncio.gather(
+                *[component.send_command(msg, timeout=STD_TIMEOUT) for msg in commands]
+            )
+
+            self.assertEqual([float(reply) for reply in serial_replies], [0, 1] * 10)
+            self.assertEqual([float(reply) for reply in pipelined_replies], [0, 1] * 10)
+
+    async def test_command_statistics(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            component = self.csc.component
+            self.assertIsNone(component.command_statistics)
+            component.command_statistics = cbp.CommandStatistics()
+            for i in range(3):
+                await component.send_command("msk=?", timeout=STD_TIMEOUT)
+            await component.query_variables("az", "msk")
+            summary = component.command_statistics.summary()
+            self.assertEqual(summary["msk"]["count"], 3)
+            self.assertGreater(summary["msk"]["mean_reply_bytes"], 0)
+            # Batched queries are keyed by telemetry group.
+            self.assertGreaterEqual(summary["MG position"]["count"], 1)
+            component.log_command_statistics()
+            self.assertNotIn("msk", component.command_statistics.summary())
+
+    async def test_command_timeout(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            component = self.csc.component
+            component.reply_timeout = 0.5
+            simulator = self.csc.simulator
+
+            async def ignore_command():
+                await simulator.read_str()
+
+            simulator.read_and_dispatch = ignore_command
+            with self.assertRaises(cbp.CommandTimeoutError) as context:
+                await component.send_command("az=?", timeout=2)
+            self.assertGreaterEqual(context.exception.attempts, 1)
+            self.assertLess(context.exception.duration, 2.5)
+
     async def test_setFocus(self):
         async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
             await self.assert_next_sample(
@@ -229,6 +515,104 @@ class CBPCSCTestCase(salobj.BaseCscTestCase, unittest.IsolatedAsyncioTestCase):
                         focus=14000, timeout=STD_TIMEOUT
                     )
 
+    async def test_command_timings(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            await self.remote.cmd_move.set_start(
+                azimuth=20, elevation=-30, timeout=STD_TIMEOUT
+            )
+            summary = self.csc.command_timings.summary("move.")
+            for phase in (
+                "send",
+                "motion.azimuth",
+                "motion.elevation",
+                "completion",
+                "total",
+            ):
+                self.assertEqual(summary[f"move.{phase}"]["count"], 1)
+            self.assertLessEqual(
+                summary["move.motion.azimuth"]["max"], summary["move.total"]["max"]
+            )
+            self.assertIn("move.total", self.csc.command_timings.format_summary())
+
+    async def test_motion_timeout(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            csc = self.csc
+            # Motion times are predicted from the speeds of the real CBP,
+            # not those of the mock.
+            self.assertEqual(
+                csc.axis_speeds, {name: axis.speed for name, axis in cbp.AXES.items()}
+            )
+            self.assertAlmostEqual(
+                csc.predict_motion_time(azimuth=20, elevation=-30),
+                30 / csc.axis_speeds["elevation"],
+            )
+            self.assertAlmostEqual(
+                csc.predict_motion_time(focus=2000), 2000 / csc.axis_speeds["focus"]
+            )
+            # At least 20 seconds per mask.
+            self.assertGreaterEqual(csc.predict_motion_time(mask="2"), 20)
+            self.assertEqual(csc.predict_motion_time(), 0)
+            self.assertEqual(
+                csc.get_motion_timeout(3),
+                3 * csc.motion_timeout_scale + csc.motion_timeout_margin,
+            )
+
+            with self.subTest("Unknown starting mask"):
+                # The controller reports the unknown mask when the mask
+                # encoder is off.
+                csc.tel_mask.data.mask = csc.component.masks.unknown.name
+                start = csc.get_current_point()
+                self.assertIsNone(start.mask)
+                # Assume the farthest mask, 5, three masks from mask 2.
+                self.assertAlmostEqual(
+                    csc.predict_motion_time(start=start, mask="2"),
+                    3 / csc.axis_speeds["mask"],
+                )
+                self.assertEqual(csc.predict_motion_time(start=start, azimuth=0), 0)
+
+    async def test_changeMask_real_speed(self):
+        # The mock changes masks as slowly as the real CBP, on a virtual
+        # clock that only moves when advanced.
+        clock = cbp.VirtualClock()
+        async with self.make_csc(
+            initial_state=salobj.State.ENABLED,
+            simulation_mode=1,
+            simulator_settings=dict(
+                fast=True,
+                seed=SIMULATOR_SEED,
+                clock=clock,
+                speeds=dict(mask=cbp.AXES["mask"].speed),
+            ),
+        ):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            csc = self.csc
+            predicted = csc.predict_motion_time(mask="2", mask_rotation=60)
+            mask_task = asyncio.create_task(
+                self.remote.cmd_changeMask.set_start(mask="2", timeout=STD_TIMEOUT)
+            )
+            encoders = csc.simulator.encoders
+
+            async def wait_commanded():
+                while encoders.mask_rotate.remaining_time(clock()) == 0:
+                    await asyncio.sleep(0.1)
+
+            await asyncio.wait_for(wait_commanded(), timeout=STD_TIMEOUT)
+            # Moving to the next mask takes 20 seconds on the real CBP.
+            duration = encoders.remaining_time()
+            self.assertAlmostEqual(duration, 1 / cbp.AXES["mask"].speed)
+            self.assertGreater(csc.get_motion_timeout(predicted), duration)
+
+            clock.advance(duration)
+            await mask_task
+            await self.assert_next_sample(
+                topic=self.remote.tel_mask,
+                flush=True,
+                mask="mask 2",
+                mask_rotation=60.0,
+            )
+
     async def test_park(self):
         async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
             await self.remote.cmd_park.set_start(timeout=STD_TIMEOUT)
@@ -299,6 +683,92 @@ class CBPCSCTestCase(salobj.BaseCscTestCase, unittest.IsolatedAsyncioTestCase):
                 focus=False,
             )
 
+    async def test_connection_loss(self):
+        async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            await self.csc.simulator.close_client()
+            t0 = time.monotonic()
+            while self.csc.component.reconnect_count == 0:
+                self.assertLess(time.monotonic() - t0, STD_TIMEOUT)
+                await asyncio.sleep(0.1)
+            self.assertEqual(self.csc.summary_state, salobj.State.ENABLED)
+            await self.remote.cmd_setFocus.set_start(focus=100, timeout=STD_TIMEOUT)
+            await self.assert_next_sample(
+                topic=self.remote.tel_focus, flush=True, focus=100
+            )
+
+    async def test_scheduled_faults(self):
+        faults = [
+            cbp.ScheduledFault(
+                0, "status", variable="AAstat", status=cbp.StatusError.TORQUE_LIMIT
+            ),
+            cbp.ScheduledFault(20, "drop"),
+        ]
+        async with self.make_csc(
+            initial_state=salobj.State.ENABLED,
+            simulation_mode=1,
+            simulator_settings=dict(fast=True, seed=SIMULATOR_SEED, faults=faults),
+        ):
+            await self.assert_next_sample(
+                topic=self.remote.tel_status, azimuth=True, elevation=False
+            )
+            t0 = time.monotonic()
+            while self.csc.component.resync_count == 0:
+                self.assertLess(time.monotonic() - t0, STD_TIMEOUT)
+                await asyncio.sleep(0.1)
+            self.assertEqual(self.csc.summary_state, salobj.State.ENABLED)
+
+    async def test_virtual_clock(self):
+        clock = cbp.VirtualClock()
+        async with self.make_csc(
+            initial_state=salobj.State.ENABLED,
+            simulation_mode=1,
+            simulator_settings=dict(fast=True, seed=SIMULATOR_SEED, clock=clock),
+        ):
+            await self.assert_next_sample(topic=self.remote.tel_azimuth, azimuth=0)
+            t0 = time.monotonic()
+            move_task = asyncio.create_task(
+                self.remote.cmd_move.set_start(
+                    azimuth=40, elevation=-60, timeout=STD_TIMEOUT
+                )
+            )
+            await self.assert_next_sample(
+                topic=self.remote.evt_target, flush=True, azimuth=40, elevation=-60
+            )
+            # Nothing moves until the clock is advanced.
+            await asyncio.sleep(0.5)
+            encoders = self.csc.simulator.encoders
+            self.assertEqual(encoders.azimuth.position(clock()), 0)
+            self.assertFalse(move_task.done())
+
+            clock.advance(encoders.remaining_time())
+            await move_task
+            # The elevation would take 6 seconds in real time.
+            self.assertLess(time.monotonic() - t0, 3)
+            await self.assert_next_sample(
+                topic=self.remote.tel_elevation, flush=True, elevation=-60
+            )
+
+    async def test_replay(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = pathlib.Path(tempdir) / "telemetry.dat"
+            recorder = cbp.TelemetryRecorder(path, capacity=10)
+            values = {name: 0 for name in cbp.RECORD_DTYPE.names[2:]}
+            recorder.record(dict(values, az=12.5, alt=-3, msk=1))
+            recorder.close()
+            async with self.make_csc(
+                initial_state=salobj.State.ENABLED,
+                simulation_mode=2,
+                simulator_settings=dict(path=path, speed=math.inf),
+            ):
+                self.assertIsInstance(self.csc.simulator, cbp.ReplayServer)
+                await self.assert_next_sample(
+                    topic=self.remote.tel_azimuth, azimuth=12.5
+                )
+                await self.assert_next_sample(
+                    topic=self.remote.tel_elevation, elevation=-3
+                )
+
     async def test_fault(self):
         async with self.make_csc(initial_state=salobj.State.ENABLED, simulation_mode=1):
             await self.assert_next_summary_state(state=salobj.State.ENABLED)
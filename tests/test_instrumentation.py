@@ -0,0 +1,107 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import math
+import unittest
+
+from lsst.ts.cbp import instrumentation
+
+
+class LatencyHistogramTestCase(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = instrumentation.LatencyHistogram()
+        self.assertTrue(math.isnan(histogram.percentile(50)))
+        self.assertEqual(histogram.summary(), dict(count=0))
+
+        for i in range(1, 101):
+            histogram.record(i / 100)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 100)
+        self.assertAlmostEqual(summary["mean"], 0.505)
+        self.assertEqual(summary["min"], 0.01)
+        self.assertEqual(summary["max"], 1)
+        # Percentiles are accurate to the bin width, about 12%.
+        self.assertAlmostEqual(summary["p50"], 0.5, delta=0.06)
+        self.assertAlmostEqual(summary["p90"], 0.9, delta=0.11)
+        self.assertLessEqual(summary["p99"], 1)
+
+    def test_out_of_range(self):
+        histogram = instrumentation.LatencyHistogram(min_value=0.1, max_value=10)
+        histogram.record(0.01)
+        histogram.record(100)
+        self.assertLessEqual(histogram.percentile(1), 0.1)
+        self.assertEqual(histogram.percentile(100), 100)
+
+
+class CommandTimingsTestCase(unittest.TestCase):
+    def test_phases(self):
+        timings = instrumentation.CommandTimings()
+        timing = timings.start("move")
+        timing.mark_sent()
+        timing.mark_in_position("azimuth")
+        timing.mark_in_position("elevation")
+        durations = timing.finish()
+        self.assertEqual(
+            set(durations),
+            {"send", "motion.azimuth", "motion.elevation", "completion", "total"},
+        )
+        self.assertEqual(set(timings.summary()), {f"move.{key}" for key in durations})
+        self.assertEqual(timings.summary("setFocus."), dict())
+
+
+class CommandStatisticsTestCase(unittest.TestCase):
+    def test_record(self):
+        statistics = instrumentation.CommandStatistics()
+        statistics.record("az=?", round_trip=0.01, retries=0, reply_size=12)
+        statistics.record("az=?", round_trip=0.03, retries=2, reply_size=12)
+        statistics.record("new_az=10", round_trip=0.02, retries=0, reply_size=1)
+        statistics.record_failure("msk=?")
+
+        summary = statistics.summary()
+        self.assertEqual(list(summary), ["az", "msk", "new_az"])
+        self.assertEqual(summary["az"]["count"], 2)
+        self.assertEqual(summary["az"]["retries"], 2)
+        self.assertEqual(summary["az"]["max_retries"], 2)
+        self.assertEqual(summary["az"]["mean_reply_bytes"], 12)
+        self.assertEqual(summary["msk"]["count"], 0)
+        self.assertEqual(summary["msk"]["failures"], 1)
+        self.assertIn("new_az: n=1", statistics.format_summary())
+
+        statistics.reset()
+        self.assertEqual(statistics.summary(), dict())
+
+    def test_batched_query(self):
+        statistics = instrumentation.CommandStatistics()
+        for command in (
+            "MG alt,az,foc,msk,rot",
+            "MG alt,az,foc,msk,rot",
+            "MG wdpanic,AAstat,ABstat,ACstat,ADstat,AEstat,park,autopark",
+            'MG "PING"',
+        ):
+            statistics.record(command, round_trip=0.01, retries=0, reply_size=40)
+        summary = statistics.summary()
+        self.assertEqual(list(summary), ['MG "PING"', "MG position", "MG status+park"])
+        self.assertEqual(summary["MG position"]["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import math
+import types
+import unittest
+
+from lsst.ts import cbp
+
+
+class MaskRegistryTestCase(unittest.TestCase):
+    def test_from_config(self):
+        config = types.SimpleNamespace(
+            address="localhost",
+            mask2=dict(name="pinhole", rotation=60),
+            mask1=dict(name="grid", rotation=30),
+            mask5=dict(name="slit", rotation=0),
+        )
+        masks = cbp.MaskRegistry.from_config(config)
+        self.assertEqual([info.key for info in masks], ["1", "2", "5", "9"])
+        self.assertEqual(len(masks), 4)
+        self.assertIn("5", masks)
+        self.assertNotIn("3", masks)
+        self.assertEqual(masks["2"].name, "pinhole")
+        self.assertEqual(masks["2"].rotation, 60)
+        with self.assertRaises(KeyError):
+            masks["3"]
+
+        with self.subTest("Look up by controller value and name."):
+            self.assertIs(masks.get_by_id(1.0), masks["1"])
+            self.assertIs(masks.get_by_id(5), masks["5"])
+            self.assertIs(masks.get_by_id(9.0), masks.unknown)
+            self.assertIs(masks.get_by_id(4), masks.unknown)
+            self.assertIs(masks.get_by_id(math.nan), masks.unknown)
+            self.assertIs(masks.get_by_name("slit"), masks["5"])
+            self.assertIsNone(masks.get_by_name("nothing"))
+
+        with self.subTest("Records have no instance dict."):
+            with self.assertRaises(AttributeError):
+                masks["1"].color = "red"
+
+    def test_make_default(self):
+        masks = cbp.MaskRegistry.make_default()
+        self.assertEqual(
+            [info.name for info in masks],
+            ["Empty 1", "Empty 2", "Empty 3", "Empty 4", "Empty 5", "Unknown"],
+        )
+
+    def test_invalid(self):
+        # The mask selector has positions 1 to 5.
+        for ids in ((1, 1), (0,), (6,), (cbp.UNKNOWN_MASK_ID,)):
+            with self.subTest(ids=ids):
+                with self.assertRaises(ValueError):
+                    cbp.MaskRegistry(
+                        cbp.MaskInfo(id=id, name=f"mask {id}", rotation=0) for id in ids
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import asyncio
+import logging
+import unittest
+
+from lsst.ts import cbp, tcpip
+
+STD_TIMEOUT = 15
+NUM_CONTROLLERS = 3
+CLIENTS_PER_CONTROLLER = 2
+
+
+class MockFarmTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.log = logging.getLogger(type(self).__name__)
+
+    async def make_clients(self, farm):
+        clients = []
+        for port in farm.ports:
+            for i in range(CLIENTS_PER_CONTROLLER):
+                client = tcpip.Client(host=farm.host, port=port, log=self.log)
+                await asyncio.wait_for(client.start_task, timeout=STD_TIMEOUT)
+                clients.append(client)
+        return clients
+
+    async def query(self, client, command):
+        await client.write_str(command)
+        return await asyncio.wait_for(client.read_str(), timeout=STD_TIMEOUT)
+
+    async def test_shared_state(self):
+        async with cbp.MockFarm(NUM_CONTROLLERS, fast=True, seed=1) as farm:
+            self.assertEqual(len(set(farm.ports)), NUM_CONTROLLERS)
+            clients = await self.make_clients(farm)
+            try:
+                self.assertEqual(
+                    farm.client_counts, [CLIENTS_PER_CONTROLLER] * NUM_CONTROLLERS
+                )
+                # Park the first controller with its first client.
+                self.assertEqual(await self.query(clients[0], "park=1"), ":")
+                parked = [
+                    float(await self.query(client, "park=?")) for client in clients
+                ]
+                self.assertEqual(parked, [1, 1, 0, 0, 0, 0])
+            finally:
+                for client in clients:
+                    await client.close()
+
+    async def test_concurrent_clients(self):
+        num_queries = 50
+        async with cbp.MockFarm(NUM_CONTROLLERS, fast=True, seed=1) as farm:
+            clients = await self.make_clients(farm)
+
+            async def poll(client, msg):
+                replies = []
+                for i in range(num_queries):
+                    replies.append(await self.query(client, msg))
+                return replies
+
+            try:
+                # Each client of a controller sends a different command,
+                # so a reply sent to the wrong client would be noticed.
+                results = await asyncio.gather(
+                    *[
+                        poll(client, ("msk=?", "MG wdpanic,AAstat")[i % 2])
+                        for i, client in enumerate(clients)
+                    ]
+                )
+            finally:
+                for client in clients:
+                    await client.close()
+            for i, replies in enumerate(results):
+                expected = ("1", "0.0 0.0")[i % 2]
+                self.assertEqual(replies, [expected] * num_queries)
+            for controller in farm.controllers:
+                self.assertEqual(
+                    controller.command_count, num_queries * CLIENTS_PER_CONTROLLER
+                )
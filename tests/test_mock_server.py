@@ -0,0 +1,80 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import asyncio
+import logging
+import unittest
+
+from lsst.ts import cbp
+
+STD_TIMEOUT = 15
+
+
+class MockServerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = cbp.MockServer(fast=True, seed=1)
+        await asyncio.wait_for(self.server.start_task, timeout=STD_TIMEOUT)
+        self.replies = []
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def dispatch(self, command):
+        """Dispatch a command and return the replies written so far."""
+
+        async def write_str(msg):
+            self.replies.append(msg)
+
+        await self.server.dispatch(command, write_str=write_str)
+        return self.replies
+
+    def test_split_command(self):
+        split_command = cbp.MockServer.split_command
+        self.assertEqual(split_command("az=?"), ("az", "?"))
+        self.assertEqual(split_command("new_az=-10.5"), ("new_az", "-10.5"))
+        self.assertEqual(split_command("MG az,alt"), ("MG", "az,alt"))
+        self.assertEqual(split_command('MG "PING"'), ("MG", '"PING"'))
+        self.assertEqual(split_command("az"), ("az", ""))
+        self.assertEqual(split_command("new_az=1=2"), ("new_az", "1=2"))
+
+    async def test_dispatch(self):
+        self.assertEqual(await self.dispatch("msk=?"), ["1"])
+        self.assertEqual(await self.dispatch("new_az=10"), ["1", ":"])
+        self.assertEqual(self.server.command_count, 2)
+
+    async def test_unknown_command(self):
+        with self.assertLogs(self.server.log, logging.INFO) as logs:
+            self.assertEqual(await self.dispatch("nonsense=?"), [])
+        self.assertIn("Unknown command nonsense=?", logs.output[0])
+
+    async def test_rejected_command(self):
+        for command in ("az", "az=1", "new_az=abc", "new_msk=6", "MG az;"):
+            with self.subTest(command=command):
+                with self.assertLogs(self.server.log, logging.WARNING) as logs:
+                    self.assertEqual(await self.dispatch(command), [])
+                # Bad input is not a bug of the mock: no traceback.
+                self.assertIn(f"Command {command} rejected", logs.output[0])
+                self.assertIsNone(logs.records[0].exc_info)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import itertools
+import unittest
+
+import numpy as np
+from lsst.ts import cbp
+
+# Round speeds, to make slew times easy to check.
+SPEEDS = dict(azimuth=10, elevation=10, focus=1000, mask=1, mask_rotation=10)
+
+
+def simulate_duration(points, start):
+    """Return the total slew time of visiting points in order, one at a
+    time, with each axis that a point leaves unchanged staying where it is.
+    """
+    duration = 0
+    current = cbp.get_positions([start])
+    for point in points:
+        target = cbp.get_positions([point])
+        target = np.where(np.isnan(target), current, target)
+        duration += cbp.slew_times(current, target)[0, 0]
+        current = target
+    return duration
+
+
+class PlannerTestCase(unittest.TestCase):
+    def test_slew_times(self):
+        start = cbp.get_positions(
+            [cbp.make_point(0, 0, focus=0, mask="1", mask_rotation=350)]
+        )
+        end = cbp.get_positions(
+            [
+                cbp.make_point(20, 5),
+                cbp.make_point(0, 0, focus=3000),
+                cbp.make_point(0, 0, mask_rotation=10),
+                cbp.make_point(0, 0, mask="3"),
+                cbp.make_point(10, 0, mask="2"),
+            ]
+        )
+        times = cbp.slew_times(start, end, speeds=SPEEDS)
+        self.assertEqual(times.shape, (1, 5))
+        # The slowest axis sets the time, mask rotation goes the short
+        # way around and a mask change adds to the other motions.
+        np.testing.assert_allclose(times[0], [2, 3, 2, 2, 2])
+        np.testing.assert_allclose(cbp.slew_times(end, end).diagonal(), 0)
+
+        with self.subTest("Default speeds are those of AXES"):
+            times = cbp.slew_times(start, end)
+            self.assertAlmostEqual(times[0, 0], 20 / cbp.AXES["azimuth"].speed)
+            self.assertAlmostEqual(times[0, 3], 2 / cbp.AXES["mask"].speed)
+
+        with self.subTest("Omitted axes move at the speed of AXES"):
+            times = cbp.slew_times(start, end, speeds=dict(mask=0.5))
+            self.assertAlmostEqual(times[0, 0], 20 / cbp.AXES["azimuth"].speed)
+            self.assertAlmostEqual(times[0, 3], 4)
+
+    def test_predict_duration(self):
+        start = cbp.make_point(0, 0)
+        points = [cbp.make_point(10, 0), cbp.make_point(10, 30)]
+        self.assertAlmostEqual(
+            cbp.predict_duration(points, start=start, speeds=SPEEDS), 4
+        )
+        self.assertEqual(cbp.predict_duration([], start=start), 0)
+
+    def test_plan_order(self):
+        start = cbp.make_point(0, 0, mask="1")
+        points = [
+            cbp.make_point(40, 0, mask="2"),
+            cbp.make_point(30, 0),
+            cbp.make_point(-10, 0, mask="1"),
+            cbp.make_point(25, 0, mask="2"),
+            cbp.make_point(5, 0, mask="1"),
+        ]
+        order, duration = cbp.plan_order(points, start=start)
+        self.assertEqual(sorted(order), list(range(len(points))))
+        resolved = cbp.resolve_points(points, start=start)
+        ordered = [resolved[i] for i in order]
+        self.assertAlmostEqual(duration, simulate_duration(ordered, start=start))
+        # Check against all orders.
+        best = min(
+            simulate_duration([resolved[i] for i in permutation], start=start)
+            for permutation in itertools.permutations(range(len(points)))
+        )
+        self.assertAlmostEqual(duration, best)
+        self.assertEqual(cbp.plan_order([], start=start), ([], 0.0))
+
+    def test_unset_axes(self):
+        start = cbp.make_point(0, 0, mask="1")
+        points = [
+            cbp.make_point(0, 0, mask="5"),
+            cbp.make_point(1, 0),
+            cbp.make_point(2, 0, mask="1"),
+        ]
+        permutations = list(itertools.permutations(range(len(points))))
+        for permutation in permutations:
+            ordered = [points[i] for i in permutation]
+            with self.subTest(permutation=permutation):
+                self.assertAlmostEqual(
+                    cbp.predict_duration(ordered, start=start),
+                    simulate_duration(ordered, start=start),
+                )
+
+        resolved = cbp.resolve_points(points, start=start)
+        self.assertEqual([point.mask for point in resolved], ["5", "5", "1"])
+        self.assertIsNone(resolved[0].focus)
+        order, duration = cbp.plan_order(points, start=start)
+        self.assertAlmostEqual(
+            duration, simulate_duration([resolved[i] for i in order], start=start)
+        )
+        best = min(
+            simulate_duration([resolved[i] for i in permutation], start=start)
+            for permutation in permutations
+        )
+        self.assertAlmostEqual(duration, best)
+
+    def test_plan_order_grid(self):
+        rng = np.random.default_rng(seed=47)
+        start = cbp.make_point(0, 0)
+        points = [
+            cbp.make_point(azimuth, elevation)
+            for azimuth, elevation in zip(
+                rng.uniform(-45, 45, 200), rng.uniform(-69, 45, 200)
+            )
+        ]
+        order, duration = cbp.plan_order(points, start=start)
+        self.assertEqual(sorted(order), list(range(len(points))))
+        self.assertLess(duration, cbp.predict_duration(points, start=start) / 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+from lsst.ts import cbp
+
+
+class TelemetryRecorderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tempdir.name) / "telemetry.dat"
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_record(self):
+        recorder = cbp.TelemetryRecorder(self.path, capacity=10, clock=lambda: 5.0)
+        recorder.record(dict(az=1.5, alt=-2, wdpanic=0))
+        recorder.record(dict(park=1, unknown=3))
+        records = recorder.read()
+        self.assertEqual(records.dtype, cbp.RECORD_DTYPE)
+        self.assertEqual(len(recorder), 2)
+        np.testing.assert_array_equal(records["az"], [1.5, np.nan])
+        np.testing.assert_array_equal(records["alt"], [-2, np.nan])
+        np.testing.assert_array_equal(records["park"], [np.nan, 1])
+        np.testing.assert_array_equal(records["tai"], [5, 5])
+        self.assertLessEqual(records["monotonic"][0], records["monotonic"][1])
+        self.assertEqual(self.path.stat().st_size, 64 + 10 * cbp.RECORD_DTYPE.itemsize)
+
+    def test_ring(self):
+        recorder = cbp.TelemetryRecorder(self.path, capacity=4)
+        for i in range(10):
+            recorder.record(dict(az=i))
+        self.assertEqual(recorder.count, 10)
+        self.assertEqual(len(recorder), 4)
+        np.testing.assert_array_equal(recorder.read()["az"], [6, 7, 8, 9])
+        recorder.close()
+        np.testing.assert_array_equal(
+            cbp.read_telemetry_records(self.path)["az"], [6, 7, 8, 9]
+        )
+
+    def test_reopen(self):
+        recorder = cbp.TelemetryRecorder(self.path, capacity=4)
+        for i in range(3):
+            recorder.record(dict(foc=i))
+        recorder.close()
+
+        with self.subTest("Same capacity: history is kept."):
+            recorder = cbp.TelemetryRecorder(self.path, capacity=4)
+            recorder.record(dict(foc=10))
+            recorder.record(dict(foc=11))
+            np.testing.assert_array_equal(recorder.read()["foc"], [1, 2, 10, 11])
+            recorder.close()
+
+        with self.subTest("Other capacity: the file is replaced."):
+            recorder = cbp.TelemetryRecorder(self.path, capacity=2)
+            self.assertEqual(len(recorder), 0)
+            recorder.record(dict(foc=20))
+            np.testing.assert_array_equal(recorder.read()["foc"], [20])
+            recorder.close()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            cbp.TelemetryRecorder(self.path, capacity=0)
+        self.path.write_bytes(b"not a telemetry file" * 10)
+        with self.assertRaises(ValueError):
+            cbp.read_telemetry_records(self.path)
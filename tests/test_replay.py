@@ -0,0 +1,149 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import asyncio
+import logging
+import math
+import pathlib
+import tempfile
+import unittest
+
+from lsst.ts import cbp, tcpip
+
+STD_TIMEOUT = 15
+
+SENT = cbp.TraceDirection.SENT
+RECEIVED = cbp.TraceDirection.RECEIVED
+
+
+class ReplayTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.log = logging.getLogger(type(self).__name__)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tempdir.name) / "cbp.trace"
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write_trace(self, items):
+        """Write a trace of (timestamp_ns, direction, data) items."""
+        writer = cbp.TraceWriter(self.path)
+        for timestamp_ns, direction, data in items:
+            writer.write(direction, data, timestamp_ns=timestamp_ns)
+        writer.close()
+
+    async def query(self, client, command):
+        await client.write_str(command)
+        return await asyncio.wait_for(client.read_str(), timeout=STD_TIMEOUT)
+
+    def test_read_trace(self):
+        self.write_trace([(1, SENT, b"az=?\r\n"), (2, RECEIVED, b"12.5\r\n")])
+        with open(self.path, "ab") as file:
+            file.write(b"\x03\x00")
+        records = cbp.read_trace(self.path)
+        self.assertEqual([record.timestamp_ns for record in records], [1, 2])
+        self.assertEqual([record.direction for record in records], [SENT, RECEIVED])
+        self.assertEqual(
+            [record.data for record in records], [b"az=?\r\n", b"12.5\r\n"]
+        )
+
+        self.path.write_bytes(b"not a trace file")
+        with self.assertRaises(ValueError):
+            cbp.read_trace(self.path)
+
+    def test_get_exchanges(self):
+        self.write_trace(
+            [
+                (0, SENT, b"az=?;alt=?\r\n"),
+                (1_000_000, RECEIVED, b"12.5\r\n"),
+                # The reply to alt=? is lost.
+                (2_000_000, SENT, b'MG "SYNC1"\r\n'),
+                (5_000_000, RECEIVED, b"SYNC1\r\n"),
+                (6_000_000, SENT, b"foc=?\r\n"),
+                (7_000_000, RECEIVED, b"\r\n"),
+                (8_000_000, RECEIVED, b"300\r\n"),
+            ]
+        )
+        exchanges = cbp.get_exchanges(cbp.read_trace(self.path))
+        self.assertEqual(
+            [exchange.command for exchange in exchanges],
+            ["az=?", "alt=?", 'MG "SYNC1"', "foc=?"],
+        )
+        self.assertEqual(
+            [exchange.reply for exchange in exchanges],
+            [b"12.5\r\n", None, b"SYNC1\r\n", b"300\r\n"],
+        )
+        self.assertAlmostEqual(exchanges[0].latency, 0.001)
+        self.assertTrue(math.isnan(exchanges[1].latency))
+        self.assertAlmostEqual(exchanges[2].latency, 0.003)
+        self.assertAlmostEqual(exchanges[3].latency, 0.002)
+
+    async def test_replay_trace(self):
+        self.write_trace(
+            [
+                (0, SENT, b"az=?\r\n"),
+                (1_000_000, RECEIVED, b"12.5\r\n"),
+                (2_000_000, SENT, b"az=?;new_alt=10\r\n"),
+                (3_000_000, RECEIVED, b"13.5\r\n"),
+                (3_000_000, RECEIVED, b":\r\n"),
+            ]
+        )
+        async with cbp.ReplayServer(self.path, speed=math.inf, log=self.log) as server:
+            await asyncio.wait_for(server.start_task, timeout=STD_TIMEOUT)
+            async with tcpip.Client(
+                host=server.host, port=server.port, log=self.log
+            ) as client:
+                self.assertEqual(await self.query(client, "az=?"), "12.5")
+                self.assertEqual(await self.query(client, "az=?"), "13.5")
+                # The last recorded reply is repeated.
+                self.assertEqual(await self.query(client, "az=?"), "13.5")
+                self.assertEqual(await self.query(client, "new_alt=10"), ":")
+                self.assertEqual(await self.query(client, "foc=?"), "?")
+                self.assertEqual(await self.query(client, 'MG "SYNC3"'), "SYNC3")
+                self.assertEqual(server.command_count, 6)
+
+    async def test_replay_telemetry(self):
+        self.path = self.path.with_suffix(".dat")
+        recorder = cbp.TelemetryRecorder(self.path, capacity=10)
+        recorder.record(dict(az=12.5))
+        recorder.record(dict(alt=-3, foc=100))
+        recorder.close()
+        async with cbp.ReplayServer(self.path, speed=math.inf, log=self.log) as server:
+            await asyncio.wait_for(server.start_task, timeout=STD_TIMEOUT)
+            async with tcpip.Client(
+                host=server.host, port=server.port, log=self.log
+            ) as client:
+                self.assertEqual(
+                    await self.query(client, "MG az,alt,foc"),
+                    "12.5000 -3.0000 100.0000",
+                )
+                self.assertEqual(await self.query(client, "az=?"), "12.5000")
+                self.assertEqual(await self.query(client, "new_az=20"), ":")
+                # Never recorded.
+                self.assertEqual(await self.query(client, "msk=?"), "?")
+
+        with self.assertRaises(ValueError):
+            cbp.ReplayServer(self.path, speed=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
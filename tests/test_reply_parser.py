@@ -0,0 +1,56 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import unittest
+
+from lsst.ts.cbp import reply_parser
+
+
+class ReplyParserTestCase(unittest.TestCase):
+    def test_parse_float(self):
+        self.assertEqual(reply_parser.parse_float(b" -12.5000\r\n"), -12.5)
+        self.assertEqual(reply_parser.parse_float(b": 3.0000\r\n"), 3)
+        self.assertEqual(reply_parser.parse_float(memoryview(b"7\r\n")), 7)
+        for reply in (b"?", b":", b"", b"abc\r\n"):
+            with self.subTest(reply=reply):
+                with self.assertRaises(reply_parser.ReplyError):
+                    reply_parser.parse_float(reply)
+
+    def test_parse_bool(self):
+        self.assertTrue(reply_parser.parse_bool(b" 1.0000\r\n"))
+        self.assertFalse(reply_parser.parse_bool(b":0.0000\r\n"))
+        self.assertFalse(reply_parser.parse_bool(b"0.5"))
+        with self.assertRaises(reply_parser.ReplyError):
+            reply_parser.parse_bool(b"?")
+
+    def test_parse_values(self):
+        self.assertEqual(
+            reply_parser.parse_values(b": 1.0000 -2.5000 3\r\n", 3), [1, -2.5, 3]
+        )
+        with self.assertRaises(reply_parser.ReplyError):
+            reply_parser.parse_values(b" 1.0000 2.0000\r\n", 3)
+        with self.assertRaisesRegex(reply_parser.ReplyError, "rejected"):
+            reply_parser.parse_values(b" 1.0000 ?", 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#
+# This file is part of ts_cbp.
+#
+# Developed for the Rubin Observatory Telescope and Site System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+import pathlib
+import tempfile
+import unittest
+
+from lsst.ts import cbp
+
+
+class SequenceTestCase(unittest.TestCase):
+    def test_load_grid(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = pathlib.Path(tempdir) / "grid.yaml"
+            path.write_text(
+                "- {azimuth: 1, elevation: 2, mask: 3}\n"
+                "- {azimuth: 4, elevation: 5, focus: 600, mask_rotation: 7}\n"
+            )
+            points = cbp.load_grid(path)
+            self.assertEqual(points[0], cbp.make_point(1, 2, mask="3"))
+            self.assertEqual(
+                points[1], cbp.make_point(4, 5, focus=600, mask_rotation=7)
+            )
+
+            path.write_text("- {azimuth: 1, elevation: 2, speed: 3}\n")
+            with self.assertRaises(ValueError):
+                cbp.load_grid(path)
+
+    def test_check_points(self):
+        points = [
+            cbp.make_point(0, 0),
+            cbp.make_point(50, 0, focus=14000),
+            cbp.make_point(-50, 0, mask_rotation=180),
+        ]
+        with self.assertRaises(ValueError) as context:
+            cbp.check_points(points)
+        message = str(context.exception)
+        self.assertIn("azimuth", message)
+        self.assertIn("[1]=50.0", message)
+        self.assertIn("[2]=-50.0", message)
+        self.assertIn("focus", message)
+        cbp.check_points(points[:1])
+
+        masks = cbp.MaskRegistry.make_default()
+        points = [
+            cbp.make_point(0, 0, mask="2"),
+            cbp.make_point(0, 0, mask="2.0"),
+            cbp.make_point(0, 0),
+            cbp.make_point(0, 0, mask="9"),
+        ]
+        # Mask "2.0" is in range, but is not the key of a mask.
+        cbp.check_points(points[:3])
+        with self.assertRaises(ValueError) as context:
+            cbp.check_points(points, masks=masks)
+        self.assertIn("[1]='2.0', [3]='9'", str(context.exception))
+        cbp.check_points(points[:1], masks=masks)
+
+
+if __name__ == "__main__":
+    unittest.main()